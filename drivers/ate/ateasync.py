@@ -0,0 +1,749 @@
+#!/usr/bin/env python
+"""
+    asyncio driver interface to the P2654Simulations simulation framework.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    Coroutine counterparts of ATE, JTAGController and GPIOController from drivers.ate.atesim.  Every access
+    to the Simulator is awaitable, including the waits on the controller status registers, so a single
+    event loop can drive many ATE sessions concurrently without dedicating a thread to each board.  Both the
+    ASCII telnet protocol and the binary framed protocol of drivers.ate.atebinary are supported, as is the
+    in-process SimulatedBoard of drivers.ate.atelocal.
+
+    A session must be connected and used from the same event loop.  Controllers sharing one AsyncATE hold
+    the AsyncATE lock for the duration of each multi-command operation so concurrent tasks do not interleave
+    their Wishbone accesses.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import asyncio
+import socket
+import time
+from collections import deque
+
+from drivers.ate.atesim import AcknowledgeError, SHIFT_IR, SHIFT_DR, RUN_TEST_IDLE, TEST_LOGIC_RESET
+from drivers.ate.atebinary import OP_MW, OP_MR, OP_MWB, OP_MRB, OP_STARTSIM, OP_STOPSIM, OP_SIMSTATUS, \
+    OP_EXIT, OP_WAIT, STATUS_OK, header, word, word2, word4, status_text, describe
+from drivers.ate.atelocal import ATELocalClient
+from p2654model2.instrument.instrument import instrumented
+
+
+async def _open(ip, port):
+    reader, writer = await asyncio.open_connection(ip, port)
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return reader, writer
+
+
+@instrumented("driver")
+class AsyncATETelnetClient:
+    def __init__(self, pipeline_depth=1):
+        """
+        @param pipeline_depth: Maximum number of commands allowed in flight on the link.  Same meaning as for
+                               ATETelnetClient.
+        """
+        self.timeout = 60
+        self.reader = None
+        self.writer = None
+        self.pipeline_depth = max(1, pipeline_depth)
+        self.in_flight = deque()
+        # Task that posted the command -> its failed commands, until that task drains them
+        self.failed = {}
+
+    async def connect(self, ip, port):
+        self.reader, self.writer = await _open(ip, port)
+        # Synchronize with the server: whatever it sent on connect is consumed along with this first response
+        await self.request("SIMSTATUS\n")
+
+    async def read_until(self, s):
+        """
+        Read data from the Simulator until a match is found with s.
+        @param s: A string of characters to expect from the Simulator following a command execution.
+        """
+        try:
+            resp = await asyncio.wait_for(self.reader.readuntil(s.encode("ascii")), self.timeout)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            raise TimeoutError
+        return resp.decode("ascii")
+
+    async def read_all(self):
+        try:
+            resp = await asyncio.wait_for(self.reader.read(), self.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError
+        return resp.decode("ascii")
+
+    async def write(self, s):
+        self.writer.write(s.encode("ascii"))
+        await self.writer.drain()
+
+    async def post(self, s, expect="OK\r\n"):
+        if self.pipeline_depth == 1:
+            await self.__complete_all()
+            await self.write(s)
+            return await self.read_until(expect)
+        while len(self.in_flight) >= self.pipeline_depth:
+            await self.__complete_oldest()
+        await self.write(s)
+        self.in_flight.append((s, expect, asyncio.current_task()))
+        return None
+
+    async def request(self, s, expect="OK\r\n"):
+        await self.__complete_all()
+        await self.write(s)
+        return await self.read_until(expect)
+
+    async def drain(self):
+        await self.__complete_all()
+        return self.failed.pop(asyncio.current_task(), [])
+
+    async def __complete_all(self):
+        # Completes the window but keeps the failures for drain()
+        while len(self.in_flight):
+            await self.__complete_oldest()
+
+    async def __complete_oldest(self):
+        s, expect, owner = self.in_flight.popleft()
+        resp = await self.read_until(expect)
+        if not resp.endswith(expect) or resp.find("ERROR") >= 0:
+            self.failed.setdefault(owner, []).append((s, resp))
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.reader = None
+            self.writer = None
+
+    async def start_sim(self, board):
+        return await self.request("STARTSIM {:s}\n".format(board))
+
+    async def stop_sim(self):
+        return await self.request("STOPSIM\n")
+
+    async def sim_status(self):
+        return await self.request("SIMSTATUS\n")
+
+    async def mw(self, adr, data):
+        return await self.post("MW 0x{:X} 0x{:X}\n".format(adr, data))
+
+    async def mr(self, adr):
+        resp = await self.request("MR 0x{:X}\n".format(adr))
+        return resp, int(resp.split()[0], 16)
+
+    async def mwb(self, adr, data, stream=True):
+        cmd = "MWB 0x{:X} 0x{:X} {:s}\n".format(adr, len(data), bytes(data).hex().upper())
+        if stream:
+            return await self.post(cmd)
+        return await self.request(cmd)
+
+    async def mrb(self, adr, count):
+        resp = await self.request("MRB 0x{:X} 0x{:X}\n".format(adr, count))
+        if resp.find("OK") < 0 or resp.find("ERROR") >= 0 or resp.find("Unknown") >= 0:
+            return resp, None
+        return resp, bytearray.fromhex(resp.split()[0]) if count else bytearray()
+
+    async def wait(self, adr, mask, value, timeout_ms):
+        resp = await self.request("WAIT 0x{:X} 0x{:X} 0x{:X} 0x{:X}\n".format(adr, mask, value, timeout_ms))
+        if resp.find("ERROR") >= 0 or resp.find("Unknown") >= 0:
+            return resp, None, None
+        slist = resp.split()
+        return resp, int(slist[0], 16), int(slist[1], 16)
+
+    async def exit(self):
+        await self.__complete_all()
+        await self.write("EXIT\n")
+        return await self.read_all()
+
+
+@instrumented("driver")
+class AsyncATEBinaryClient:
+    def __init__(self, pipeline_depth=1):
+        """
+        @param pipeline_depth: Maximum number of commands allowed in flight on the link.  Same meaning as for
+                               ATEBinaryClient.
+        """
+        self.timeout = 60
+        self.reader = None
+        self.writer = None
+        self.pipeline_depth = max(1, pipeline_depth)
+        self.in_flight = deque()
+        # Task that posted the command -> its failed commands, until that task drains them
+        self.failed = {}
+
+    async def connect(self, ip, port):
+        self.reader, self.writer = await _open(ip, port)
+
+    async def write(self, op, payload=b""):
+        self.writer.write(header.pack(len(payload) + 1, op) + payload)
+        await self.writer.drain()
+
+    async def read_frame(self):
+        try:
+            hdr = await asyncio.wait_for(self.reader.readexactly(header.size), self.timeout)
+            length, status = header.unpack(hdr)
+            body = await asyncio.wait_for(self.reader.readexactly(length - 1), self.timeout) if length > 1 else b""
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            raise TimeoutError
+        return status, body
+
+    async def post(self, op, payload=b"", adr=None):
+        if self.pipeline_depth == 1:
+            await self.__complete_all()
+            await self.write(op, payload)
+            return status_text(*(await self.read_frame()))
+        while len(self.in_flight) >= self.pipeline_depth:
+            await self.__complete_oldest()
+        await self.write(op, payload)
+        self.in_flight.append((op, adr, asyncio.current_task()))
+        return None
+
+    async def request(self, op, payload=b""):
+        await self.__complete_all()
+        await self.write(op, payload)
+        return await self.read_frame()
+
+    async def drain(self):
+        await self.__complete_all()
+        return self.failed.pop(asyncio.current_task(), [])
+
+    async def __complete_all(self):
+        # Completes the window but keeps the failures for drain()
+        while len(self.in_flight):
+            await self.__complete_oldest()
+
+    async def __complete_oldest(self):
+        op, adr, owner = self.in_flight.popleft()
+        status, body = await self.read_frame()
+        if status != STATUS_OK:
+            self.failed.setdefault(owner, []).append((describe(op, adr), status_text(status, body)))
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.reader = None
+            self.writer = None
+
+    async def start_sim(self, board):
+        return status_text(*(await self.request(OP_STARTSIM, board.encode("utf-8"))))
+
+    async def stop_sim(self):
+        return status_text(*(await self.request(OP_STOPSIM)))
+
+    async def sim_status(self):
+        return status_text(*(await self.request(OP_SIMSTATUS)))
+
+    async def mw(self, adr, data):
+        return await self.post(OP_MW, word2.pack(adr, data), adr)
+
+    async def mr(self, adr):
+        status, body = await self.request(OP_MR, word.pack(adr))
+        resp = status_text(status, b"")
+        if status != STATUS_OK:
+            raise ValueError(resp.strip())
+        if len(body) != word.size:
+            raise ValueError("MR returned {:d} bytes, expected {:d}.".format(len(body), word.size))
+        return resp, word.unpack(body)[0]
+
+    async def mwb(self, adr, data, stream=True):
+        payload = word.pack(adr) + bytes(data)
+        if stream:
+            return await self.post(OP_MWB, payload, adr)
+        return status_text(*(await self.request(OP_MWB, payload)))
+
+    async def mrb(self, adr, count):
+        status, body = await self.request(OP_MRB, word2.pack(adr, count))
+        resp = status_text(status, b"")
+        if status != STATUS_OK:
+            return resp, None
+        return resp, bytearray(body)
+
+    async def wait(self, adr, mask, value, timeout_ms):
+        status, body = await self.request(OP_WAIT, word4.pack(adr, mask, value, timeout_ms))
+        if status != STATUS_OK:
+            return status_text(status, body), None, None
+        value, checks = word2.unpack(body)
+        return status_text(status, b""), value, checks
+
+    async def exit(self):
+        await self.__complete_all()
+        return status_text(*(await self.request(OP_EXIT)))
+
+
+@instrumented("driver")
+class AsyncATELocalClient:
+    """
+    Awaitable wrapper of ATELocalClient.  The in-process board completes every command immediately.
+    """
+    def __init__(self, pipeline_depth=1):
+        self.client = ATELocalClient(pipeline_depth)
+
+    async def connect(self, ip, port):
+        return self.client.connect(ip, port)
+
+    async def drain(self):
+        return self.client.drain()
+
+    async def close(self):
+        return self.client.close()
+
+    async def start_sim(self, board):
+        return self.client.start_sim(board)
+
+    async def stop_sim(self):
+        return self.client.stop_sim()
+
+    async def sim_status(self):
+        return self.client.sim_status()
+
+    async def mw(self, adr, data):
+        return self.client.mw(adr, data)
+
+    async def mr(self, adr):
+        return self.client.mr(adr)
+
+    async def mwb(self, adr, data, stream=True):
+        return self.client.mwb(adr, data, stream)
+
+    async def mrb(self, adr, count):
+        return self.client.mrb(adr, count)
+
+    async def wait(self, adr, mask, value, timeout_ms):
+        return self.client.wait(adr, mask, value, timeout_ms)
+
+    async def exit(self):
+        return self.client.exit()
+
+
+@instrumented("driver")
+class AsyncATE:
+    transports = {
+        "telnet": AsyncATETelnetClient,
+        "binary": AsyncATEBinaryClient,
+        "local": AsyncATELocalClient,
+    }
+
+    def __init__(self, ip="127.0.0.1", port=5023, pipeline_depth=1, transport="telnet"):
+        """
+        @param ip: Address of the Simulator.
+        @param port: Port of the Simulator.
+        @param pipeline_depth: Maximum number of commands allowed in flight on the link.
+        @param transport: "telnet" or "binary", as for ATE.
+        """
+        if transport not in AsyncATE.transports:
+            raise ValueError("Unknown ATE transport ({:s}).".format(str(transport)))
+        self.tn_inst = None
+        self.ip = ip
+        self.port = port
+        self.pipeline_depth = pipeline_depth
+        self.transport = transport
+        self.resp = ""
+        self.value = None
+        self.block = None
+        self.error = None
+        # None until the first block transfer tells whether the Simulator supports MWB/MRB
+        self.block_mode = None
+        # Held by a controller for the whole of a multi-command operation
+        self.lock = asyncio.Lock()
+        # None until the first wait_status() tells whether the Simulator supports WAIT
+        self.wait_mode = None
+        self.wait_timeout = 10.0
+        self.poll_min = 0.0001
+        self.poll_max = 0.01
+        self.poll_start = self.poll_min
+        self.last_polls = 0
+        self.last_polls_saved = 0
+        self.stats = {"waits": 0, "polls": 0, "polls_saved": 0, "writes_skipped": 0}
+        # Last value written to each idempotent configuration register, None when unknown
+        self.shadow = {}
+
+    async def connect(self, board):
+        self.tn_inst = AsyncATE.transports[self.transport](self.pipeline_depth)
+        await self.tn_inst.connect(self.ip, self.port)
+        self.invalidate_shadow()
+        self.resp = await self.tn_inst.start_sim(board)
+        return True if len(self.resp) >= 0 else False
+
+    def add_shadow(self, *adrs):
+        """
+        Same as ATE.add_shadow().
+        """
+        for adr in adrs:
+            self.shadow.setdefault(adr, None)
+
+    def invalidate_shadow(self, adr=None):
+        if adr is None:
+            for a in self.shadow:
+                self.shadow[a] = None
+        elif adr in self.shadow:
+            self.shadow[adr] = None
+
+    async def write(self, adr, data):
+        if adr in self.shadow:
+            if self.shadow[adr] == data:
+                self.stats["writes_skipped"] += 1
+                return True
+            self.shadow[adr] = data
+        try:
+            resp = await self.tn_inst.mw(adr, data)
+        except Exception:
+            self.invalidate_shadow()
+            raise
+        if resp is not None:
+            self.resp = resp
+            if resp.find("ERROR") >= 0:
+                self.invalidate_shadow(adr)
+        return True if len(self.resp) >= 0 else False
+
+    async def read(self, adr):
+        self.invalidate_shadow(adr)
+        try:
+            try:
+                self.resp, self.value = await self.tn_inst.mr(adr)
+            except (ValueError, IndexError) as e:
+                self.error = str(e)
+                self.invalidate_shadow()
+                return False
+        except TimeoutError as e:
+            self.error = str(e)
+            self.invalidate_shadow()
+            return False
+        return True
+
+    async def write_block(self, adr, data):
+        """
+        Write a contiguous block of bytes to the Wishbone memory starting at adr using a single MWB command.
+        @return: True if the block was accepted, False if the Simulator does not support block transfers.
+        """
+        if self.block_mode is False:
+            return False
+        for a in self.shadow:
+            if adr <= a < adr + len(data):
+                self.shadow[a] = None
+        if self.block_mode:
+            resp = await self.tn_inst.mwb(adr, data)
+            if resp is not None:
+                self.resp = resp
+            return True
+        self.resp = await self.tn_inst.mwb(adr, data, stream=False)
+        return self.__block_supported(self.resp)
+
+    async def read_block(self, adr, count):
+        """
+        Read a contiguous block of bytes from the Wishbone memory starting at adr using a single MRB command.
+        The data read is available from get_block().
+        @return: True if the block was read, False if the Simulator does not support block transfers or on error.
+        """
+        if self.block_mode is False:
+            return False
+        try:
+            try:
+                self.resp, block = await self.tn_inst.mrb(adr, count)
+            except (ValueError, IndexError) as e:
+                self.error = str(e)
+                return False
+            if not self.__block_supported(self.resp):
+                return False
+            self.block = block
+            if len(self.block) != count:
+                self.error = "MRB returned {:d} bytes, expected {:d}.".format(len(self.block), count)
+                return False
+        except TimeoutError as e:
+            self.error = str(e)
+            return False
+        return True
+
+    def __block_supported(self, resp):
+        if resp.find("OK") < 0 or resp.find("ERROR") >= 0 or resp.find("Unknown") >= 0:
+            self.block_mode = False
+            self.error = "Block transfers not supported: " + resp
+            return False
+        self.block_mode = True
+        return True
+
+    async def flush(self):
+        """
+        Wait for every streamed command to complete.
+        @return: True if those posted by the calling task completed with OK, False otherwise with the failures in get_error().
+        """
+        failed = await self.tn_inst.drain()
+        if len(failed):
+            self.invalidate_shadow()
+            self.error = "; ".join("{:s} -> {:s}".format(cmd.strip(), resp.strip()) for cmd, resp in failed)
+            return False
+        return True
+
+    async def wait_ready(self, timeout=None):
+        """
+        Awaitable ATE.wait_ready().
+        """
+        deadline = time.monotonic() + (self.wait_timeout if timeout is None else timeout)
+        delay = self.poll_min
+        while not await self.sim_status():
+            if time.monotonic() >= deadline:
+                self.error = "Simulation not running: " + self.resp
+                return False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.poll_max)
+        return True
+
+    async def wait_status(self, adr, mask, value, timeout=None):
+        """
+        Awaitable ATE.wait_status().  The backoff between polls awaits so other sessions keep running.
+        """
+        if timeout is None:
+            timeout = self.wait_timeout
+        self.last_polls = 0
+        self.last_polls_saved = 0
+        if self.wait_mode is not False:
+            try:
+                self.resp, current, checks = await self.tn_inst.wait(adr, mask, value, int(timeout * 1000))
+            except (ValueError, IndexError, TimeoutError) as e:
+                self.error = str(e)
+                return False
+            if current is not None:
+                self.wait_mode = True
+                self.value = current
+                self.last_polls_saved = max(0, checks - 1)
+                self.stats["waits"] += 1
+                self.stats["polls_saved"] += self.last_polls_saved
+                return True
+            if self.resp.find("TIMEOUT") >= 0:
+                self.wait_mode = True
+                self.error = "Timed out waiting for 0x{:X} & 0x{:X} == 0x{:X}.".format(adr, mask, value)
+                return False
+            self.wait_mode = False
+        deadline = time.monotonic() + timeout
+        delay = self.poll_start
+        while True:
+            self.last_polls += 1
+            self.stats["polls"] += 1
+            if not await self.read(adr):
+                return False
+            if self.value & mask == value:
+                self.poll_start = max(self.poll_min, delay / 4)
+                return True
+            if time.monotonic() >= deadline:
+                self.error = "Timed out waiting for 0x{:X} & 0x{:X} == 0x{:X}.".format(adr, mask, value)
+                return False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.poll_max)
+
+    def get_stats(self):
+        return dict(self.stats)
+
+    def get_value(self):
+        return self.value
+
+    def get_block(self):
+        return self.block
+
+    def get_error(self):
+        return self.error
+
+    def get_last_response(self):
+        return self.resp
+
+    async def terminate(self):
+        self.invalidate_shadow()
+        self.resp = await self.tn_inst.stop_sim()
+        return True if self.resp.find("Simulation has stopped.") >= 0 else False
+
+    async def sim_status(self):
+        self.resp = await self.tn_inst.sim_status()
+        return True if self.resp.find("Simulation is RUNNING.") >= 0 else False
+
+    async def close(self):
+        self.resp = await self.tn_inst.exit()
+        await self.tn_inst.close()
+        return True if self.resp.find("Goodbye") >= 0 else False
+
+
+async def check_writes(ate_inst):
+    """
+    Awaitable drivers.ate.atesim.check_writes() for an AsyncATE.
+    """
+    if not await ate_inst.flush():
+        raise AcknowledgeError("Write Error: " + str(ate_inst.get_error()))
+
+
+@instrumented("driver")
+class AsyncGPIOController:
+    def __init__(self, ate_inst):
+        self.ate_inst = ate_inst
+        self.ate_inst.add_shadow(0x00001800)
+
+    async def wait_ready(self, timeout=None):
+        async with self.ate_inst.lock:
+            return await self.ate_inst.read(0x00001800)
+
+    async def write(self, val):
+        async with self.ate_inst.lock:
+            return await self.ate_inst.write(0x00001800, val)
+
+    async def flush(self):
+        """
+        Awaitable GPIOController.flush().
+        """
+        async with self.ate_inst.lock:
+            return await self.ate_inst.flush()
+
+    async def read(self):
+        async with self.ate_inst.lock:
+            return await self.ate_inst.read(0x00001800)
+
+    def get_value(self):
+        return self.ate_inst.get_value()
+
+    def get_error(self):
+        return self.ate_inst.get_error()
+
+
+@instrumented("driver")
+class AsyncJTAGController:
+    def __init__(self, ate_inst):
+        """
+        @param ate_inst: Connected AsyncATE the controller is reached through.
+        """
+        self.ate_inst = ate_inst
+        self.base = 0x00001000
+        # Start state, end state and bit count; the control register starts a scan on write so is never shadowed
+        self.ate_inst.add_shadow(self.base + 0x400, self.base + 0x401, self.base + 0x402)
+        self.last_scan_polls_saved = 0
+        self.stats = {"scans": 0, "polls": 0, "polls_saved": 0}
+
+    async def __write_vector(self, tdi_vector, nbytes):
+        if await self.ate_inst.write_block(self.base, tdi_vector[:nbytes]):
+            return
+        for addr in range(nbytes):
+            if not await self.ate_inst.write(self.base + addr, tdi_vector[addr] & 0xFF):
+                raise AcknowledgeError("Write Error: " + self.ate_inst.get_last_response())
+
+    async def __read_vector(self, tdo_vector):
+        if await self.ate_inst.read_block(self.base, len(tdo_vector)):
+            tdo_vector[:] = self.ate_inst.get_block()
+            return
+        for addr in range(len(tdo_vector)):
+            if not await self.ate_inst.read(self.base + addr):
+                raise AcknowledgeError(str(self.ate_inst.get_error()) + " " + self.ate_inst.get_last_response())
+            tdo_vector[addr] = self.ate_inst.get_value()
+
+    async def __run(self, count, start, end):
+        # Program and start a shift, wait for the controller to go idle, then rearm it for the next trigger
+        await self.ate_inst.write(self.base + 0x402, count & 0xFFFF)
+        await self.ate_inst.write(self.base + 0x400, start & 0xF)
+        await self.ate_inst.write(self.base + 0x401, end & 0xF)
+        await self.ate_inst.write(self.base + 0x403, 0x1)  # Start the scan
+        if not await self.ate_inst.wait_status(self.base + 0x404, 0xFF, 0x00):
+            raise AcknowledgeError("Status Error: " + str(self.ate_inst.get_error()))
+        self.last_scan_polls_saved = self.ate_inst.last_polls_saved
+        self.stats["scans"] += 1
+        self.stats["polls"] += self.ate_inst.last_polls
+        self.stats["polls_saved"] += self.last_scan_polls_saved
+        await self.ate_inst.write(self.base + 0x403, 0x0)  # Stop the scan/Reset for next scan cycle trigger
+
+    async def __scan_vector(self, tdi_vector, count, start, end):
+        tdo_vector = bytearray((count + 7) // 8)
+        async with self.ate_inst.lock:
+            await self.__write_vector(tdi_vector, len(tdo_vector))
+            await self.__run(count, start, end)
+            await self.__read_vector(tdo_vector)
+            await check_writes(self.ate_inst)
+        return tdo_vector
+
+    async def ba_scan_ir(self, tdi_vector, count, start=SHIFT_IR, end=RUN_TEST_IDLE):
+        """
+        Awaitable JTAGController.ba_scan_ir().
+        """
+        return await self.__scan_vector(tdi_vector, count, start, end)
+
+    async def ba_scan_dr(self, tdi_vector, count, start=SHIFT_DR, end=RUN_TEST_IDLE):
+        """
+        Awaitable JTAGController.ba_scan_dr().
+        """
+        return await self.__scan_vector(tdi_vector, count, start, end)
+
+    async def scan_ir(self, count, tdi_string, start=SHIFT_IR, end=RUN_TEST_IDLE):
+        """
+        Awaitable JTAGController.scan_ir().
+        :return: tdo_string
+        """
+        tdo_vector = await self.ba_scan_ir(self.__to_vector(tdi_string), count, start, end)
+        return self.__to_string(tdo_vector, count)
+
+    async def scan_dr(self, count, tdi_string, start=SHIFT_DR, end=RUN_TEST_IDLE):
+        """
+        Awaitable JTAGController.scan_dr().
+        :return: tdo_string
+        """
+        tdo_vector = await self.ba_scan_dr(self.__to_vector(tdi_string), count, start, end)
+        return self.__to_string(tdo_vector, count)
+
+    async def wait_ready(self, timeout=None):
+        async with self.ate_inst.lock:
+            return await self.ate_inst.wait_status(self.base + 0x404, 0xFF, 0x00, timeout)
+
+    async def runtest(self, ticks):
+        async with self.ate_inst.lock:
+            for i in range(ticks // 1024):
+                await self.__run(1024, RUN_TEST_IDLE, RUN_TEST_IDLE)
+            await self.__run(ticks % 1024, RUN_TEST_IDLE, RUN_TEST_IDLE)
+            await check_writes(self.ate_inst)
+
+    async def softreset(self):
+        async with self.ate_inst.lock:
+            self.ate_inst.invalidate_shadow()
+            await self.__run(5, TEST_LOGIC_RESET, TEST_LOGIC_RESET)
+            await check_writes(self.ate_inst)
+
+    def get_stats(self):
+        return dict(self.stats)
+
+    @staticmethod
+    def __to_vector(tdi_string):
+        # Hex string, most significant byte first, to a bytearray holding the least significant byte first
+        if len(tdi_string) % 2:
+            tdi_string = '0' + tdi_string
+        tdi_vector = bytearray.fromhex(tdi_string)
+        tdi_vector.reverse()
+        return tdi_vector
+
+    @staticmethod
+    def __to_string(tdo_vector, count):
+        tdo_vector.reverse()
+        tdo_string = tdo_vector.hex().upper()
+        if len(tdo_string) * 4 > count:
+            tdo_string = tdo_string[1:]
+        return tdo_string
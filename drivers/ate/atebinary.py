@@ -0,0 +1,423 @@
+#!/usr/bin/env python
+"""
+    Binary framed transport to the P2654Simulations simulation framework.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    Length-prefixed binary alternative to the ASCII telnet protocol used by ATETelnetClient.  The command
+    set is the same (MW, MR, MWB, MRB, STARTSIM, STOPSIM, SIMSTATUS, EXIT), but addresses and data words
+    travel as big-endian integers and vector payloads as raw bytes, so no text is formatted or parsed on
+    the data path.
+
+    Every request frame is a 4 byte big-endian length followed by that many bytes: a 1 byte opcode and the
+    opcode specific payload.  Every response frame is a 4 byte big-endian length followed by a 1 byte status
+    and the response body.
+
+        Opcode      Request payload                 Response body
+        MW          adr (u32), data (u32)           -
+        MR          adr (u32)                       data (u32)
+        MWB         adr (u32), data bytes           -
+        MRB         adr (u32), count (u32)          count data bytes
+        STARTSIM    board name (UTF-8)              message (UTF-8)
+        STOPSIM     -                               message (UTF-8)
+        SIMSTATUS   -                               message (UTF-8)
+        EXIT        -                               message (UTF-8)
+        WAIT        adr, mask, value, timeout_ms    value (u32), checks (u32)
+
+    WAIT blocks in the Simulator until (mem[adr] & mask) == value and reports how many times the condition
+    was evaluated, replacing a client side MR polling loop.  It fails with the body TIMEOUT when timeout_ms
+    elapses first.  The text protocol carries the same command as "WAIT adr mask value timeout_ms" answered
+    by "value checks".
+
+    ATEBinaryServer is a local stand-in for the Simulator speaking this protocol over the SimulatedBoard of
+    drivers.ate.atelocal.  It allows the driver stack to be exercised offline over a socket:
+    python -m drivers.ate.atebinary [port] [board sit_file]
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import logging
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from drivers.ate.atelocal import SimulatedBoard, register_board
+from p2654model2.instrument.instrument import instrumented
+
+
+OP_MW, OP_MR, OP_MWB, OP_MRB, OP_STARTSIM, OP_STOPSIM, OP_SIMSTATUS, OP_EXIT, OP_WAIT = range(1, 10)
+STATUS_OK, STATUS_ERROR, STATUS_UNSUPPORTED = range(3)
+
+opnames = {
+    OP_MW: "MW",
+    OP_MR: "MR",
+    OP_MWB: "MWB",
+    OP_MRB: "MRB",
+    OP_STARTSIM: "STARTSIM",
+    OP_STOPSIM: "STOPSIM",
+    OP_SIMSTATUS: "SIMSTATUS",
+    OP_EXIT: "EXIT",
+    OP_WAIT: "WAIT",
+}
+
+header = struct.Struct(">IB")
+word = struct.Struct(">I")
+word2 = struct.Struct(">II")
+word4 = struct.Struct(">IIII")
+
+
+def recv_exact(sock, n):
+    """
+    Read exactly n bytes from sock.
+    @return: The bytes read, or an empty bytes object if the peer closed the connection first.
+    """
+    buf = bytearray(n)
+    view = memoryview(buf)
+    pos = 0
+    while pos < n:
+        cnt = sock.recv_into(view[pos:], n - pos)
+        if cnt == 0:
+            return b""
+        pos += cnt
+    return bytes(buf)
+
+
+def status_text(status, body):
+    """
+    Render a response status as the text protocol would have reported it, so callers check the same strings
+    for both transports.
+    """
+    if status == STATUS_OK:
+        if len(body):
+            return body.decode("utf-8") + "\r\nOK\r\n"
+        return "OK\r\n"
+    if status == STATUS_UNSUPPORTED:
+        return "ERROR Unknown command\r\n"
+    return "ERROR " + body.decode("utf-8", "replace") + "\r\n"
+
+
+def describe(op, adr):
+    """
+    Text description of a failed binary command for error reports.
+    """
+    if adr is None:
+        return opnames.get(op, str(op))
+    return "{:s} 0x{:X}".format(opnames.get(op, str(op)), adr)
+
+
+@instrumented("driver")
+class ATEBinaryClient:
+    def __init__(self, pipeline_depth=1):
+        """
+        @param pipeline_depth: Maximum number of commands allowed in flight on the link.  Same meaning as for
+                               ATETelnetClient.
+        """
+        self.timeout = 60
+        self.ip = None
+        self.port = None
+        self.sock = None
+        self.pipeline_depth = max(1, pipeline_depth)
+        self.in_flight = deque()
+        # Thread that posted the command -> its failed commands, until that thread drains them
+        self.failed = {}
+
+    def connect(self, ip, port):
+        self.ip = ip
+        self.port = port
+        self.sock = socket.create_connection((ip, port), self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def write(self, op, payload=b""):
+        """
+        Send a single request frame to the Simulator.
+        @param op: Opcode of the command.
+        @param payload: Opcode specific payload bytes.
+        """
+        self.sock.sendall(header.pack(len(payload) + 1, op) + payload)
+
+    def read_frame(self):
+        """
+        Read a single response frame from the Simulator.
+        @return: (status, body)
+        """
+        try:
+            hdr = recv_exact(self.sock, header.size)
+            if len(hdr) == 0:
+                raise TimeoutError("Simulator closed the connection.")
+            length, status = header.unpack(hdr)
+            body = recv_exact(self.sock, length - 1) if length > 1 else b""
+            if length > 1 and len(body) == 0:
+                raise TimeoutError("Simulator closed the connection.")
+        except socket.timeout:
+            raise TimeoutError
+        return status, body
+
+    def post(self, op, payload=b"", adr=None):
+        """
+        Send a command whose response is not needed by the caller yet.  When pipelining is disabled the response
+        is read immediately and returned as text, otherwise the command joins the in-flight window and None is
+        returned.
+        @param op: Opcode of the command.
+        @param payload: Opcode specific payload bytes.
+        @param adr: Address of the command, only used to describe it should it fail.
+        """
+        if self.pipeline_depth == 1:
+            self.__complete_all()
+            self.write(op, payload)
+            return status_text(*self.read_frame())
+        while len(self.in_flight) >= self.pipeline_depth:
+            self.__complete_oldest()
+        self.write(op, payload)
+        self.in_flight.append((op, adr, threading.get_ident()))
+        return None
+
+    def request(self, op, payload=b""):
+        """
+        Send a command whose response is needed now.  Any in-flight commands are completed first; their
+        failures are kept for drain().
+        @return: (status, body)
+        """
+        self.__complete_all()
+        self.write(op, payload)
+        return self.read_frame()
+
+    def drain(self):
+        """
+        Collect the responses of every in-flight command in the order the commands were sent.
+        @return: List of (command, response) pairs for the commands posted by the calling thread that did not
+                 complete with OK.  Failures of commands posted by other threads are kept for their drain().
+        """
+        self.__complete_all()
+        return self.failed.pop(threading.get_ident(), [])
+
+    def __complete_all(self):
+        while len(self.in_flight):
+            self.__complete_oldest()
+
+    def __complete_oldest(self):
+        op, adr, owner = self.in_flight.popleft()
+        status, body = self.read_frame()
+        if status != STATUS_OK:
+            # Only describe the command when it failed; successful ones never pay for the formatting
+            self.failed.setdefault(owner, []).append((describe(op, adr), status_text(status, body)))
+
+    def close(self):
+        """
+        Clean up and close the connection to the Simulator.
+        """
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def start_sim(self, board):
+        return status_text(*self.request(OP_STARTSIM, board.encode("utf-8")))
+
+    def stop_sim(self):
+        return status_text(*self.request(OP_STOPSIM))
+
+    def sim_status(self):
+        return status_text(*self.request(OP_SIMSTATUS))
+
+    def mw(self, adr, data):
+        return self.post(OP_MW, word2.pack(adr, data), adr)
+
+    def mr(self, adr):
+        """
+        @return: (response, value)
+        """
+        status, body = self.request(OP_MR, word.pack(adr))
+        resp = status_text(status, b"")
+        if status != STATUS_OK:
+            raise ValueError(resp.strip())
+        if len(body) != word.size:
+            raise ValueError("MR returned {:d} bytes, expected {:d}.".format(len(body), word.size))
+        return resp, word.unpack(body)[0]
+
+    def mwb(self, adr, data, stream=True):
+        """
+        @param stream: True to post the command into the in-flight window, False to wait for its response.
+        """
+        payload = word.pack(adr) + bytes(data)
+        if stream:
+            return self.post(OP_MWB, payload, adr)
+        return status_text(*self.request(OP_MWB, payload))
+
+    def mrb(self, adr, count):
+        """
+        @return: (response, block) where block is None if the command failed.
+        """
+        status, body = self.request(OP_MRB, word2.pack(adr, count))
+        resp = status_text(status, b"")
+        if status != STATUS_OK:
+            return resp, None
+        return resp, bytearray(body)
+
+    def wait(self, adr, mask, value, timeout_ms):
+        """
+        Block in the Simulator until (mem[adr] & mask) == value or timeout_ms elapses.
+        @return: (response, value, checks) where value and checks are None if the command failed or timed out.
+        """
+        status, body = self.request(OP_WAIT, word4.pack(adr, mask, value, timeout_ms))
+        if status != STATUS_OK:
+            return status_text(status, body), None, None
+        value, checks = word2.unpack(body)
+        return status_text(status, b""), value, checks
+
+    def exit(self):
+        self.__complete_all()
+        return status_text(*self.request(OP_EXIT))
+
+
+class ATEBinaryHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            hdr = recv_exact(self.request, header.size)
+            if len(hdr) == 0:
+                return
+            length, op = header.unpack(hdr)
+            payload = recv_exact(self.request, length - 1) if length > 1 else b""
+            status, body = self.server.execute(op, payload)
+            self.request.sendall(header.pack(len(body) + 1, status) + body)
+            if op == OP_EXIT:
+                return
+
+
+@instrumented("driver")
+class ATEBinaryServer(socketserver.ThreadingTCPServer):
+    """
+    Stand-in Simulator speaking the binary protocol over a SimulatedBoard.  STARTSIM builds the board
+    registered under the given name with drivers.ate.atelocal.register_board().
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, ip="127.0.0.1", port=5024):
+        super(ATEBinaryServer, self).__init__((ip, port), ATEBinaryHandler)
+        self.logger = logging.getLogger('drivers.ate.atebinary.ATEBinaryServer')
+        self.sim = SimulatedBoard(None)
+        self.board = None
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        """
+        Serve requests from a background thread.
+        """
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def read_word(self, adr):
+        return self.sim.read(adr)
+
+    def write_word(self, adr, data):
+        self.sim.write(adr, data)
+
+    def wait(self, adr, mask, value, timeout_ms):
+        """
+        Evaluate the WAIT condition until it holds or timeout_ms elapses.  The memory lock is only held for
+        each evaluation so other sessions keep running while this one waits.
+        """
+        deadline = time.monotonic() + timeout_ms / 1000.0
+        checks = 0
+        while True:
+            with self.lock:
+                current = self.read_word(adr) & 0xFFFFFFFF
+            checks += 1
+            if current & mask == value:
+                return STATUS_OK, word2.pack(current, checks)
+            if time.monotonic() >= deadline:
+                return STATUS_ERROR, b"TIMEOUT"
+            time.sleep(0.0005)
+
+    def execute(self, op, payload):
+        """
+        Execute a single decoded command.
+        @return: (status, body) of the response frame.
+        """
+        if op == OP_WAIT:
+            try:
+                return self.wait(*word4.unpack(payload))
+            except struct.error as e:
+                return STATUS_ERROR, str(e).encode("utf-8")
+        try:
+            with self.lock:
+                if op == OP_MW:
+                    adr, data = word2.unpack(payload)
+                    self.write_word(adr, data)
+                    return STATUS_OK, b""
+                elif op == OP_MR:
+                    adr, = word.unpack(payload)
+                    return STATUS_OK, word.pack(self.read_word(adr) & 0xFFFFFFFF)
+                elif op == OP_MWB:
+                    adr, = word.unpack_from(payload)
+                    for i, b in enumerate(payload[word.size:]):
+                        self.write_word(adr + i, b)
+                    return STATUS_OK, b""
+                elif op == OP_MRB:
+                    adr, count = word2.unpack(payload)
+                    return STATUS_OK, bytes(self.read_word(adr + i) & 0xFF for i in range(count))
+                elif op == OP_STARTSIM:
+                    self.board = payload.decode("utf-8")
+                    self.sim = SimulatedBoard.create(self.board)
+                    return STATUS_OK, "Simulation of {:s} has started.".format(self.board).encode("utf-8")
+                elif op == OP_STOPSIM:
+                    self.board = None
+                    return STATUS_OK, b"Simulation has stopped."
+                elif op == OP_SIMSTATUS:
+                    if self.board is None:
+                        return STATUS_OK, b"Simulation is STOPPED."
+                    return STATUS_OK, b"Simulation is RUNNING."
+                elif op == OP_EXIT:
+                    return STATUS_OK, b"Goodbye"
+                else:
+                    return STATUS_UNSUPPORTED, b""
+        except (struct.error, UnicodeDecodeError) as e:
+            self.logger.debug("Malformed {:s} command: {:s}\n".format(opnames.get(op, str(op)), str(e)))
+            return STATUS_ERROR, str(e).encode("utf-8")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3:
+        register_board(sys.argv[2], sys.argv[3])
+    server = ATEBinaryServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 5024)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,530 @@
+#!/usr/bin/env python
+"""
+    In-process model of the P2654Simulations UUT boards.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    SimulatedBoard implements the virtual Wishbone memory map of the P2654Simulations framework inside this
+    process: the two JTAG controllers with their vector buffers and control/status registers at 0x1000 and
+    0x3000, the GPIO controller at 0x1800, the I2C host at 0x1C00 and the SPI host at 0x1C30.  Each JTAG
+    controller drives a TAP state machine and a scan chain model built from the same SIT JSON description the
+    Builder loads, so vectors produced by the model are answered the way the board would answer them.
+    Addresses outside the map behave as plain memory.
+
+    ATELocalClient exposes a SimulatedBoard through the transport client API of ATE, so selecting the
+    "local" transport runs the whole stack without sockets or a separate Simulator process.  Boards are
+    made known to STARTSIM with register_board(name, sit_file).  A board name without a SIT file gets
+    empty chains, which loop TDI back to TDO.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import json
+import logging
+from collections import deque
+from p2654model2.instrument.instrument import instrumented
+
+
+# Same encodings as drivers.ate.atesim (JTAG_Ctrl_Master and tapsim of P2654Simulations)
+TEST_LOGIC_RESET, RUN_TEST_IDLE, SELECT_DR, CAPTURE_DR, SHIFT_DR, EXIT1_DR, PAUSE_DR, \
+    EXIT2_DR, UPDATE_DR, SELECT_IR, CAPTURE_IR, SHIFT_IR, EXIT1_IR, PAUSE_IR, EXIT2_IR, UPDATE_IR = range(16)
+SI_EXIT2_DR, SI_EXIT1_DR, SI_SHIFT_DR, SI_PAUSE_DR, SI_SELECT_IR, SI_UPDATE_DR, SI_CAPTURE_DR, SI_SELECT_DR, \
+    SI_EXIT2_IR, SI_EXIT1_IR, SI_SHIFT_IR, SI_PAUSE_IR, SI_RUN_TEST_IDLE, SI_UPDATE_IR, SI_CAPTURE_IR, \
+    SI_TEST_LOGIC_RESET = range(16)
+
+# tapsim encoding used by the second JTAG controller to the JTAG_Ctrl_Master encoding used by the model
+si_states = {
+    SI_EXIT2_DR: EXIT2_DR, SI_EXIT1_DR: EXIT1_DR, SI_SHIFT_DR: SHIFT_DR, SI_PAUSE_DR: PAUSE_DR,
+    SI_SELECT_IR: SELECT_IR, SI_UPDATE_DR: UPDATE_DR, SI_CAPTURE_DR: CAPTURE_DR, SI_SELECT_DR: SELECT_DR,
+    SI_EXIT2_IR: EXIT2_IR, SI_EXIT1_IR: EXIT1_IR, SI_SHIFT_IR: SHIFT_IR, SI_PAUSE_IR: PAUSE_IR,
+    SI_RUN_TEST_IDLE: RUN_TEST_IDLE, SI_UPDATE_IR: UPDATE_IR, SI_CAPTURE_IR: CAPTURE_IR,
+    SI_TEST_LOGIC_RESET: TEST_LOGIC_RESET,
+}
+
+# SIT files of the boards STARTSIM may be asked for
+boards = {}
+
+
+def register_board(name, sit_file):
+    """
+    Associate a board name used with STARTSIM with the SIT JSON file describing it.
+    """
+    boards[name] = sit_file
+
+
+class TAPStateMachine:
+    # state: (next state on TMS=0, next state on TMS=1)
+    transitions = {
+        TEST_LOGIC_RESET: (RUN_TEST_IDLE, TEST_LOGIC_RESET),
+        RUN_TEST_IDLE: (RUN_TEST_IDLE, SELECT_DR),
+        SELECT_DR: (CAPTURE_DR, SELECT_IR),
+        CAPTURE_DR: (SHIFT_DR, EXIT1_DR),
+        SHIFT_DR: (SHIFT_DR, EXIT1_DR),
+        EXIT1_DR: (PAUSE_DR, UPDATE_DR),
+        PAUSE_DR: (PAUSE_DR, EXIT2_DR),
+        EXIT2_DR: (SHIFT_DR, UPDATE_DR),
+        UPDATE_DR: (RUN_TEST_IDLE, SELECT_DR),
+        SELECT_IR: (CAPTURE_IR, TEST_LOGIC_RESET),
+        CAPTURE_IR: (SHIFT_IR, EXIT1_IR),
+        SHIFT_IR: (SHIFT_IR, EXIT1_IR),
+        EXIT1_IR: (PAUSE_IR, UPDATE_IR),
+        PAUSE_IR: (PAUSE_IR, EXIT2_IR),
+        EXIT2_IR: (SHIFT_IR, UPDATE_IR),
+        UPDATE_IR: (RUN_TEST_IDLE, SELECT_DR),
+    }
+    paths = {}
+
+    def __init__(self, chain):
+        """
+        @param chain: JTAGChainModel notified when the state machine enters a capture, update or reset state.
+        """
+        self.chain = chain
+        self.state = TEST_LOGIC_RESET
+        self.tck = 0
+
+    def clock(self, tms):
+        self.state = TAPStateMachine.transitions[self.state][tms]
+        self.tck += 1
+        if self.state == CAPTURE_DR:
+            self.chain.capture(False)
+        elif self.state == CAPTURE_IR:
+            self.chain.capture(True)
+        elif self.state == UPDATE_DR:
+            self.chain.update(False)
+        elif self.state == UPDATE_IR:
+            self.chain.update(True)
+        elif self.state == TEST_LOGIC_RESET:
+            self.chain.reset()
+        return self.state
+
+    def goto(self, state):
+        """
+        Move to state along the shortest TMS path.
+        """
+        for tms in TAPStateMachine.path(self.state, state):
+            self.clock(tms)
+
+    @staticmethod
+    def path(start, end):
+        key = (start, end)
+        if key not in TAPStateMachine.paths:
+            # Breadth first search over the 16 states; results are shared by every instance
+            prev = {start: None}
+            q = deque([start])
+            while len(q):
+                s = q.popleft()
+                if s == end:
+                    break
+                for tms in (0, 1):
+                    n = TAPStateMachine.transitions[s][tms]
+                    if n not in prev:
+                        prev[n] = (s, tms)
+                        q.append(n)
+            tmsl = []
+            s = end
+            while s != start:
+                s, tms = prev[s]
+                tmsl.insert(0, tms)
+            TAPStateMachine.paths[key] = tmsl
+        return TAPStateMachine.paths[key]
+
+
+class TAPDeviceModel:
+    # Registers the device never updates from a scan
+    read_only = ("BYPASS", "IDCODE")
+
+    def __init__(self, name, ir_size, ir_reset, instructions, registers, ir_capture=0x1):
+        """
+        @param name: Name of the TAP in the SIT.
+        @param ir_size: Length of the instruction register.
+        @param ir_reset: Instruction loaded by Test-Logic-Reset.
+        @param instructions: Dictionary of opcode to selected data register name.
+        @param registers: Dictionary of data register name to [size, value].
+        @param ir_capture: Value loaded into the instruction register by Capture-IR.
+        """
+        self.name = name
+        self.ir_size = ir_size
+        self.ir_reset = ir_reset
+        self.ir_capture = ir_capture
+        self.ir = ir_reset
+        self.instructions = instructions
+        self.registers = registers
+        if "BYPASS" not in self.registers:
+            self.registers["BYPASS"] = [1, 0]
+
+    def selected(self):
+        name = self.instructions.get(self.ir, "BYPASS")
+        return name if name in self.registers else "BYPASS"
+
+    def capture(self, ir):
+        """
+        @return: (size, value) loaded into the shift path by Capture-IR or Capture-DR.
+        """
+        if ir:
+            return self.ir_size, self.ir_capture
+        size, value = self.registers[self.selected()]
+        if self.selected() == "BYPASS":
+            return size, 0
+        return size, value
+
+    def size(self, ir):
+        if ir:
+            return self.ir_size
+        return self.registers[self.selected()][0]
+
+    def update(self, ir, value):
+        if ir:
+            self.ir = value
+        elif self.selected() not in TAPDeviceModel.read_only:
+            self.registers[self.selected()][1] = value
+
+    def reset(self):
+        self.ir = self.ir_reset
+
+
+class JTAGChainModel:
+    def __init__(self, devices):
+        """
+        @param devices: TAPDeviceModel list ordered from TDI to TDO.
+        """
+        self.devices = devices
+        self.shift_value = 0
+        self.shift_length = 0
+
+    def capture(self, ir):
+        # The device nearest TDO occupies the least significant bits since its bits leave first
+        value = 0
+        offset = 0
+        for dev in reversed(self.devices):
+            size, v = dev.capture(ir)
+            value |= (v & ((1 << size) - 1)) << offset
+            offset += size
+        self.shift_value = value
+        self.shift_length = offset
+
+    def shift(self, tdi, count):
+        """
+        Shift count bits of tdi (least significant bit first) through the chain.
+        @return: The count bits shifted out of TDO.
+        """
+        combined = self.shift_value | (tdi << self.shift_length)
+        self.shift_value = (combined >> count) & ((1 << self.shift_length) - 1)
+        return combined & ((1 << count) - 1)
+
+    def update(self, ir):
+        value = self.shift_value
+        for dev in reversed(self.devices):
+            size = dev.size(ir)
+            dev.update(ir, value & ((1 << size) - 1))
+            value >>= size
+
+    def reset(self):
+        for dev in self.devices:
+            dev.reset()
+
+
+class JTAGControllerModel:
+    buffer_size = 0x400
+
+    def __init__(self, chain, states=None):
+        """
+        @param chain: JTAGChainModel the controller drives.
+        @param states: Dictionary translating the state codes written to the controller, None when they already
+                       use the JTAG_Ctrl_Master encoding.
+        """
+        self.chain = chain
+        self.tap = TAPStateMachine(chain)
+        self.states = states
+        self.buffer = bytearray(JTAGControllerModel.buffer_size)
+        # start state, end state, bit count, control, status, command
+        self.regs = [0] * 6
+
+    def read(self, offset):
+        if offset < JTAGControllerModel.buffer_size:
+            return self.buffer[offset]
+        reg = offset - JTAGControllerModel.buffer_size
+        return self.regs[reg] if reg < len(self.regs) else 0
+
+    def write(self, offset, data):
+        if offset < JTAGControllerModel.buffer_size:
+            self.buffer[offset] = data & 0xFF
+            return
+        reg = offset - JTAGControllerModel.buffer_size
+        if reg == 4 or reg >= len(self.regs):
+            return  # status is read only
+        self.regs[reg] = data
+        if reg == 3 and data & 0x1:
+            self.__run()
+
+    def __state(self, code):
+        code &= 0xF
+        return self.states[code] if self.states is not None else code
+
+    def __run(self):
+        # The whole operation completes before the control write returns, so status always reads idle
+        start = self.__state(self.regs[0])
+        end = self.__state(self.regs[1])
+        count = self.regs[2] & 0xFFFF
+        if start in (SHIFT_DR, SHIFT_IR):
+            nbytes = (count + 7) // 8
+            self.tap.goto(start)
+            tdi = int.from_bytes(self.buffer[:nbytes], "little") & ((1 << count) - 1)
+            tdo = self.chain.shift(tdi, count)
+            self.buffer[:nbytes] = tdo.to_bytes(nbytes, "little")
+            self.tap.goto(end)
+        elif start == TEST_LOGIC_RESET:
+            for i in range(count):
+                self.tap.clock(1)
+            self.tap.goto(end)
+        else:
+            self.tap.goto(start)
+            for i in range(count):
+                self.tap.clock(0 if start in (RUN_TEST_IDLE, PAUSE_DR, PAUSE_IR) else 1)
+            self.tap.goto(end)
+        self.regs[4] = 0
+
+
+class I2CModel:
+    EXECUTE = 0x01
+    WRITE = 0x02
+    START = 0x08
+    STOP = 0x10
+
+    def __init__(self):
+        # device address: {register index: value}; every address answers as a register file
+        self.devices = {}
+        self.regs = [0] * 4
+        self.device = None
+        self.index = None
+
+    def read(self, offset):
+        return self.regs[offset]
+
+    def write(self, offset, data):
+        if offset == 3:
+            return  # status is read only
+        self.regs[offset] = data & 0xFF
+        if offset == 2 and data & I2CModel.EXECUTE:
+            self.__execute(data)
+
+    def __execute(self, control):
+        tx = self.regs[0]
+        if control & I2CModel.START:
+            self.device = self.devices.setdefault(tx >> 1, {})
+            if not tx & 0x1:
+                self.index = None
+        elif control & I2CModel.WRITE:
+            if self.index is None:
+                self.index = tx
+            else:
+                self.device[self.index] = tx
+                self.index = (self.index + 1) & 0xFF
+        else:
+            self.regs[1] = self.device.get(self.index, 0) if self.device is not None else 0xFF
+            if self.index is not None:
+                self.index = (self.index + 1) & 0xFF
+        if control & I2CModel.STOP:
+            self.device = None
+        self.regs[3] = 0  # not busy, acknowledged
+
+
+@instrumented("driver")
+class SimulatedBoard:
+    def __init__(self, name, jtag_chains=None):
+        """
+        @param name: Name of the board as given to STARTSIM.
+        @param jtag_chains: Up to two JTAGChainModel for the controllers at 0x1000 and 0x3000.
+        """
+        self.logger = logging.getLogger('drivers.ate.atelocal.SimulatedBoard')
+        self.name = name
+        chains = list(jtag_chains) if jtag_chains is not None else []
+        while len(chains) < 2:
+            chains.append(JTAGChainModel([]))
+        self.jtag = JTAGControllerModel(chains[0])
+        self.jtag2 = JTAGControllerModel(chains[1], si_states)
+        self.gpio = 0
+        self.i2c = I2CModel()
+        self.spi = 0
+        self.memory = {}
+
+    @staticmethod
+    def create(name):
+        """
+        Build the board registered under name, or a board with empty chains if none was registered.
+        """
+        if name in boards:
+            return SimulatedBoard.from_sit(name, boards[name])
+        return SimulatedBoard(name)
+
+    @staticmethod
+    def from_sit(name, sit_file):
+        with open(sit_file, "r") as f:
+            sit = json.load(f)
+        chains = []
+        SimulatedBoard.__find_chains(sit, chains)
+        return SimulatedBoard(name, chains)
+
+    @staticmethod
+    def __find_chains(node, chains):
+        # Each JTAG CONTROLLER in the SIT is one chain; its TAPTransform LINKERs are the devices on it
+        if isinstance(node, list):
+            for n in node:
+                SimulatedBoard.__find_chains(n, chains)
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                if key == "CONTROLLER" and value.get("hproto") == "JTAG":
+                    devices = []
+                    SimulatedBoard.__find_taps(value.get("children", []), devices)
+                    chains.append(JTAGChainModel(devices))
+                else:
+                    SimulatedBoard.__find_chains(value, chains)
+
+    @staticmethod
+    def __find_taps(node, devices):
+        if isinstance(node, list):
+            for n in node:
+                SimulatedBoard.__find_taps(n, devices)
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                if key == "LINKER" and value.get("transform") == "TAPTransform":
+                    devices.append(SimulatedBoard.__tap_device(value))
+                elif isinstance(value, (list, dict)):
+                    SimulatedBoard.__find_taps(value, devices)
+
+    @staticmethod
+    def __tap_device(tap):
+        ir_size = 0
+        ir_reset = 0
+        instructions = {}
+        registers = {}
+        for child in tap.get("children", []):
+            if "REGISTER" in child:
+                ir_size = child["REGISTER"]["size"]
+                ir_reset = int(child["REGISTER"].get("safe", "0"), 0)
+            mux = child.get("LINKER")
+            if mux is not None and mux.get("transform") == "TAPMux":
+                for table in mux.get("selector", {}).get("Table", []):
+                    for opcode, reg in table.items():
+                        instructions[int(opcode, 0)] = reg
+                for c in mux.get("children", []):
+                    if "REGISTER" in c:
+                        reg = c["REGISTER"]
+                        registers[reg["name"]] = [reg["size"], int(reg.get("safe", "0"), 0)]
+        # The model reads the captured IR back as an opcode of the TAPMux table, so the device captures the
+        # value of its IRCAPTURE register; IEEE 1149.1 only fixes the two least significant bits to 01
+        ir_capture = registers["IRCAPTURE"][1] if "IRCAPTURE" in registers else 0x1
+        return TAPDeviceModel(tap["name"], ir_size, ir_reset, instructions, registers, ir_capture)
+
+    def read(self, adr):
+        if 0x1000 <= adr < 0x1800:
+            return self.jtag.read(adr - 0x1000)
+        elif adr == 0x1800:
+            return self.gpio
+        elif 0x1C00 <= adr < 0x1C04:
+            return self.i2c.read(adr - 0x1C00)
+        elif adr == 0x1C30 or adr == 0x1C31:
+            return self.spi
+        elif 0x3000 <= adr < 0x3800:
+            return self.jtag2.read(adr - 0x3000)
+        return self.memory.get(adr, 0)
+
+    def write(self, adr, data):
+        if 0x1000 <= adr < 0x1800:
+            self.jtag.write(adr - 0x1000, data)
+        elif adr == 0x1800:
+            self.gpio = data & 0xFFFFFFFF
+        elif 0x1C00 <= adr < 0x1C04:
+            self.i2c.write(adr - 0x1C00, data)
+        elif adr == 0x1C30:
+            self.spi = data  # the SPI host loops its transmit register back to receive
+        elif 0x3000 <= adr < 0x3800:
+            self.jtag2.write(adr - 0x3000, data)
+        else:
+            self.memory[adr] = data
+
+    def write_block(self, adr, data):
+        for i, b in enumerate(data):
+            self.write(adr + i, b)
+
+    def read_block(self, adr, count):
+        return bytearray(self.read(adr + i) & 0xFF for i in range(count))
+
+
+@instrumented("driver")
+class ATELocalClient:
+    """
+    Transport client API of ATE served by an in-process SimulatedBoard.  Every command completes before it
+    returns, so there is never anything in flight.
+    """
+    def __init__(self, pipeline_depth=1):
+        self.pipeline_depth = pipeline_depth
+        self.board = None
+
+    def connect(self, ip, port):
+        pass
+
+    def drain(self):
+        return []
+
+    def close(self):
+        self.board = None
+
+    def start_sim(self, board):
+        self.board = SimulatedBoard.create(board)
+        return "Simulation of {:s} has started.\r\nOK\r\n".format(board)
+
+    def stop_sim(self):
+        self.board = None
+        return "Simulation has stopped.\r\nOK\r\n"
+
+    def sim_status(self):
+        if self.board is None:
+            return "Simulation is STOPPED.\r\nOK\r\n"
+        return "Simulation is RUNNING.\r\nOK\r\n"
+
+    def mw(self, adr, data):
+        self.board.write(adr, data)
+        return "OK\r\n"
+
+    def mr(self, adr):
+        return "OK\r\n", self.board.read(adr)
+
+    def mwb(self, adr, data, stream=True):
+        self.board.write_block(adr, data)
+        return "OK\r\n"
+
+    def mrb(self, adr, count):
+        return "OK\r\n", self.board.read_block(adr, count)
+
+    def wait(self, adr, mask, value, timeout_ms):
+        current = self.board.read(adr)
+        if current & mask != value:
+            # Nothing else can change the board while this call waits, so the condition can never be met
+            return "ERROR TIMEOUT\r\n", None, None
+        return "OK\r\n", current, 1
+
+    def exit(self):
+        return "Goodbye\r\n"
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+"""
+    Counters and latency histograms for the ATE driver layer.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    LatencyHistogram records durations in nanoseconds into log-linear buckets in the manner of an HDR histogram:
+    every power of two is split into the same number of linear sub-buckets, so the relative error of any
+    recorded value is bounded (under 1% with the default 7 significant bits) whatever its magnitude, while
+    recording costs a bit_length(), a shift and a dictionary increment.  Metrics groups the named counters and
+    histograms of one driver.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+from time import perf_counter_ns
+import threading
+
+
+class LatencyHistogram:
+    def __init__(self, sub_bits=7):
+        """
+        @param sub_bits: Significant bits kept for every value; each power of two is split in 2**(sub_bits-1)
+                         buckets.
+        """
+        self.sub_bits = sub_bits
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value):
+        """
+        Add one value, normally a duration in nanoseconds.
+        """
+        value = int(value)
+        if value < 0:
+            value = 0
+        shift = value.bit_length() - self.sub_bits
+        if shift <= 0:
+            index = value
+        else:
+            index = (shift << self.sub_bits) + (value >> shift)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def __bucket_value(self, index):
+        # Highest value the bucket holds, so percentiles never under-report a latency
+        shift = index >> self.sub_bits
+        if shift == 0:
+            return index
+        low = (index & ((1 << self.sub_bits) - 1)) << shift
+        return low + (1 << shift) - 1
+
+    def percentile(self, p):
+        """
+        @param p: Percentile from 0 to 100.
+        @return: Value below or at which p percent of the recorded values lie, 0 if nothing was recorded.
+        """
+        if self.count == 0:
+            return 0
+        rank = max(1, int(round(self.count * p / 100.0)))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.__bucket_value(index), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def merge(self, other):
+        """
+        Add the values recorded in another histogram with the same sub_bits.
+        """
+        if other.sub_bits != self.sub_bits:
+            raise ValueError("Cannot merge histograms of {:d} and {:d} significant bits.".format(
+                self.sub_bits, other.sub_bits))
+        for index, n in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + n
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+    def reset(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def summary(self):
+        """
+        @return: Dictionary with count, min, mean, p50, p90, p99, p999 and max.
+        """
+        return {"count": self.count, "min": 0 if self.min is None else self.min, "mean": self.mean(),
+                "p50": self.percentile(50), "p90": self.percentile(90), "p99": self.percentile(99),
+                "p999": self.percentile(99.9), "max": self.max}
+
+
+class Metrics:
+    """
+    Named counters and latency histograms of one driver.  Histograms are in nanoseconds.  Updates come from
+    every thread driving the ATE session, not all of them holding the session lock, so they take a lock of
+    their own.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    @staticmethod
+    def now():
+        return perf_counter_ns()
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self, name, value):
+        with self.lock:
+            h = self.histograms.get(name)
+            if h is None:
+                h = self.histograms[name] = LatencyHistogram()
+            h.record(value)
+
+    def elapsed(self, name, start):
+        """
+        Record the time since start, a value of now(), in histogram name.
+        """
+        self.record(name, perf_counter_ns() - start)
+
+    def get_counter(self, name):
+        with self.lock:
+            return self.counters.get(name, 0)
+
+    def get_histogram(self, name):
+        """
+        @return: Copy of the LatencyHistogram called name or None if nothing was recorded in it.
+        """
+        with self.lock:
+            h = self.histograms.get(name)
+            if h is None:
+                return None
+            copy = LatencyHistogram(h.sub_bits)
+            copy.merge(h)
+            return copy
+
+    def snapshot(self):
+        """
+        @return: Dictionary with the counters and the summary() of each histogram.
+        """
+        with self.lock:
+            return {"counters": dict(self.counters),
+                    "histograms": {name: h.summary() for name, h in self.histograms.items()}}
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def dump(self, logger):
+        """
+        Log the counters and histogram summaries at INFO level, latencies in microseconds.
+        """
+        snapshot = self.snapshot()
+        counters = snapshot["counters"]
+        histograms = snapshot["histograms"]
+        for name in sorted(counters):
+            logger.info("{:s} {:s} = {:d}".format(self.name, name, counters[name]))
+        for name in sorted(histograms):
+            s = histograms[name]
+            logger.info("{:s} {:s}: n={:d} min={:.1f} mean={:.1f} p50={:.1f} p90={:.1f} p99={:.1f} "
+                        "p99.9={:.1f} max={:.1f} us".format(self.name, name, s["count"], s["min"] / 1e3,
+                                                            s["mean"] / 1e3, s["p50"] / 1e3, s["p90"] / 1e3,
+                                                            s["p99"] / 1e3, s["p999"] / 1e3, s["max"] / 1e3))
@@ -39,12 +39,22 @@ __version__ = "0.0.1"
 
 
 import logging
-from autologging import traced
+import socket
 import threading
 from subprocess import Popen, PIPE
 
-import telnetlib
-from time import sleep
+try:
+    import telnetlib
+except ImportError:
+    # telnetlib was removed from the standard library in Python 3.13; use the binary transport there
+    telnetlib = None
+from collections import deque
+from time import sleep, monotonic
+from drivers.ate.atebinary import ATEBinaryClient
+from drivers.ate.atelocal import ATELocalClient
+from drivers.ate.atetrace import ATERecordingClient, ATEReplayClient
+from drivers.ate.atemetrics import Metrics
+from p2654model2.instrument.instrument import instrumented
 # from hdl.hosts.jtaghost.JTAG_Ctrl_Master import SHIFT_DR, SHIFT_IR, RUN_TEST_IDLE, TEST_LOGIC_RESET
 # from hdl.hosts.jtaghost.tapsim import *
 # The following states imported from hdl.hosts.jtaghost.JTAG_Ctrl_Master of P2654Simulations project:
@@ -61,25 +71,33 @@ simip = "127.0.0.1"
 simport = 5023
 
 
-@traced
+@instrumented("driver")
 class ATETelnetClient:
-    def __init__(self):
+    def __init__(self, pipeline_depth=1):
+        """
+        @param pipeline_depth: Maximum number of commands allowed in flight on the link.  A depth of 1 keeps the
+                               strict send-then-wait behavior.  Larger depths let post() stream commands ahead
+                               of their responses, which are matched in order when the window is drained.
+        """
         self.timeout = 60
         self.ip = None
         self.port = None
         self.tn_inst = None
-        
+        self.pipeline_depth = max(1, pipeline_depth)
+        self.in_flight = deque()
+        # Thread that posted the command -> its failed commands, until that thread drains them
+        self.failed = {}
+
     def connect(self, ip, port):
-        self.tn_inst = telnetlib.Telnet(ip, port)
-        sleep(0.05)
-        s = b"EXIT\n"
-        self.tn_inst.write(s)
-        resp = self.tn_inst.read_all()
-        sleep(0.05)
-        self.tn_inst.close()
-        sleep(0.05)
-        self.tn_inst.open(ip, port)
-        sleep(0.05)
+        if telnetlib is None:
+            raise AssertionError("telnetlib is not available in this Python.  Use the binary ATE transport.")
+        self.ip = ip
+        self.port = port
+        self.tn_inst = telnetlib.Telnet(ip, port, self.timeout)
+        # Streamed commands are small; do not let Nagle hold them back waiting for the previous response's ACK
+        self.tn_inst.get_socket().setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Synchronize with the server: whatever it sent on connect is consumed along with this first response
+        self.request("SIMSTATUS\n")
 
     def read_until(self, s):
         """
@@ -93,6 +111,53 @@ class ATETelnetClient:
 
     def read_all(self):
         return self.tn_inst.read_all().decode('ascii')
+
+    def post(self, s, expect="OK\r\n"):
+        """
+        Send a command whose response is not needed by the caller yet.  When pipelining is disabled the response
+        is read immediately and returned, otherwise the command joins the in-flight window and None is returned.
+        @param s: The command to be sent to the Simulator.
+        @param expect: The terminator of the response to this command.
+        """
+        if self.pipeline_depth == 1:
+            self.__complete_all()
+            self.write(s)
+            return self.read_until(expect)
+        while len(self.in_flight) >= self.pipeline_depth:
+            self.__complete_oldest()
+        self.write(s)
+        self.in_flight.append((s, expect, threading.get_ident()))
+        return None
+
+    def request(self, s, expect="OK\r\n"):
+        """
+        Send a command whose response is needed now.  Any in-flight commands are completed first so the response
+        returned belongs to this command; their failures are kept for drain().
+        @param s: The command to be sent to the Simulator.
+        @param expect: The terminator of the response to this command.
+        """
+        self.__complete_all()
+        self.write(s)
+        return self.read_until(expect)
+
+    def drain(self):
+        """
+        Collect the responses of every in-flight command in the order the commands were sent.
+        @return: List of (command, response) pairs for the commands posted by the calling thread that did not
+                 complete with OK.  Failures of commands posted by other threads are kept for their drain().
+        """
+        self.__complete_all()
+        return self.failed.pop(threading.get_ident(), [])
+
+    def __complete_all(self):
+        while len(self.in_flight):
+            self.__complete_oldest()
+
+    def __complete_oldest(self):
+        s, expect, owner = self.in_flight.popleft()
+        resp = self.read_until(expect)
+        if not resp.endswith(expect) or resp.find("ERROR") >= 0:
+            self.failed.setdefault(owner, []).append((s, resp))
     
     def write(self, s):
         """
@@ -107,16 +172,136 @@ class ATETelnetClient:
         """
         self.tn_inst.close()
 
+    def start_sim(self, board):
+        return self.request("STARTSIM {:s}\n".format(board))
+
+    def stop_sim(self):
+        return self.request("STOPSIM\n")
+
+    def sim_status(self):
+        return self.request("SIMSTATUS\n")
+
+    def mw(self, adr, data):
+        return self.post("MW 0x{:X} 0x{:X}\n".format(adr, data))
+
+    def mr(self, adr):
+        """
+        @return: (response, value) where value is parsed from the hex text of the response.
+        """
+        resp = self.request("MR 0x{:X}\n".format(adr))
+        return resp, int(resp.split()[0], 16)
+
+    def mwb(self, adr, data, stream=True):
+        """
+        @param stream: True to post the command into the in-flight window, False to wait for its response.
+        """
+        cmd = "MWB 0x{:X} 0x{:X} {:s}\n".format(adr, len(data), bytes(data).hex().upper())
+        if stream:
+            return self.post(cmd)
+        return self.request(cmd)
 
-@traced
+    def mrb(self, adr, count):
+        """
+        @return: (response, block) where block is None if the response does not carry the data.
+        """
+        resp = self.request("MRB 0x{:X} 0x{:X}\n".format(adr, count))
+        if resp.find("OK") < 0 or resp.find("ERROR") >= 0 or resp.find("Unknown") >= 0:
+            return resp, None
+        return resp, bytearray.fromhex(resp.split()[0]) if count else bytearray()
+
+    def wait(self, adr, mask, value, timeout_ms):
+        """
+        Block in the Simulator until (mem[adr] & mask) == value or timeout_ms elapses.
+        @return: (response, value, checks) where checks is the number of times the Simulator evaluated the
+                 condition.  value and checks are None if the command failed or timed out.
+        """
+        resp = self.request("WAIT 0x{:X} 0x{:X} 0x{:X} 0x{:X}\n".format(adr, mask, value, timeout_ms))
+        if resp.find("ERROR") >= 0 or resp.find("Unknown") >= 0:
+            return resp, None, None
+        slist = resp.split()
+        return resp, int(slist[0], 16), int(slist[1], 16)
+
+    def exit(self):
+        self.__complete_all()
+        self.write("EXIT\n")
+        return self.read_all()
+
+
+class _PerThread:
+    """
+    ATE attribute holding a separate value for every thread.
+    """
+    def __init__(self, default):
+        self.default = default
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner):
+        if obj is None:
+            return self
+        return getattr(obj._local, self.name, self.default)
+
+    def __set__(self, obj, value):
+        setattr(obj._local, self.name, value)
+
+
+@instrumented("driver")
 class ATE:
-    def __init__(self, ip="127.0.0.1", port=5023):
+    # Results of the last transaction of the calling thread
+    resp = _PerThread("")
+    value = _PerThread(None)
+    block = _PerThread(None)
+    error = _PerThread(None)
+    last_polls = _PerThread(0)
+    last_polls_saved = _PerThread(0)
+
+    transports = {
+        "telnet": ATETelnetClient,
+        "binary": ATEBinaryClient,
+        "local": ATELocalClient,
+        "replay": ATEReplayClient,
+    }
+
+    def __init__(self, ip="127.0.0.1", port=5023, pipeline_depth=1, transport="telnet", trace_file=None):
+        """
+        @param transport: "telnet" for the ASCII command protocol, "binary" for the length-prefixed frames
+                          of drivers.ate.atebinary, "local" for the in-process SimulatedBoard of
+                          drivers.ate.atelocal or "replay" to serve a recorded session from trace_file.
+                          All carry the same command set.
+        @param trace_file: With the "replay" transport the trace to replay, otherwise when given every
+                           transaction of the session is recorded to this file (see drivers.ate.atetrace).
+        """
+        if transport == "replay" and trace_file is None:
+            raise ValueError("The replay transport needs a trace_file.")
+        if transport not in ATE.transports:
+            raise ValueError("Unknown ATE transport ({:s}).".format(str(transport)))
+        # Controllers applied from different threads share the session: the lock keeps their transactions
+        # whole on the link and each thread sees the results of its own transactions
+        self.lock = threading.RLock()
+        self._local = threading.local()
         self.tn_inst = None
         self.ip = ip
         self.port = port
-        self.resp = ""
-        self.value = None
-        self.error = None
+        self.pipeline_depth = pipeline_depth
+        self.transport = transport
+        self.trace_file = trace_file
+        # None until the first block transfer tells whether the Simulator supports MWB/MRB
+        self.block_mode = None
+        # None until the first wait_status() tells whether the Simulator supports WAIT
+        self.wait_mode = None
+        self.wait_timeout = 10.0
+        self.poll_min = 0.0001
+        self.poll_max = 0.01
+        self.poll_start = self.poll_min
+        self.stats = {"waits": 0, "polls": 0, "polls_saved": 0, "writes_skipped": 0}
+        # Last value written to each idempotent configuration register, None when unknown
+        self.shadow = {}
+        # Counters and latency histograms of this session and of the controllers driving it
+        self.metrics = Metrics("ATE")
+        self.metric_sources = [self.metrics]
+        self.logger = logging.getLogger('drivers.ate.atesim.ATE')
         self.process = None
         self.stdout = None
         self.stderr = None
@@ -150,77 +335,389 @@ class ATE:
     def connect(self, board):
         # Start up the simserver application in the background
         # Create the TelnetClient interface to the simserver
-        self.tn_inst = ATETelnetClient()
+        self.tn_inst = ATE.transports[self.transport](self.pipeline_depth)
+        if self.transport == "replay":
+            self.tn_inst.load(self.trace_file)
+        elif self.trace_file is not None:
+            self.tn_inst = ATERecordingClient(self.tn_inst, self.trace_file)
         # Connect to the simserver
         self.tn_inst.connect(self.ip, self.port)
         # self.resp = self.tn_inst.read_until("P2654> ")
         # Send command to start up the simulation of the prescribed board
-        self.tn_inst.write("STARTSIM {:s}\n".format(board))
         # self.resp = self.tn_inst.read_until("P2654> ")
-        self.resp = self.tn_inst.read_until("OK\r\n")
+        self.invalidate_shadow()
+        self.resp = self.tn_inst.start_sim(board)
         # return True if self.resp.find("OK") >= 0 else False
         return True if len(self.resp) >= 0 else False
 
+    def add_shadow(self, *adrs):
+        """
+        Declare registers whose writes are idempotent, so a write of the value they already hold can be skipped.
+        Registers with side effects on write, such as a start bit, must not be shadowed.
+        @param adrs: Wishbone addresses of the registers.
+        """
+        for adr in adrs:
+            self.shadow.setdefault(adr, None)
+
+    def invalidate_shadow(self, adr=None):
+        """
+        Forget the cached value of a shadowed register, or of all of them when adr is None, so the next write
+        goes to the Simulator.
+        """
+        if adr is None:
+            for a in self.shadow:
+                self.shadow[a] = None
+        elif adr in self.shadow:
+            self.shadow[adr] = None
+
     def write(self, adr, data):
-        self.tn_inst.write("MW 0x{:X} 0x{:X}\n".format(adr, data))
-        self.resp = self.tn_inst.read_until("OK\r\n")
-        return True if len(self.resp) >= 0 else False
+        with self.lock:
+            if adr in self.shadow:
+                if self.shadow[adr] == data:
+                    self.stats["writes_skipped"] += 1
+                    return True
+                self.shadow[adr] = data
+            # Writes stream ahead when pipelining is enabled; failures are reported by the next flush()
+            t = self.metrics.now()
+            try:
+                resp = self.tn_inst.mw(adr, data)
+            except Exception:
+                self.invalidate_shadow()
+                raise
+            self.metrics.elapsed("mw", t)
+            self.metrics.count("bytes_written", 4)
+            if resp is not None:
+                self.metrics.count("round_trips")
+                self.resp = resp
+                if resp.find("ERROR") >= 0:
+                    self.invalidate_shadow(adr)
+            return True if len(self.resp) >= 0 else False
 
     def read(self, adr):
-        self.tn_inst.write("MR 0x{:X}\n".format(adr))
-        try:
-            self.resp = self.tn_inst.read_until("OK\r\n")
-            slist = self.resp.split()
+        with self.lock:
+            # What the register reads back need not be what was written to it (GPIO input vs output)
+            self.invalidate_shadow(adr)
+            t = self.metrics.now()
+            self.metrics.count("round_trips")
             try:
-                self.value = int(slist[0], 16)
-            except ValueError as e:
+                try:
+                    self.resp, self.value = self.tn_inst.mr(adr)
+                except (ValueError, IndexError) as e:
+                    self.error = str(e)
+                    self.invalidate_shadow()
+                    return False
+            except TimeoutError as e:
                 self.error = str(e)
+                self.invalidate_shadow()
+                return False
+            self.metrics.elapsed("mr", t)
+            self.metrics.count("bytes_read", 4)
+            return True
+
+    def write_block(self, adr, data):
+        """
+        Write a contiguous block of bytes to the Wishbone memory starting at adr using a single MWB command.
+        @param adr: Starting Wishbone address of the block.
+        @param data: bytes or bytearray holding one byte per Wishbone address.
+        @return: True if the block was accepted, False if the Simulator does not support block transfers.
+        """
+        with self.lock:
+            if self.block_mode is False:
+                return False
+            for a in self.shadow:
+                if adr <= a < adr + len(data):
+                    self.shadow[a] = None
+            t = self.metrics.now()
+            if self.block_mode:
+                resp = self.tn_inst.mwb(adr, data)
+                self.metrics.elapsed("mwb", t)
+                self.metrics.count("bytes_written", len(data))
+                if resp is not None:
+                    self.metrics.count("round_trips")
+                    self.resp = resp
+                return True
+            # Support is unknown, so wait for this response in case the per-byte fallback is needed
+            self.resp = self.tn_inst.mwb(adr, data, stream=False)
+            self.metrics.count("round_trips")
+            if not self.__block_supported(self.resp):
+                return False
+            self.metrics.elapsed("mwb", t)
+            self.metrics.count("bytes_written", len(data))
+            return True
+
+    def read_block(self, adr, count):
+        """
+        Read a contiguous block of bytes from the Wishbone memory starting at adr using a single MRB command.
+        The data read is available from get_block().
+        @param adr: Starting Wishbone address of the block.
+        @param count: Number of bytes (Wishbone addresses) to read.
+        @return: True if the block was read, False if the Simulator does not support block transfers or on error.
+        """
+        with self.lock:
+            if self.block_mode is False:
+                return False
+            t = self.metrics.now()
+            self.metrics.count("round_trips")
+            try:
+                try:
+                    self.resp, block = self.tn_inst.mrb(adr, count)
+                except (ValueError, IndexError) as e:
+                    self.error = str(e)
+                    return False
+                if not self.__block_supported(self.resp):
+                    return False
+                self.block = block
+                if len(self.block) != count:
+                    self.error = "MRB returned {:d} bytes, expected {:d}.".format(len(self.block), count)
+                    return False
+            except TimeoutError as e:
+                self.error = str(e)
+                return False
+            self.metrics.elapsed("mrb", t)
+            self.metrics.count("bytes_read", count)
+            return True
+
+    def __block_supported(self, resp):
+        # Simulators predating MWB/MRB reject the command; remember that and use the per-byte path from now on.
+        if resp.find("OK") < 0 or resp.find("ERROR") >= 0 or resp.find("Unknown") >= 0:
+            self.block_mode = False
+            self.error = "Block transfers not supported: " + resp
+            return False
+        self.block_mode = True
+        return True
+
+    def flush(self):
+        """
+        Wait for every streamed command to complete.
+        @return: True if those posted by the calling thread completed with OK, False otherwise with the failures in get_error().
+        """
+        with self.lock:
+            t = self.metrics.now()
+            failed = self.tn_inst.drain()
+            self.metrics.elapsed("flush", t)
+            if len(failed):
+                # A streamed write that failed may have been to a shadowed register
+                self.invalidate_shadow()
+                self.error = "; ".join("{:s} -> {:s}".format(cmd.strip(), resp.strip()) for cmd, resp in failed)
+                return False
+            return True
+
+    def wait_ready(self, timeout=None):
+        """
+        Wait for the Simulator to report the simulation RUNNING, polling SIMSTATUS with exponential backoff.
+        @param timeout: Seconds to wait before giving up, wait_timeout if None.
+        @return: True once running, False on timeout with the reason in get_error().
+        """
+        deadline = monotonic() + (self.wait_timeout if timeout is None else timeout)
+        delay = self.poll_min
+        while not self.sim_status():
+            if monotonic() >= deadline:
+                self.error = "Simulation not running: " + self.resp
+                return False
+            sleep(delay)
+            delay = min(delay * 2, self.poll_max)
+        return True
+
+    def wait_status(self, adr, mask, value, timeout=None):
+        """
+        Wait until (mem[adr] & mask) == value.  The Simulator WAIT command is used when supported so completion
+        costs a single round trip.  Otherwise the register is polled with exponential backoff.
+        The MR polls issued and the polls saved by WAIT are kept in last_polls/last_polls_saved and accumulated
+        in get_stats().
+        @param adr: Wishbone address of the status register.
+        @param mask: Bits of the register to compare.
+        @param value: Value the masked register must reach.
+        @param timeout: Seconds to wait before giving up, wait_timeout if None.
+        @return: True once the condition holds, False on timeout or error with the reason in get_error().
+        """
+        if timeout is None:
+            timeout = self.wait_timeout
+        self.last_polls = 0
+        self.last_polls_saved = 0
+        t = self.metrics.now()
+        if self.wait_mode is not False:
+            self.metrics.count("round_trips")
+            with self.lock:
+                try:
+                    self.resp, current, checks = self.tn_inst.wait(adr, mask, value, int(timeout * 1000))
+                except (ValueError, IndexError) as e:
+                    self.error = str(e)
+                    return False
+                except TimeoutError as e:
+                    self.error = str(e)
+                    return False
+                if current is not None:
+                    self.wait_mode = True
+                    self.value = current
+                    # Every condition check the Simulator made would otherwise have been an MR round trip
+                    self.last_polls_saved = max(0, checks - 1)
+                    self.stats["waits"] += 1
+                    self.stats["polls_saved"] += self.last_polls_saved
+                    self.metrics.elapsed("wait_status", t)
+                    return True
+            if self.resp.find("TIMEOUT") >= 0:
+                self.wait_mode = True
+                self.error = "Timed out waiting for 0x{:X} & 0x{:X} == 0x{:X}.".format(adr, mask, value)
                 return False
-        except TimeoutError as e:
-            self.error = str(e)
+            # Simulators predating WAIT reject it; poll from now on
+            self.wait_mode = False
+        if not self.__poll_status(adr, mask, value, monotonic() + timeout):
             return False
+        self.metrics.elapsed("wait_status", t)
         return True
 
+    def __poll_status(self, adr, mask, value, deadline):
+        delay = self.poll_start
+        while True:
+            self.last_polls += 1
+            with self.lock:
+                self.stats["polls"] += 1
+                self.metrics.count("status_polls")
+            if not self.read(adr):
+                return False
+            if self.value & mask == value:
+                # Start the next wait near the interval this one needed instead of from the minimum
+                self.poll_start = max(self.poll_min, delay / 4)
+                return True
+            if monotonic() >= deadline:
+                self.error = "Timed out waiting for 0x{:X} & 0x{:X} == 0x{:X}.".format(adr, mask, value)
+                return False
+            sleep(delay)
+            delay = min(delay * 2, self.poll_max)
+
+    def get_stats(self):
+        """
+        @return: Dictionary with the number of WAIT completions (waits), MR status polls issued (polls),
+                 status polls avoided by WAIT (polls_saved) and MW skipped by the shadow cache (writes_skipped).
+        """
+        return dict(self.stats)
+
+    def add_metrics(self, metrics):
+        """
+        Include the Metrics of a controller driving this session in get_metrics() and the dump at close().
+        """
+        if metrics not in self.metric_sources:
+            self.metric_sources.append(metrics)
+
+    def get_metrics(self, name=None):
+        """
+        @param name: Name of one source (ATE, JTAGController, ...), all of them if None.
+        @return: Dictionary of source name to its Metrics.snapshot(), or the snapshot of the named source.
+                 Latencies are in nanoseconds.
+        """
+        if name is not None:
+            for m in self.metric_sources:
+                if m.name == name:
+                    return m.snapshot()
+            return None
+        return {m.name: m.snapshot() for m in self.metric_sources}
+
+    def get_histogram(self, source, name):
+        """
+        @return: Copy of the LatencyHistogram called name of the source Metrics, None if nothing was recorded.
+        """
+        for m in self.metric_sources:
+            if m.name == source:
+                return m.get_histogram(name)
+        return None
+
+    def reset_metrics(self):
+        for m in self.metric_sources:
+            m.reset()
+
+    def dump_metrics(self):
+        for m in self.metric_sources:
+            m.dump(self.logger)
+
     def get_value(self):
         return self.value
 
+    def get_block(self):
+        return self.block
+
     def get_error(self):
         return self.error
 
     def terminate(self):
-        self.tn_inst.write("STOPSIM\n")
-        self.resp = self.tn_inst.read_until("OK\r\n")
-        return True if self.resp.find("Simulation has stopped.") >= 0 else False
+        with self.lock:
+            self.invalidate_shadow()
+            self.resp = self.tn_inst.stop_sim()
+            return True if self.resp.find("Simulation has stopped.") >= 0 else False
 
     def sim_status(self):
-        self.tn_inst.write("SIMSTATUS\n")
-        self.resp = self.tn_inst.read_until("OK\r\n")
-        return True if self.resp.find("Simulation is RUNNING.") >= 0 else False
+        with self.lock:
+            t = self.metrics.now()
+            self.resp = self.tn_inst.sim_status()
+            self.metrics.count("round_trips")
+            self.metrics.elapsed("sim_status", t)
+            return True if self.resp.find("Simulation is RUNNING.") >= 0 else False
 
     def close(self):
-        self.tn_inst.write("EXIT\n")
-        self.resp = self.tn_inst.read_all()
-        self.tn_inst.close()
-        return True if self.resp.find("Goodbye") >= 0 else False
+        with self.lock:
+            self.dump_metrics()
+            self.resp = self.tn_inst.exit()
+            self.tn_inst.close()
+            return True if self.resp.find("Goodbye") >= 0 else False
 
     def get_last_response(self):
         return self.resp
 
+    def get_divergences(self):
+        """
+        @return: Descriptions of where a replayed session departed from its trace, empty when not replaying.
+        """
+        if self.transport != "replay" or self.tn_inst is None:
+            return []
+        return self.tn_inst.get_divergences()
+
 
 class AcknowledgeError(Exception):
     def __init__(self, message):
         super(AcknowledgeError, self).__init__(message)
 
 
+def check_writes(ate_inst):
+    """
+    Raise AcknowledgeError if a write the calling thread streamed into the pipeline failed.  Streamed writes
+    only report their outcome when flushed, so a controller calls this before the results of an operation
+    (captured data, status, the end of a sequence) are used.
+    @param ate_inst: ATE the writes went through.
+    """
+    if not ate_inst.flush():
+        raise AcknowledgeError("Write Error: " + str(ate_inst.get_error()))
+
+
 class GPIOController:
     def __init__(self, ate_inst):
         self.ate_inst = ate_inst
+        self.ate_inst.add_shadow(0x00001800)
+        self.metrics = Metrics("GPIOController")
+        self.ate_inst.add_metrics(self.metrics)
+
+    def wait_ready(self, timeout=None):
+        """
+        The GPIO controller has no status register; it is ready once its register answers a read.
+        """
+        return self.ate_inst.read(0x00001800)
 
     def write(self, val):
-        return self.ate_inst.write(0x00001800, val)
+        t = self.metrics.now()
+        ret = self.ate_inst.write(0x00001800, val)
+        self.metrics.elapsed("write", t)
+        return ret
+
+    def flush(self):
+        """
+        Wait for the writes streamed by write().
+        @return: True if they completed with OK, False otherwise with the failures in get_error().
+        """
+        return self.ate_inst.flush()
 
     def read(self):
-        return self.ate_inst.read(0x00001800)
+        t = self.metrics.now()
+        ret = self.ate_inst.read(0x00001800)
+        self.metrics.elapsed("read", t)
+        return ret
 
     def get_value(self):
         return self.ate_inst.get_value()
@@ -229,10 +726,16 @@ class GPIOController:
         return self.ate_inst.get_error()
 
 
-@traced
+@instrumented("driver")
 class JTAGController:
     def __init__(self, ate_inst):
         self.ate_inst = ate_inst
+        # Start state, end state and bit count; the control register starts a scan on write so is never shadowed
+        self.ate_inst.add_shadow(0x00001000 + 0x400, 0x00001000 + 0x401, 0x00001000 + 0x402)
+        self.last_scan_polls_saved = 0
+        self.stats = {"scans": 0, "polls": 0, "polls_saved": 0}
+        self.metrics = Metrics(self.__class__.__name__)
+        self.ate_inst.add_metrics(self.metrics)
 
     def __write_vector_segment(self, addr, data):
         assert (addr < 0x1000)
@@ -253,6 +756,27 @@ class JTAGController:
         except ValueError as e:
             raise AcknowledgeError(e.__str__() + " " + self.ate_inst.get_last_response())
 
+    def __write_vector(self, tdi_vector, nbytes):
+        """
+        Fill the vector buffer with the first nbytes of tdi_vector.  A single block write is used when the
+        Simulator supports it, otherwise the buffer is filled one byte per MW command.
+        """
+        if self.ate_inst.write_block(0x00001000, tdi_vector[:nbytes]):
+            return
+        for addr in range(nbytes):
+            self.__write_vector_segment(addr, tdi_vector[addr])
+
+    def __read_vector(self, tdo_vector):
+        """
+        Read len(tdo_vector) bytes of captured data from the vector buffer into tdo_vector.  A single block
+        read is used when the Simulator supports it, otherwise the buffer is read one byte per MR command.
+        """
+        if self.ate_inst.read_block(0x00001000, len(tdo_vector)):
+            tdo_vector[:] = self.ate_inst.get_block()
+            return
+        for addr in range(len(tdo_vector)):
+            tdo_vector[addr] = int(self.__read_vector_segment(addr))
+
     def __set_bit_count(self, count):
         wb_addr = 0x00001000 + 0x402
         self.ate_inst.write(wb_addr, count & 0xFFFF)
@@ -269,52 +793,49 @@ class JTAGController:
         wb_addr = 0x00001000 + 0x403
         self.ate_inst.write(wb_addr, value & 0x1)
 
-    def __get_status_register(self):
+    def __wait_idle(self):
+        """
+        Wait for the status register to report the controller idle and account the polls spent or saved.
+        """
         wb_addr = 0x00001000 + 0x404
-        if self.ate_inst.read(wb_addr) & 0x1:
-            return self.ate_inst.get_value()
-        else:
-            print(self.ate_inst.get_error())
-            return None
+        if not self.ate_inst.wait_status(wb_addr, 0xFF, 0x00):
+            raise AcknowledgeError("Status Error: " + str(self.ate_inst.get_error()))
+        self.last_scan_polls_saved = self.ate_inst.last_polls_saved
+        self.stats["scans"] += 1
+        self.stats["polls"] += self.ate_inst.last_polls
+        self.stats["polls_saved"] += self.last_scan_polls_saved
+        self.metrics.count("status_polls", self.ate_inst.last_polls)
+
+    def wait_ready(self, timeout=None):
+        """
+        Wait for the status register to report the controller idle.
+        @return: True once idle, False on timeout with the reason in the ATE get_error().
+        """
+        return self.ate_inst.wait_status(0x00001000 + 0x404, 0xFF, 0x00, timeout)
+
+    def get_stats(self):
+        """
+        @return: Dictionary with the number of scans, the MR status polls they issued and the polls saved by WAIT.
+        """
+        return dict(self.stats)
 
     def __scan_vector(self, tdi_vector, count, start, end):
         # Fill the JTAGCtrlMaster data buffer memory with tdi data
         data_width = 8
         addr_width = 10
-        num_full_words = int(count // data_width)
         tdo_vector = bytearray((count + data_width - 1) // data_width)
-        remainder = count % data_width
-        addr = 0
-        for i in range(num_full_words):
-            data = tdi_vector[i]
-            self.__write_vector_segment(addr, data)
-            addr = addr + 1
-        # Now write out the remaining bits that may be a partial word in size, but a full word needs to be written
-        if remainder > 0:
-            data = tdi_vector[num_full_words]
-            self.__write_vector_segment(addr, data)
+        # A partial final word still occupies a full word of the buffer
+        self.__write_vector(tdi_vector, len(tdo_vector))
         # Now start the scan operation
         self.__set_bit_count(count)
         self.__set_state_start(start)
         self.__set_state_end(end)
         self.__set_control_register(0x1)  # Start the scan
-        status = self.__get_status_register()
-        while status != 0:
-            status = self.__get_status_register()
+        self.__wait_idle()
         self.__set_control_register(0x0)  # Stop the scan/Reset for next scan cycle trigger
         # Scan completed, now fetch the captured data
-        addr = 0
-        for i in range(num_full_words):
-            data = self.__read_vector_segment(addr)
-            tdo_vector[i] = int(data)
-            addr = addr + 1
-        # Now read out the remaining bits that may be a partial word in size, but a full word needs to be read
-        if remainder > 0:
-            data = self.__read_vector_segment(addr)
-            # print(">>tdo_vector = ", tdo_vector)
-            # print(">>num_full_words = ", num_full_words)
-            # print(">>data = ", data)
-            tdo_vector[num_full_words] = int(data)
+        self.__read_vector(tdo_vector)
+        check_writes(self.ate_inst)
         return tdo_vector
 
     def ba_scan_ir(self, tdi_vector, count, start=SHIFT_IR, end=RUN_TEST_IDLE):
@@ -354,6 +875,7 @@ class JTAGController:
         :param end: State to end up in following the current scan/shift operation (must be a stable state)
         :return: tdo_string
         """
+        t = self.metrics.now()
         if len(tdi_string) % 2:
             tdi_string = '0' + tdi_string
         # print("tdi_string = ", tdi_string)
@@ -371,6 +893,8 @@ class JTAGController:
         if len(tdo_string) * 4 > count:
             tdo_string = tdo_string[1:]
             # print("tdo_string = ", tdo_string)
+        self.metrics.count("scan_bits", count)
+        self.metrics.elapsed("scan_ir", t)
         return tdo_string
 
     def scan_dr(self, count, tdi_string, start=SHIFT_DR, end=RUN_TEST_IDLE):
@@ -383,6 +907,7 @@ class JTAGController:
         :param end: State to end up in following the current scan/shift operation (must be a stable state)
         :return: tdo_string
         """
+        t = self.metrics.now()
         if len(tdi_string) % 2:
             tdi_string = '0' + tdi_string
         # print("tdi_string = ", tdi_string)
@@ -400,9 +925,12 @@ class JTAGController:
         if len(tdo_string) * 4 > count:
             tdo_string = tdo_string[1:]
             # print("tdo_string = ", tdo_string)
+        self.metrics.count("scan_bits", count)
+        self.metrics.elapsed("scan_dr", t)
         return tdo_string
 
     def runtest(self, ticks):
+        t = self.metrics.now()
         start = RUN_TEST_IDLE
         end = RUN_TEST_IDLE
         blocks = ticks // 1024
@@ -412,35 +940,40 @@ class JTAGController:
             self.__set_state_start(start)
             self.__set_state_end(end)
             self.__set_control_register(0x1)  # Start the scan
-            status = self.__get_status_register()
-            while status != 0:
-                status = self.__get_status_register()
+            self.__wait_idle()
             self.__set_control_register(0x0)  # Stop the scan/Reset for next scan cycle trigger
         self.__set_bit_count(rem)
         self.__set_state_start(start)
         self.__set_state_end(end)
         self.__set_control_register(0x1)  # Start the scan
-        status = self.__get_status_register()
-        while status != 0:
-            status = self.__get_status_register()
+        self.__wait_idle()
         self.__set_control_register(0x0)  # Stop the scan/Reset for next scan cycle trigger
+        check_writes(self.ate_inst)
+        self.metrics.count("runtest_ticks", ticks)
+        self.metrics.elapsed("runtest", t)
 
     def softreset(self):
+        self.ate_inst.invalidate_shadow()
         start = TEST_LOGIC_RESET
         end = TEST_LOGIC_RESET
         self.__set_bit_count(5)
         self.__set_state_start(start)
         self.__set_state_end(end)
         self.__set_control_register(0x1)  # Start the scan
-        status = self.__get_status_register()
-        while status != 0:
-            status = self.__get_status_register()
+        self.__wait_idle()
         self.__set_control_register(0x0)  # Stop the scan/Reset for next scan cycle trigger
+        check_writes(self.ate_inst)
 
 
 class JTAGController2:
     def __init__(self, ate_inst):
         self.ate_inst = ate_inst
+        # Start state, end state, chain length and command; the control register is never shadowed
+        self.ate_inst.add_shadow(0x00003000 + 0x400, 0x00003000 + 0x401, 0x00003000 + 0x402, 0x00003000 + 0x405)
+        self.last_scan_polls_saved = 0
+        self.stats = {"scans": 0, "polls": 0, "polls_saved": 0}
+        self.metrics = Metrics(self.__class__.__name__)
+        self.ate_inst.add_metrics(self.metrics)
 
     def __write_vector_segment(self, addr, data):
         assert (addr < 0x3000)
@@ -461,6 +994,27 @@ class JTAGController2:
         except ValueError as e:
             raise AcknowledgeError(e.__str__() + " " + self.ate_inst.get_last_response())
 
+    def __write_vector(self, tdi_vector, nbytes):
+        """
+        Fill the vector buffer with the first nbytes of tdi_vector.  A single block write is used when the
+        Simulator supports it, otherwise the buffer is filled one byte per MW command.
+        """
+        if self.ate_inst.write_block(0x00003000, tdi_vector[:nbytes]):
+            return
+        for addr in range(nbytes):
+            self.__write_vector_segment(addr, tdi_vector[addr])
+
+    def __read_vector(self, tdo_vector):
+        """
+        Read len(tdo_vector) bytes of captured data from the vector buffer into tdo_vector.  A single block
+        read is used when the Simulator supports it, otherwise the buffer is read one byte per MR command.
+        """
+        if self.ate_inst.read_block(0x00003000, len(tdo_vector)):
+            tdo_vector[:] = self.ate_inst.get_block()
+            return
+        for addr in range(len(tdo_vector)):
+            tdo_vector[addr] = int(self.__read_vector_segment(addr))
+
     def __set_chain_length(self, count):
         wb_addr = 0x00003000 + 0x402
         self.ate_inst.write(wb_addr, count & 0xFFFF)
@@ -477,13 +1031,31 @@ class JTAGController2:
         wb_addr = 0x00003000 + 0x403
         self.ate_inst.write(wb_addr, value & 0x1)
 
-    def __get_status_register(self):
+    def __wait_idle(self):
+        """
+        Wait for the status register to report the controller idle and account the polls spent or saved.
+        """
         wb_addr = 0x00003000 + 0x404
-        if self.ate_inst.read(wb_addr) & 0x1:
-            return self.ate_inst.get_value()
-        else:
-            print(self.ate_inst.get_error())
-            return None
+        if not self.ate_inst.wait_status(wb_addr, 0xFF, 0x00):
+            raise AcknowledgeError("Status Error: " + str(self.ate_inst.get_error()))
+        self.last_scan_polls_saved = self.ate_inst.last_polls_saved
+        self.stats["scans"] += 1
+        self.stats["polls"] += self.ate_inst.last_polls
+        self.stats["polls_saved"] += self.last_scan_polls_saved
+        self.metrics.count("status_polls", self.ate_inst.last_polls)
+
+    def wait_ready(self, timeout=None):
+        """
+        Wait for the status register to report the controller idle.
+        @return: True once idle, False on timeout with the reason in the ATE get_error().
+        """
+        return self.ate_inst.wait_status(0x00003000 + 0x404, 0xFF, 0x00, timeout)
+
+    def get_stats(self):
+        """
+        @return: Dictionary with the number of scans, the MR status polls they issued and the polls saved by WAIT.
+        """
+        return dict(self.stats)
 
     def __set_command(self, command):
         wb_addr = 0x00003000 + 0x405
@@ -493,41 +1065,20 @@ class JTAGController2:
         # Fill the JTAGCtrlMaster data buffer memory with tdi data
         data_width = 8
         addr_width = 10
-        num_full_words = int(count // data_width)
         tdo_vector = bytearray((count + data_width - 1) // data_width)
-        remainder = count % data_width
-        addr = 0
-        for i in range(num_full_words):
-            data = tdi_vector[i]
-            self.__write_vector_segment(addr, data)
-            addr = addr + 1
-        # Now write out the remaining bits that may be a partial word in size, but a full word needs to be written
-        if remainder > 0:
-            data = tdi_vector[num_full_words]
-            self.__write_vector_segment(addr, data)
+        # A partial final word still occupies a full word of the buffer
+        self.__write_vector(tdi_vector, len(tdo_vector))
         # Now start the scan operation
         self.__set_chain_length(count)
         self.__set_state_start(start)
         self.__set_state_end(end)
         self.__set_command(SCAN)
         self.__set_control_register(0x1)  # Start the scan
-        status = self.__get_status_register()
-        while status != 0:
-            status = self.__get_status_register()
+        self.__wait_idle()
         self.__set_control_register(0x0)  # Stop the scan/Reset for next scan cycle trigger
         # Scan completed, now fetch the captured data
-        addr = 0
-        for i in range(num_full_words):
-            data = self.__read_vector_segment(addr)
-            tdo_vector[i] = int(data)
-            addr = addr + 1
-        # Now read out the remaining bits that may be a partial word in size, but a full word needs to be read
-        if remainder > 0:
-            data = self.__read_vector_segment(addr)
-            # print(">>tdo_vector = ", tdo_vector)
-            # print(">>num_full_words = ", num_full_words)
-            # print(">>data = ", data)
-            tdo_vector[num_full_words] = int(data)
+        self.__read_vector(tdo_vector)
+        check_writes(self.ate_inst)
         return tdo_vector
 
     def ba_scan_ir(self, tdi_vector, count, start=SI_SHIFT_IR, end=SI_RUN_TEST_IDLE):
@@ -565,6 +1116,7 @@ class JTAGController2:
         :param end: State to end up in following the current scan/shift operation (must be a stable state)
         :return: tdo_string
         """
+        t = self.metrics.now()
         if len(tdi_string) % 2:
             tdi_string = '0' + tdi_string
         # print("tdi_string = ", tdi_string)
@@ -582,6 +1134,8 @@ class JTAGController2:
         if len(tdo_string) * 4 > count:
             tdo_string = tdo_string[1:]
             # print("tdo_string = ", tdo_string)
+        self.metrics.count("scan_bits", count)
+        self.metrics.elapsed("scan_ir", t)
         return tdo_string
 
     def scan_dr(self, count, tdi_string, start=SI_SHIFT_DR, end=SI_RUN_TEST_IDLE):
@@ -594,6 +1148,7 @@ class JTAGController2:
         :param end: State to end up in following the current scan/shift operation (must be a stable state)
         :return: tdo_string
         """
+        t = self.metrics.now()
         if len(tdi_string) % 2:
             tdi_string = '0' + tdi_string
         # print("tdi_string = ", tdi_string)
@@ -611,9 +1166,12 @@ class JTAGController2:
         if len(tdo_string) * 4 > count:
             tdo_string = tdo_string[1:]
             # print("tdo_string = ", tdo_string)
+        self.metrics.count("scan_bits", count)
+        self.metrics.elapsed("scan_dr", t)
         return tdo_string
 
     def runtest(self, ticks):
+        t = self.metrics.now()
         start = SI_RUN_TEST_IDLE
         end = SI_RUN_TEST_IDLE
         blocks = ticks // 1024
@@ -624,21 +1182,21 @@ class JTAGController2:
             self.__set_state_end(end)
             self.__set_command(SCAN)
             self.__set_control_register(0x1)  # Start the scan
-            status = self.__get_status_register()
-            while status != 0:
-                status = self.__get_status_register()
+            self.__wait_idle()
             self.__set_control_register(0x0)  # Stop the scan/Reset for next scan cycle trigger
         self.__set_chain_length(rem)
         self.__set_state_start(start)
         self.__set_state_end(end)
         self.__set_command(SCAN)
         self.__set_control_register(0x1)  # Start the scan
-        status = self.__get_status_register()
-        while status != 0:
-            status = self.__get_status_register()
+        self.__wait_idle()
         self.__set_control_register(0x0)  # Stop the scan/Reset for next scan cycle trigger
+        check_writes(self.ate_inst)
+        self.metrics.count("runtest_ticks", ticks)
+        self.metrics.elapsed("runtest", t)
 
     def softreset(self):
+        self.ate_inst.invalidate_shadow()
         start = SI_TEST_LOGIC_RESET
         end = SI_TEST_LOGIC_RESET
         self.__set_chain_length(5)
@@ -646,15 +1204,16 @@ class JTAGController2:
         self.__set_state_end(end)
         self.__set_command(SCAN)
         self.__set_control_register(0x1)  # Start the scan
-        status = self.__get_status_register()
-        while status != 0:
-            status = self.__get_status_register()
+        self.__wait_idle()
         self.__set_control_register(0x0)  # Stop the scan/Reset for next scan cycle trigger
+        check_writes(self.ate_inst)
 
 
 class I2CController:
     def __init__(self, ate_inst):
         self.ate_inst = ate_inst
+        self.metrics = Metrics("I2CController")
+        self.ate_inst.add_metrics(self.metrics)
 
     # Read/Write registers
     def __write_transmit_register(self, value):
@@ -716,8 +1275,10 @@ class I2CController:
 
     def __read_status_register(self):
         wb_addr = 0x00001C00 + 3
+        self.metrics.count("status_polls")
         try:
             if self.ate_inst.read(wb_addr):
+                check_writes(self.ate_inst)
                 return self.ate_inst.get_value() & 0xFF
             else:
                 print(self.ate_inst.get_error())
@@ -725,6 +1286,12 @@ class I2CController:
         except ValueError as e:
             raise AcknowledgeError(e.__str__() + " " + self.ate_inst.get_last_response())
 
+    def wait_ready(self, timeout=None):
+        """
+        Wait for the busy bit of the status register to clear.
+        """
+        return self.ate_inst.wait_status(0x00001C00 + 3, 0x01, 0x00, timeout)
+
     START = 0x08
     STOP = 0x10
     MASTER_ACK = 0x04
@@ -732,6 +1299,14 @@ class I2CController:
     EXECUTE = 0x01
 
     def i2c_write_reg(self, dev_address, reg_address, value):
+        t = self.metrics.now()
+        try:
+            return self.__i2c_write_reg(dev_address, reg_address, value)
+        finally:
+            self.metrics.count("transactions")
+            self.metrics.elapsed("i2c_write_reg", t)
+
+    def __i2c_write_reg(self, dev_address, reg_address, value):
         # write out device address
         self.__write_transmit_register((dev_address << 1) & 0xFE)
         self.__write_control_register(0x0B)  # START & WRITE & EXECUTE
@@ -768,6 +1343,14 @@ class I2CController:
         # return True
 
     def i2c_read_reg(self, dev_address, reg_address):
+        t = self.metrics.now()
+        try:
+            return self.__i2c_read_reg(dev_address, reg_address)
+        finally:
+            self.metrics.count("transactions")
+            self.metrics.elapsed("i2c_read_reg", t)
+
+    def __i2c_read_reg(self, dev_address, reg_address):
         # write out device address
         self.__write_transmit_register((dev_address << 1) & 0xFE)
         self.__write_control_register(0x0B)  # START & WRITE & EXECUTE
@@ -811,6 +1394,14 @@ class I2CController:
         return self.__read_receive_register()
 
     def i2c_multibyte_write(self, dev_address, reg_address, data):
+        t = self.metrics.now()
+        try:
+            return self.__i2c_multibyte_write(dev_address, reg_address, data)
+        finally:
+            self.metrics.count("transactions")
+            self.metrics.elapsed("i2c_multibyte_write", t)
+
+    def __i2c_multibyte_write(self, dev_address, reg_address, data):
         print("I2C Write: At [{0:x}] = {0:x}".format(reg_address, data))
         # i2c address
         self.__write_transmit_register((dev_address << 1) & 0xFE)
@@ -875,6 +1466,14 @@ class I2CController:
         return True
 
     def i2c_multibyte_read(self, dev_address, reg_address):
+        t = self.metrics.now()
+        try:
+            return self.__i2c_multibyte_read(dev_address, reg_address)
+        finally:
+            self.metrics.count("transactions")
+            self.metrics.elapsed("i2c_multibyte_read", t)
+
+    def __i2c_multibyte_read(self, dev_address, reg_address):
         retval = 0
         # write out device address
         self.__write_transmit_register((dev_address << 1) & 0xFE)
@@ -951,6 +1550,8 @@ class I2CController:
 class SPIController:
     def __init__(self, ate_inst):
         self.ate_inst = ate_inst
+        self.metrics = Metrics("SPIController")
+        self.ate_inst.add_metrics(self.metrics)
 
     # Read/Write registers
     def __spi_write_transmit_register(self, value):
@@ -987,6 +1588,12 @@ class SPIController:
         except ValueError as e:
             raise AcknowledgeError(e.__str__() + " " + self.ate_inst.get_last_response())
 
+    def wait_ready(self, timeout=None):
+        """
+        The SPI host has no status register; it is ready once its receive register answers a read.
+        """
+        return self.ate_inst.read(0x00001C00 + 0x31)
+
     def spi_write(self, value):
         """
 
@@ -994,10 +1601,18 @@ class SPIController:
         :param value: 32 bit value to be written to the device
         :return:
         """
+        t = self.metrics.now()
         self.__spi_write_transmit_register(value)
+        self.metrics.count("bytes_written", 4)
+        self.metrics.elapsed("spi_write", t)
 
     def spi_read(self):
-        return self.__spi_read_receive_register()
+        t = self.metrics.now()
+        value = self.__spi_read_receive_register()
+        check_writes(self.ate_inst)
+        self.metrics.count("bytes_read", 4)
+        self.metrics.elapsed("spi_read", t)
+        return value
 
 
 
@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+"""
+    Recording and replay of ATE sessions with the P2654Simulations simulation framework.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    ATERecordingClient wraps any ATE transport client and logs every command it carries, with a timestamp and
+    its result, to a compact binary trace file.  ATEReplayClient is a transport client serving a session back
+    from such a trace without a board: reads return the recorded values and every command is checked against
+    the recorded traffic so divergence from the recorded session is detected.  The trace is memory-mapped, so
+    replaying a long session does not load it into memory.
+
+    A trace file is the magic b"P2654TRC", a big-endian u16 version, then one record per command:
+
+        op (u8)  status (u8)  time_ns (u64)  adr (u32)  value (u32)  aux (u32)  length (u32)  payload
+
+    op uses the opcodes of drivers.ate.atebinary and time_ns counts from the start of the recording.
+
+        op          adr     value           aux     payload
+        MW          adr     data            -       -
+        MR          adr     data read       -       -
+        MWB         adr     -               -       data bytes
+        MRB         adr     count           -       data bytes read
+        WAIT        adr     register value  checks  mask (u32), value (u32)
+        STARTSIM    -       -               -       board name
+        STOPSIM     -       -               -       response text
+        SIMSTATUS   -       -               -       response text
+        EXIT        -       -               -       response text
+        DRAIN       -       -               failed  command and response text of each failed command
+
+    status is REC_OK, REC_ERROR (payload of MW/MWB/MR/MRB/WAIT is then the response text) or REC_POSTED for
+    writes streamed into the pipeline whose response had not yet been read.  The outcome of posted writes is
+    recorded by the DRAIN record of the drain() that collected it: REC_ERROR, with the failed commands, if any
+    of them failed.  Version 1 traces have no DRAIN records.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import mmap
+import struct
+from time import monotonic_ns, sleep
+
+from drivers.ate.atebinary import OP_MW, OP_MR, OP_MWB, OP_MRB, OP_STARTSIM, OP_STOPSIM, OP_SIMSTATUS, \
+    OP_EXIT, OP_WAIT, word2, describe
+from p2654model2.instrument.instrument import instrumented
+
+
+MAGIC = b"P2654TRC"
+VERSION = 2
+REC_OK, REC_ERROR, REC_POSTED = range(3)
+# Trace only opcode, clear of the opcodes of drivers.ate.atebinary
+OP_DRAIN = 0x80
+
+file_header = struct.Struct(">8sH")
+record = struct.Struct(">BBQIIII")
+
+
+class ReplayDivergenceError(Exception):
+    def __init__(self, message):
+        super(ReplayDivergenceError, self).__init__(message)
+
+
+def _failed(resp):
+    return resp.find("ERROR") >= 0 or resp.find("Unknown") >= 0
+
+
+@instrumented("driver")
+class ATERecordingClient:
+    """
+    Transport client that forwards every command to another client and records it in a trace file.
+    """
+    def __init__(self, client, trace_file):
+        """
+        @param client: The transport client actually talking to the Simulator.
+        @param trace_file: Path of the trace file to create.
+        """
+        self.client = client
+        self.pipeline_depth = client.pipeline_depth
+        self.trace = open(trace_file, "wb")
+        self.trace.write(file_header.pack(MAGIC, VERSION))
+        self.start = monotonic_ns()
+
+    def __record(self, op, status, adr=0, value=0, aux=0, payload=b""):
+        self.trace.write(record.pack(op, status, monotonic_ns() - self.start, adr & 0xFFFFFFFF,
+                                     value & 0xFFFFFFFF, aux & 0xFFFFFFFF, len(payload)))
+        if len(payload):
+            self.trace.write(payload)
+
+    def __text(self, op, resp, payload=None):
+        status = REC_ERROR if _failed(resp) else REC_OK
+        self.__record(op, status, payload=resp.encode("utf-8") if payload is None else payload)
+        return resp
+
+    def connect(self, ip, port):
+        return self.client.connect(ip, port)
+
+    def drain(self):
+        failed = self.client.drain()
+        payload = "\0".join(text for pair in failed for text in pair)
+        self.__record(OP_DRAIN, REC_ERROR if len(failed) else REC_OK, aux=len(failed),
+                      payload=payload.encode("utf-8"))
+        return failed
+
+    def close(self):
+        self.client.close()
+        if not self.trace.closed:
+            self.trace.close()
+
+    def start_sim(self, board):
+        return self.__text(OP_STARTSIM, self.client.start_sim(board), board.encode("utf-8"))
+
+    def stop_sim(self):
+        return self.__text(OP_STOPSIM, self.client.stop_sim())
+
+    def sim_status(self):
+        return self.__text(OP_SIMSTATUS, self.client.sim_status())
+
+    def exit(self):
+        return self.__text(OP_EXIT, self.client.exit())
+
+    def mw(self, adr, data):
+        resp = self.client.mw(adr, data)
+        if resp is None:
+            self.__record(OP_MW, REC_POSTED, adr, data)
+        elif _failed(resp):
+            self.__record(OP_MW, REC_ERROR, adr, data, payload=resp.encode("utf-8"))
+        else:
+            self.__record(OP_MW, REC_OK, adr, data)
+        return resp
+
+    def mr(self, adr):
+        try:
+            resp, value = self.client.mr(adr)
+        except (ValueError, IndexError) as e:
+            self.__record(OP_MR, REC_ERROR, adr, payload=str(e).encode("utf-8"))
+            raise
+        self.__record(OP_MR, REC_OK, adr, value)
+        return resp, value
+
+    def mwb(self, adr, data, stream=True):
+        resp = self.client.mwb(adr, data, stream)
+        status = REC_POSTED if resp is None else REC_ERROR if _failed(resp) else REC_OK
+        self.__record(OP_MWB, status, adr, len(data), payload=bytes(data))
+        return resp
+
+    def mrb(self, adr, count):
+        resp, block = self.client.mrb(adr, count)
+        if block is None:
+            self.__record(OP_MRB, REC_ERROR, adr, count, payload=resp.encode("utf-8"))
+        else:
+            self.__record(OP_MRB, REC_OK, adr, count, payload=bytes(block))
+        return resp, block
+
+    def wait(self, adr, mask, value, timeout_ms):
+        resp, current, checks = self.client.wait(adr, mask, value, timeout_ms)
+        if current is None:
+            self.__record(OP_WAIT, REC_ERROR, adr, payload=word2.pack(mask, value) + resp.encode("utf-8"))
+        else:
+            self.__record(OP_WAIT, REC_OK, adr, current, checks, word2.pack(mask, value))
+        return resp, current, checks
+
+
+@instrumented("driver")
+class ATEReplayClient:
+    """
+    Transport client serving a recorded session back from a trace file.
+    """
+    def __init__(self, pipeline_depth=1):
+        self.pipeline_depth = pipeline_depth
+        self.trace = None
+        self.map = None
+        self.offset = 0
+        # When True a divergence raises ReplayDivergenceError, otherwise it is only collected
+        self.strict = True
+        # When True each command is held back until its recorded time so the session keeps its original pacing
+        self.realtime = False
+        self.divergences = []
+        self.start = None
+        self.replayed = 0
+        self.drains = True
+
+    def load(self, trace_file):
+        self.trace = open(trace_file, "rb")
+        self.map = mmap.mmap(self.trace.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = file_header.unpack_from(self.map, 0)
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError("{:s} is not a version {:d} ATE trace.".format(trace_file, VERSION))
+        self.drains = version >= 2
+        self.offset = file_header.size
+
+    def get_divergences(self):
+        """
+        @return: List of descriptions of where the session departed from the recorded traffic.
+        """
+        return self.divergences
+
+    def __next(self, op, adr=None, value=None, payload=None):
+        """
+        Consume the next record, checking it is the command being replayed.
+        @return: (status, adr, value, aux, payload) of the record.
+        """
+        if self.offset >= len(self.map):
+            self.__diverge("{:s} issued after the end of the trace.".format(describe(op, adr)))
+            return None
+        rop, status, t, radr, rvalue, aux, length = record.unpack_from(self.map, self.offset)
+        self.offset += record.size
+        rpayload = self.map[self.offset:self.offset + length]
+        self.offset += length
+        self.replayed += 1
+        if self.realtime:
+            if self.start is None:
+                self.start = monotonic_ns() - t
+            delay = t - (monotonic_ns() - self.start)
+            if delay > 0:
+                sleep(delay / 1e9)
+        if rop != op or (adr is not None and radr != adr & 0xFFFFFFFF) or \
+                (value is not None and rvalue != value & 0xFFFFFFFF) or \
+                (payload is not None and status != REC_ERROR and rpayload != payload):
+            self.__diverge("Command {:d} is {:s} 0x{:X} {:s}, recorded {:s} 0x{:X} {:s}.".format(
+                self.replayed, describe(op, adr), 0 if value is None else value,
+                "" if payload is None else payload.hex().upper(), describe(rop, radr), rvalue,
+                "" if payload is None else rpayload.hex().upper()))
+        return status, radr, rvalue, aux, rpayload
+
+    def __diverge(self, message):
+        self.divergences.append(message)
+        if self.strict:
+            raise ReplayDivergenceError(message)
+
+    @staticmethod
+    def __text(rec, default):
+        if rec is None:
+            return default
+        return rec[4].decode("utf-8", "replace")
+
+    def connect(self, ip, port):
+        pass
+
+    def drain(self):
+        """
+        @return: The failed posted commands recorded by the matching drain() of the recorded session.
+        """
+        if not self.drains:
+            return []
+        rec = self.__next(OP_DRAIN)
+        if rec is None or rec[0] != REC_ERROR:
+            return []
+        texts = rec[4].decode("utf-8", "replace").split("\0")
+        return list(zip(texts[0::2], texts[1::2]))
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.trace.close()
+            self.map = None
+
+    def start_sim(self, board):
+        rec = self.__next(OP_STARTSIM)
+        if rec is not None and rec[4] != board.encode("utf-8"):
+            self.__diverge("STARTSIM {:s}, recorded {:s}.".format(board, rec[4].decode("utf-8", "replace")))
+        return "Simulation of {:s} has started.\r\nOK\r\n".format(board)
+
+    def stop_sim(self):
+        return self.__text(self.__next(OP_STOPSIM), "Simulation has stopped.\r\nOK\r\n")
+
+    def sim_status(self):
+        return self.__text(self.__next(OP_SIMSTATUS), "Simulation is RUNNING.\r\nOK\r\n")
+
+    def exit(self):
+        return self.__text(self.__next(OP_EXIT), "Goodbye\r\n")
+
+    def mw(self, adr, data):
+        rec = self.__next(OP_MW, adr, data)
+        if rec is not None and rec[0] == REC_ERROR:
+            return self.__text(rec, "")
+        return "OK\r\n"
+
+    def mr(self, adr):
+        rec = self.__next(OP_MR, adr)
+        if rec is None:
+            return "OK\r\n", 0
+        if rec[0] == REC_ERROR:
+            raise ValueError(self.__text(rec, ""))
+        return "OK\r\n", rec[2]
+
+    def mwb(self, adr, data, stream=True):
+        rec = self.__next(OP_MWB, adr, len(data), bytes(data))
+        if rec is not None and rec[0] == REC_ERROR:
+            return self.__text(rec, "")
+        return "OK\r\n"
+
+    def mrb(self, adr, count):
+        rec = self.__next(OP_MRB, adr, count)
+        if rec is None:
+            return "OK\r\n", bytearray(count)
+        if rec[0] == REC_ERROR:
+            return self.__text(rec, ""), None
+        return "OK\r\n", bytearray(rec[4])
+
+    def wait(self, adr, mask, value, timeout_ms):
+        rec = self.__next(OP_WAIT, adr, payload=word2.pack(mask, value))
+        if rec is None:
+            return "OK\r\n", value, 1
+        if rec[0] == REC_ERROR:
+            return rec[4][word2.size:].decode("utf-8", "replace"), None, None
+        return "OK\r\n", rec[2], rec[3]
@@ -49,25 +49,39 @@ def main(argv):
     logging.basicConfig(filename='example.log', level=TRACE, format="%(levelname)s:%(name)s:%(funcName)s:%(message)s")
     # Drivers.set_board_sim("SPITest")
     Drivers.set_board_sim("P2654Board1")
+    bldr_file = os.path.join(os.path.join(os.path.dirname(__file__), "sit"), "jtagboard1.json")
+    # Optional second argument selects the ATE backend: telnet (default), binary, local (in-process) or replay
+    if len(argv) > 2:
+        Drivers.set_ate_backend(argv[2])
+    # Optional third argument is the trace file the session is recorded to, or replayed from with replay
+    if len(argv) > 3:
+        Drivers.set_trace_file(argv[3])
+    Drivers.register_board_model("P2654Board1", bldr_file)
     cc = Configurer.get_configurer()
     config_file = os.path.join(os.path.dirname(__file__), "configure.json")
     cc.load(config_file)
     bldr = Builder.get_builder()
-    bldr_file = os.path.join(os.path.join(os.path.dirname(__file__), "sit"), "jtagboard1.json")
     tree = bldr.build_from_file2(bldr_file)
     nc = NodeContainer.get_nodecontainer()
     nc.define_top(tree)
     tree.configure()
+    nc.compile()
+    # Bring up the controllers the model drives now, together, rather than one by one on their first apply
+    Drivers.prepare(Drivers.required(tree))
 
     tree.dump()
     nc.dump()
 
     ip = Singleton.get_pdl_interpreter()
+    status = None
     if ip.Load(argv[1]):
-        exit(ip.Run("foo", []))
+        status = ip.Run("foo", [])
+    # Closing the session dumps the ATE metrics, so it must happen before the exit status is returned
     ate = Drivers.get_ate()
     ate.terminate()
     ate.close()
+    if status is not None:
+        exit(status)
 
 
 if __name__ == '__main__':
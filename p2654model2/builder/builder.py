@@ -34,8 +34,12 @@ __status__ = "Alpha/Experimental"
 __version__ = "0.0.1"
 
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import json
+import os
 
+from p2654model2.builder.jsonstream import basic_parse
+from p2654model2.builder.modelcache import ModelCache, ModelCacheFactory
 from p2654model2.error.ModelError import ModelError
 from p2654model2.injection.injectorregistry import InjectorRegistry
 from p2654model2.interface.accessinterface import AccessInterface
@@ -52,14 +56,22 @@ from p2654model2.strategy.transform.transformstrategy import TransformStrategy
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import instrumented
 
 
 module_logger = logging.getLogger('P2654Model2.builder.builder')
 
 
+def _read_description(filename, digest):
+    # Module level so the workers of a parallel Builder.describe() can run it
+    with open(filename) as model_data:
+        data = json.load(model_data)
+    return data, ModelCache.hash_file(filename) if digest else None
+
+
 @logged
-@traced
+@instrumented("builder")
 class Builder(object):
     inst = None
 
@@ -74,16 +86,30 @@ class Builder(object):
         self.logger.info('Creating an instance of Builder')
         self.__filename = None
         self.__data = None
+        # Absolute path of a sub-model file -> its description, for the INSTANCE entries of the model being
+        # built that describe() did not expand
+        self.__templates = {}
+        self.__workers = 0
+        self.__processes = True
+        # Node key -> (function creating the node from its entry and returning it with the AccessInterface of
+        # its children, None if they have none; whether it has children; function completing it afterwards)
+        self.__loaders = {"ROOT": (self.__open_root, True, self.__finish),
+                          "CHAIN": (self.__open_chain, True, self.__finish),
+                          "LINKER": (self.__open_linker, True, self.__finish),
+                          "INSTANCE": (self.__open_instance, False, None),
+                          "MODELPOINT": (self.__open_modelpoint, False, None),
+                          "REGISTER": (self.__open_register, False, self.__finish),
+                          "CUSTOM": (self.__open_custom, True, self.__finish),
+                          "CONTROLLER": (self.__open_controller, True, self.__finish)}
 
     def build_from_file(self, filename):
         self.__filename = filename
-        with open(self.__filename) as model_data:
-            self.__data = json.load(model_data)
-        tree = self.__load_node(self.__data)
-        return tree
+        self.__data = self.describe(filename)
+        return self.build_from_description(self.__data)
 
     def build_from_file2(self, filename):
         self.__filename = filename
+        self.__templates = {}
         tree = None
         with open(self.__filename) as model_data:
             self.__data = json.load(model_data)
@@ -92,7 +118,201 @@ class Builder(object):
             break
         return tree
 
+    def build_from_stream(self, filename):
+        """
+        Build the model of a SIT file while reading it, for models too large to be loaded as a whole.  A node
+        is created when its "children" key is reached (or at the end of its entry when it has none) and its
+        entry is dropped once its children are attached, so only the entries of the nodes being built, one
+        per level of the tree, are held.  The keys of a node must therefore come before its children.
+        @param filename: The SIT file.
+        @return: The top node of the model.
+        """
+        self.__filename = filename
+        self.__data = None
+        self.__templates = {}
+        with open(filename, "rb") as model_data:
+            events = basic_parse(model_data)
+            self.__expect(events, "start_map")
+            event, key = next(events)
+            if event != "map_key":
+                raise ModelError("{:s} does not describe a model.".format(filename))
+            return self.__stream_node(events, key)
+
+    def __stream_node(self, events, key):
+        opener, has_children, finisher = self.__loaders[key]
+        self.__expect(events, "start_map")
+        node = {}
+        tree = None
+        for event, name in events:
+            if event == "end_map":
+                break
+            if tree is not None:
+                raise ModelError("{:s} {:s}: {:s} follows the children, which a streamed SIT cannot have.".format(
+                    key, str(node.get("name")), name))
+            if name == "children" and has_children:
+                tree, access_interface = opener(node)
+                self.__expect(events, "start_array")
+                for event, _ in events:
+                    if event == "end_array":
+                        break
+                    if event != "start_map":
+                        raise ModelError("Children of {:s} {:s} must be objects.".format(key, str(node.get("name"))))
+                    for event, ckey in events:
+                        if event == "end_map":
+                            break
+                        self.__attach(tree, access_interface, self.__stream_node(events, ckey))
+            else:
+                event, value = next(events)
+                if event == "start_map" or event == "start_array":
+                    value = self.__stream_value(events, event, value)
+                node[name] = value
+        if tree is None:
+            tree, _ = opener(node)
+        if finisher is not None:
+            finisher(tree)
+        return tree
+
+    def __stream_value(self, events, event, value):
+        # Attributes of a node (selector tables, injectors, ...) are read whole
+        if event == "start_map":
+            d = {}
+            for event, key in events:
+                if event == "end_map":
+                    return d
+                d[key] = self.__stream_value(events, *next(events))
+        elif event == "start_array":
+            a = []
+            for event, item in events:
+                if event == "end_array":
+                    return a
+                a.append(self.__stream_value(events, event, item))
+        return value
+
+    @staticmethod
+    def __expect(events, expected):
+        event, _ = next(events)
+        if event != expected:
+            raise ModelError("Expected {:s} in the SIT, found {:s}.".format(expected, event))
+
+    def build_cached(self, filename, config_file=None, cache=None):
+        """
+        Build the model of a SIT file from the description stored by the ModelCache, describing the file and
+        storing its description first when the cache has none for it.
+        @param filename: The SIT file of the model.
+        @param config_file: The configure.json the strategies were loaded from, part of the cache key.
+        @param cache: The ModelCache to use, the one of ModelCacheFactory if None.
+        @return: The top node of the model.
+        """
+        if cache is None:
+            cache = ModelCacheFactory.get_modelcache()
+        self.__filename = filename
+        self.__data = cache.load(filename, config_file)
+        if self.__data is None:
+            dependencies = {}
+            self.__data = self.describe(filename, dependencies)
+            cache.store(filename, config_file, self.__data, dependencies)
+        return self.build_from_description(self.__data)
+
+    def set_workers(self, workers, processes=True):
+        """
+        @param workers: Workers reading the INSTANCE sub-model files of describe() in parallel; 0 or 1 reads
+                        them one after the other.
+        @param processes: True to read them in worker processes, False in threads.
+        """
+        self.__workers = workers
+        self.__processes = processes
+
+    def describe(self, filename, dependencies=None):
+        """
+        Read a SIT file into a description of the model: its JSON tree where every INSTANCE entry with a
+        sit file holds the description of that file under "expansion".  Each sub-model file is read once and
+        its description shared by all the INSTANCE entries naming it.  With set_workers() the sub-model files
+        are read on a pool, a level of INSTANCE nesting at a time, and linked afterwards in the order of the
+        sequential read, so the description is the same.
+        @param filename: The SIT file.
+        @param dependencies: Dictionary receiving the INSTANCE sub-model files read and their hashes.
+        @return: The description, a dictionary with a single node entry.
+        """
+        data, _ = _read_description(filename, False)
+        read = {}
+        if self.__workers > 1:
+            read = self.__read_parallel(data, filename, dependencies is not None)
+        self.__expand_descriptions(data, filename, dependencies, {}, read, [os.path.abspath(filename)])
+        return data
+
+    def __read_parallel(self, data, filename, digest):
+        if self.__processes:
+            executor = ProcessPoolExecutor(max_workers=self.__workers)
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.__workers, thread_name_prefix="describe")
+        # Absolute path of a sub-model file -> (description, hash), not linked yet
+        read = {}
+        seen = {os.path.abspath(filename)}
+        with executor:
+            level = [data]
+            while level:
+                futures = []
+                for d in level:
+                    for value in self.__instances(d):
+                        template = os.path.abspath(value["sit"])
+                        if template not in seen:
+                            seen.add(template)
+                            futures.append((template, executor.submit(_read_description, value["sit"], digest)))
+                level = []
+                for template, future in futures:
+                    read[template] = future.result()
+                    level.append(read[template][0])
+        self.logger.info("Builder.describe(): read {:d} sub-model files of {:s} with {:d} workers".format(
+            len(read), filename, self.__workers))
+        return read
+
+    @staticmethod
+    def __instances(data):
+        # INSTANCE entries naming a sit file, in the order of the description
+        nodes = [data]
+        while nodes:
+            for key, value in nodes.pop().items():
+                if key == "INSTANCE":
+                    if value.get("sit"):
+                        yield value
+                else:
+                    nodes.extend(reversed(value.get("children") or []))
+
+    def __expand_descriptions(self, data, filename, dependencies, templates, read, stack):
+        for value in self.__instances(data):
+            sit = value["sit"]
+            template = os.path.abspath(sit)
+            if template in stack:
+                raise ModelError("INSTANCE {:s} of {:s} includes {:s} recursively.".format(
+                    str(value.get("name")), filename, sit))
+            if template not in templates:
+                if template in read:
+                    expansion, digest = read.pop(template)
+                else:
+                    expansion, digest = _read_description(sit, dependencies is not None)
+                self.__expand_descriptions(expansion, sit, dependencies, templates, read, stack + [template])
+                templates[template] = expansion
+                if dependencies is not None:
+                    dependencies[sit] = digest
+            value["expansion"] = templates[template]
+
+    def build_from_description(self, description, name=None):
+        """
+        @param description: Description of a model as returned by describe().
+        @param name: Name given to the top node instead of the one of the description, used to stamp the
+                     shared description of a sub-model out for each INSTANCE.
+        @return: The top node of the model.
+        """
+        tree = None
+        for key, value in description.items():
+            if name is not None:
+                value = dict(value, name=name)
+            tree = self.__load_node(key, value)
+            break
+        return tree
+
     def build_from_string(self, model_data):
+        self.__templates = {}
         self.__data = json.load(model_data)
         tree = None
         for key, value in self.__data.items():
@@ -143,13 +363,17 @@ class Builder(object):
         if node.injectors is None:
             return
         injectors = node.injectors
-        testinjection_interface = TestInjectionInterface()
-        test_access_interface = AccessInterface()
-        node.register_testinjection_interface(testinjection_interface)
+        # All injectors of a node share one TestInjectionInterface and AccessInterface, reusing the pair a
+        # Linker already has
+        testinjection_interface = node.transform_engine._testinjection_interface
+        if testinjection_interface is None or testinjection_interface.access_interface is None:
+            testinjection_interface = TestInjectionInterface()
+            test_access_interface = AccessInterface()
+            node.register_testinjection_interface(testinjection_interface)
+            testinjection_interface.registerAccessInterface(node.uid, test_access_interface)  # TODO - may need injector.iid instead
         for inj in injectors:
             for key in inj.keys():
                 injector = self.__build_injector(key, node)  # inj is a string from injectors list
-                testinjection_interface.registerAccessInterface(node.uid, test_access_interface)  # TODO - may need injector.iid instead
                 injector.register_testinjection_interface(testinjection_interface)
                 node.add_injector(injector)
                 injector.create(inj[key])
@@ -179,21 +403,31 @@ class Builder(object):
         return tree
 
     def __load_node(self, key, value):
-        tree = None
-        lut = {"ROOT": self.__load_root,
-               "CHAIN": self.__load_chain,
-               "LINKER": self.__load_linker,
-               "INSTANCE": self.__load_instance,
-               "MODELPOINT": self.__load_modelpoint,
-               "REGISTER": self.__load_register,
-               "CUSTOM": self.__load_custom,
-               "CONTROLLER": self.__load_controller}
-        tree = lut[key](value)
+        opener, has_children, finisher = self.__loaders[key]
+        tree, access_interface = opener(value)
+        if has_children:
+            for child in value.get("children"):
+                for ckey, cvalue in child.items():
+                    self.__attach(tree, access_interface, self.__load_node(ckey, cvalue))
+        if finisher is not None:
+            finisher(tree)
         return tree
 
-    def __load_root(self, node):
+    def __attach(self, tree, access_interface, ctree):
+        if access_interface is not None:
+            client_interface = ClientInterface()
+            client_interface.registerAccessInterface(access_interface)
+            ctree.register_client_interface(client_interface)
+        tree.add_child(ctree)
+
+    def __finish(self, tree):
+        self.__build_transform_strategy(tree)
+        self.__build_injection_strategy(tree)
+        self.__build_debug_strategy(tree)
+        self.__build_injectors(tree)
+
+    def __open_root(self, node):
         # node = n.get("ROOT")
-        children = node.get("children")
         tree = Root(node.get("name"))
         tree.hproto = node.get("hproto")
         tree.tstrategy = node.get("transform")
@@ -207,22 +441,10 @@ class Builder(object):
         # # testinjection_interface = TestInjectionInterface()
         # # testinjection_interface.registerAccessInterface(tree.uid, test_access_interface)
         # # tree.register_testinjection_interface(testinjection_interface)
-        for child in children:
-            for key, value in child.items():
-                ctree = self.__load_node(key, value)
-                # client_interface = ClientInterface()
-                # client_interface.registerAccessInterface(access_interface)
-                # ctree.register_client_interface(client_interface)
-                tree.add_child(ctree)
-        self.__build_transform_strategy(tree)
-        self.__build_injection_strategy(tree)
-        self.__build_debug_strategy(tree)
-        self.__build_injectors(tree)
-        return tree
+        return tree, None
 
-    def __load_controller(self, node):
+    def __open_controller(self, node):
         # node = n.get("CONTROLLER")
-        children = node.get("children")
         tree = Controller(node.get("name"))
         tree.hproto = node.get("hproto")
         tree.tstrategy = node.get("transform")
@@ -232,22 +454,10 @@ class Builder(object):
         host_interface = HostInterface()
         host_interface.registerAccessInterface(access_interface)
         tree.register_host_interface(host_interface)
-        for child in children:
-            for key, value in child.items():
-                ctree = self.__load_node(key, value)
-                client_interface = ClientInterface()
-                client_interface.registerAccessInterface(access_interface)
-                ctree.register_client_interface(client_interface)
-                tree.add_child(ctree)
-        self.__build_transform_strategy(tree)
-        self.__build_injection_strategy(tree)
-        self.__build_debug_strategy(tree)
-        self.__build_injectors(tree)
-        return tree
+        return tree, access_interface
 
-    def __load_chain(self, node):
+    def __open_chain(self, node):
         # node = n.get("CHAIN")
-        children = node.get("children")
         tree = Chain(node.get("name"))
         tree.cproto = node.get("cproto")
         tree.hproto = node.get("hproto")
@@ -267,28 +477,10 @@ class Builder(object):
         host_interface.registerAccessInterface(access_interface)
         tree.register_host_interface(host_interface)
         # tree.register_testinjection_interface(testinjection_interface)
-        for child in children:
-            for key, value in child.items():
-                ctree = self.__load_node(key, value)
-                client_interface = ClientInterface()
-                client_interface.registerAccessInterface(access_interface)
-                ctree.register_client_interface(client_interface)
-                tree.add_child(ctree)
-        # for inj in injectors:
-        #     itree = self.__load_injector(inj, tree.uid, tree.injectParams)
-        #     testinjection_interface.registerAccessInterface(test_access_interface)
-        #     itree.register_testinjection_interface(testinjection_interface)
-        #     itree.parameters = tree.inodeParams
-        #     itree.configure()
-        self.__build_transform_strategy(tree)
-        self.__build_injection_strategy(tree)
-        self.__build_debug_strategy(tree)
-        self.__build_injectors(tree)
-        return tree
+        return tree, access_interface
 
-    def __load_linker(self, node):
+    def __open_linker(self, node):
         # node = n.get("LINKER")
-        children = node.get("children")
         tree = Linker(node.get("name"))
         tree.cproto = node.get("cproto")
         tree.hproto = node.get("hproto")
@@ -319,35 +511,22 @@ class Builder(object):
         tree.register_host_interface(host_interface)
         testinjection_interface.registerAccessInterface(tree.uid, test_access_interface)
         tree.register_testinjection_interface(testinjection_interface)
-        for child in children:
-            for key, value in child.items():
-                ctree = self.__load_node(key, value)
-                client_interface = ClientInterface()
-                client_interface.registerAccessInterface(access_interface)
-                ctree.register_client_interface(client_interface)
-                tree.add_child(ctree)
-        # for inj in injectors:
-        #     itree = self.__load_injector(inj, tree.uid, tree.injectParams)
-        #     testinjection_interface.registerAccessInterface(test_access_interface)
-        #     itree.register_testinjection_interface(testinjection_interface)
-        #     itree.parameters = tree.inodeParams
-        #     itree.configure()
-        self.__build_transform_strategy(tree)
-        self.__build_injection_strategy(tree)
-        self.__build_debug_strategy(tree)
-        self.__build_injectors(tree)
-        return tree
+        return tree, access_interface
 
-    def __load_instance(self, node):
+    def __open_instance(self, node):
         # node = n.get("INSTANCE")
         tree = Instance(node.get("name"))
         tree.sit = node.get("sit")
         tree.factory = node.get("factory")
         tree.configure()
+        expansion = node.get("expansion")
+        if expansion is not None:
+            # Already read by describe()
+            return self.build_from_description(expansion, tree.name), None
         newtree = self.__expand_instance(tree)
-        return newtree
+        return newtree, None
 
-    def __load_modelpoint(self, node):
+    def __open_modelpoint(self, node):
         # node = n.get("MODELPOINT")
         tree = ModelPoint(node.get("name"))
         tree.cproto = node.get("cproto")
@@ -356,9 +535,9 @@ class Builder(object):
         tree.visible = node.get("visible")
         tree.transformParams = node.get("transformParams")
         tree.configure()
-        return tree
+        return tree, None
 
-    def __load_register(self, node):
+    def __open_register(self, node):
         # node = n.get("REGISTER")
         tree = Register(node.get("name"))
         tree.cproto = node.get("cproto")
@@ -397,15 +576,10 @@ class Builder(object):
         #     itree.register_testinjection_interface(testinjection_interface)
         #     itree.parameters = tree.inodeParams
         #     itree.configure()
-        self.__build_transform_strategy(tree)
-        self.__build_injection_strategy(tree)
-        self.__build_debug_strategy(tree)
-        self.__build_injectors(tree)
-        return tree
+        return tree, None
 
-    def __load_custom(self, node):
+    def __open_custom(self, node):
         # node = n.get("CUSTOM")
-        children = node.get("children")
         tree = Custom(node.get("name"))
         tree.cproto = node.get("cproto")
         tree.hproto = node.get("hproto")
@@ -435,29 +609,14 @@ class Builder(object):
         host_interface.registerAccessInterface(access_interface)
         tree.register_host_interface(host_interface)
         # tree.register_testinjection_interface(tree.uid, testinjection_interface)
-        for child in children:
-            for key, value in child.items():
-                ctree = self.__load_node(key, value)
-                client_interface = ClientInterface()
-                client_interface.registerAccessInterface(access_interface)
-                ctree.register_client_interface(client_interface)
-                tree.add_child(ctree)
-        # for inj in injectors:
-        #     itree = self.__load_injector(inj, tree.uid, tree.injectParams)
-        #     testinjection_interface.registerAccessInterface(test_access_interface)
-        #     itree.register_testinjection_interface(testinjection_interface)
-        #     itree.parameters = tree.inodeParams
-        #     itree.configure()
-        self.__build_transform_strategy(tree)
-        self.__build_injection_strategy(tree)
-        self.__build_debug_strategy(tree)
-        self.__build_injectors(tree)
-        return tree
+        return tree, access_interface
 
     def __expand_instance(self, instance):
         if instance.sit:
-            builder = Builder()
-            return builder.build_from_file(instance.sit)
+            template = os.path.abspath(instance.sit)
+            if template not in self.__templates:
+                self.__templates[template] = self.describe(instance.sit)
+            return self.build_from_description(self.__templates[template], instance.name)
         elif instance.factory:
             raise ModelError("INSTANCE with factory is not supported yet.")
         raise ModelError("INSTANCE not configured correctly.")
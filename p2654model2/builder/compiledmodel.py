@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""
+    CompiledModel is a flat, uid indexed representation of a built model used for message routing.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    CompiledModel is a flat, uid indexed representation of a built model used for message routing.  Once the
+    model is built and configured, NodeContainer.compile() walks the tree once and lays it out in tables
+    indexed by uid: the parent of each node, the range of its children in a flat child table, its
+    TransformEngine, transform strategy and injectors, its path, and the request/response routes to its
+    neighbours.  A request from a child then goes straight to the TransformEngine of its parent (recording
+    the requester in the AccessInterface as before), and a response straight to the child that made the
+    request (found by its correlation ID in the AccessInterface), instead of crossing the ClientInterface,
+    AccessInterface and HostInterface objects of every hop.  Routes the builder wired in some other way keep
+    going through the interfaces.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+from array import array
+from functools import partial
+
+import logging
+from autologging import logged
+from p2654model2.instrument.instrument import instrumented
+
+
+module_logger = logging.getLogger('p2654model2.builder.compiledmodel')
+
+
+def _route_request(access_interface, engine, message):
+    # Same bookkeeping as AccessInterface.sendRequest so responses find their way back
+    access_interface.open_request(message)
+    return engine.handleModelRequest(message)
+
+
+def _route_response(access_interface, engines, message):
+    return engines[access_interface.close_request(message)].handleResponse(message)
+
+
+@logged
+@instrumented("builder")
+class CompiledModel(object):
+    def __init__(self):
+        self.logger = logging.getLogger('p2654model2.builder.compiledmodel')
+        self.logger.info('Creating an instance of CompiledModel')
+        self.nodes = 0
+        # uid -> parent uid, -1 for the root and nodes not reachable from it
+        self.parent = array('l')
+        # Children of uid are children[first_child[uid]:first_child[uid] + child_count[uid]]
+        self.first_child = array('l')
+        self.child_count = array('l')
+        self.children = array('l')
+        # Injectors of uid are injectors[first_injector[uid]:first_injector[uid] + injector_count[uid]]
+        self.first_injector = array('l')
+        self.injector_count = array('l')
+        self.injectors = []
+        # uid -> TransformEngine, TransformStrategy (None if it has none) and path (None if not visible)
+        self.engines = []
+        self.strategies = []
+        self.paths = []
+        # uid -> callable carrying a request from the node to its parent, or a response from the node to the
+        # child that requested it; None where the node has no such neighbour
+        self.request = []
+        self.response = []
+        self.stats = {"direct_routes": 0, "interface_routes": 0}
+
+    def compile(self, nc):
+        """
+        Build the tables from the nodes of a NodeContainer whose top is defined.
+        @param nc: The NodeContainer.
+        """
+        if nc.top is None:
+            raise AssertionError("top has not been defined.")
+        n = nc.get_next_node_id()
+        self.nodes = n
+        self.parent = array('l', [-1]) * n
+        self.first_child = array('l', [0]) * n
+        self.child_count = array('l', [0]) * n
+        self.first_injector = array('l', [0]) * n
+        self.injector_count = array('l', [0]) * n
+        self.children = array('l')
+        self.injectors = []
+        self.engines = [nc.get_node_by_id(uid).transform_engine for uid in range(n)]
+        self.strategies = [te.get_transform_strategy() for te in self.engines]
+        self.paths = [None] * n
+        self.stats = {"direct_routes": 0, "interface_routes": 0}
+        for uid in range(n):
+            te = self.engines[uid]
+            children = te.get_children()
+            self.first_child[uid] = len(self.children)
+            self.child_count[uid] = len(children)
+            for child in children:
+                self.children.append(child.uid)
+                self.parent[child.uid] = uid
+            injectors = te.get_injection_children()
+            self.first_injector[uid] = len(self.injectors)
+            self.injector_count[uid] = len(injectors)
+            self.injectors.extend(injectors)
+        for uid in range(n):
+            try:
+                self.paths[uid] = nc.get_path_by_id(uid)
+            except ValueError:
+                self.paths[uid] = None
+        self.request = [self.__request_route(te) for te in self.engines]
+        self.response = [self.__response_route(uid, te) for uid, te in enumerate(self.engines)]
+        self.logger.info("CompiledModel.compile(): {:d} nodes, {:d} direct and {:d} interface routes".format(
+            n, self.stats["direct_routes"], self.stats["interface_routes"]))
+        return self
+
+    def __request_route(self, te):
+        client = te._client_interface
+        if client is None:
+            return None
+        access = client.access_interface
+        host = getattr(access.req_cb, "__self__", None)
+        if host is not None and access.req_cb.__func__ is type(host).handleRequest and \
+                getattr(host, "transform_engine", None) is not None:
+            self.stats["direct_routes"] += 1
+            return partial(_route_request, access, host.transform_engine)
+        self.stats["interface_routes"] += 1
+        return client.sendRequest
+
+    def __response_route(self, uid, te):
+        host = te._host_interface
+        if host is None:
+            return None
+        access = host.access_interface
+        start = self.first_child[uid]
+        for child in self.children[start:start + self.child_count[uid]]:
+            cb = access.resp_cb.get(child)
+            client = getattr(cb, "__self__", None)
+            if client is None or cb.__func__ is not type(client).handleResponse or \
+                    client.transform_engine is not self.engines[child]:
+                self.stats["interface_routes"] += 1
+                return host.sendResponse
+        self.stats["direct_routes"] += 1
+        return partial(_route_response, access, self.engines)
+
+    def get_parent(self, uid):
+        """
+        @return: uid of the parent of the node, None for the root.
+        """
+        p = self.parent[uid]
+        return None if p < 0 else p
+
+    def get_children(self, uid):
+        start = self.first_child[uid]
+        return self.children[start:start + self.child_count[uid]]
+
+    def get_injectors(self, uid):
+        start = self.first_injector[uid]
+        return self.injectors[start:start + self.injector_count[uid]]
+
+    def get_stats(self):
+        """
+        @return: Dictionary with the number of routes going straight to the neighbour TransformEngine
+                 (direct_routes) and of routes left on the interface objects (interface_routes).
+        """
+        return dict(self.stats)
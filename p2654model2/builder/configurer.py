@@ -36,6 +36,7 @@ import json
 import os
 
 from p2654model2.builder.moduleloader import ModuleLoader
+from p2654model2.scheduler.applypool import ApplyPoolFactory
 
 
 class Configurer(object):
@@ -59,6 +60,7 @@ class Configurer(object):
         self.__load_searchpaths()
         self.__load_strategies()
         self.__load_injectors()
+        self.__load_apply()
 
     def __load_searchpaths(self):
         spaths = None
@@ -134,6 +136,23 @@ class Configurer(object):
                 if inj["class"] not in class_names:
                     raise SyntaxError("injector class {:s} not found in {:s}.".format(inj["class"], inj["module"]))
 
+    def __load_apply(self):
+        '''
+        {
+          "apply" : { "workers": <threads applying independent controller subtrees, 0 or 1 for sequential> }
+        }
+        :return:
+        '''
+        settings = None
+        try:
+            settings = self.__data["apply"]
+        except KeyError:
+            return
+        workers = settings.get("workers", 0)
+        if not isinstance(workers, int) or workers < 0:
+            raise ValueError("apply workers must be a non-negative integer ({:s}).".format(str(workers)))
+        ApplyPoolFactory.get_applypool().set_workers(workers)
+
     def __load_debuggers(self):
         '''
         {
@@ -34,10 +34,15 @@ __status__ = "Alpha/Experimental"
 __version__ = "0.0.1"
 
 
-from time import sleep
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
 
 from drivers.ate.atesim import ATE, JTAGController, JTAGController2, GPIOController, I2CController, \
     SPIController
+from drivers.ate.ateasync import AsyncATE, AsyncJTAGController, AsyncGPIOController
+from drivers.ate.atelocal import register_board
 
 
 class Drivers(object):
@@ -47,7 +52,30 @@ class Drivers(object):
     gpio_inst = None
     i2c_inst = None
     spi_inst = None
+    async_ate_inst = None
+    async_jtag_inst = None
+    async_gpio_inst = None
     board_sim = None
+    pipeline_depth = 1
+    ready_timeout = 10.0
+    # Guard lazy creation so assemblies applied from different threads share one instance of each driver.  One
+    # lock per driver, so controllers being brought up together do not wait for each other's readiness checks.
+    locks = {name: threading.RLock() for name in ("ate", "jtag", "jtag2", "gpio", "i2c", "spi")}
+    async_locks = {}
+    ate_ip = "127.0.0.1"
+    ate_backend = "telnet"
+    backend_ports = {
+        "telnet": 5023,
+        "binary": 5024,
+        "local": 0,
+        "replay": 0,
+    }
+    trace_file = None
+    # Controller used by each controller assembly transform strategy
+    assemblies = {
+        "JTAGControllerAssembly": "jtag",
+        "GPIOControllerAssembly": "gpio",
+    }
 
     @staticmethod
     def get_board_sim():
@@ -58,66 +86,237 @@ class Drivers(object):
         Drivers.board_sim = board_sim
 
     @staticmethod
-    def get_ate():
-        if Drivers.ate_inst is None:
-            if Drivers.board_sim is None:
-                raise AssertionError("Drivers board_sim must be defined before getting drivers.")
-            ip = "127.0.0.1"
-            port = 5023
-            Drivers.ate_inst = ATE(ip=ip, port=port)
-            sleep(0.05)
-            Drivers.ate_inst.connect(Drivers.board_sim)
-            sleep(0.05)
-            while not Drivers.ate_inst.sim_status():
-                sleep(0.05)
-        return Drivers.ate_inst
+    def set_pipeline_depth(depth):
+        """
+        Number of ATE commands allowed in flight on the link.  Must be set before get_ate() is first called.
+        """
+        Drivers.pipeline_depth = depth
 
     @staticmethod
-    def get_jtag():
-        if Drivers.jtag_inst is None:
-            ate = Drivers.get_ate()
-            Drivers.jtag_inst = JTAGController(ate)
-            sleep(1)
-        return Drivers.jtag_inst
+    def set_ate_backend(backend):
+        """
+        Transport used to reach the Simulator: "telnet" for the ASCII protocol, "binary" for the
+        length-prefixed frames of drivers.ate.atebinary, "local" for the in-process SimulatedBoard of
+        drivers.ate.atelocal or "replay" to serve the session recorded in trace_file.  Must be set before
+        get_ate() is first called.
+        """
+        if backend not in Drivers.backend_ports:
+            raise ValueError("Unknown ATE backend ({:s}).".format(str(backend)))
+        Drivers.ate_backend = backend
 
     @staticmethod
-    def get_jtag2():
-        if Drivers.jtag2_inst is None:
-            ate = Drivers.get_ate()
-            Drivers.jtag2_inst = JTAGController2(ate)
-            sleep(1)
-        return Drivers.jtag2_inst
+    def get_ate_resource():
+        """
+        @return: Name of the ATE session ("ate:<ip>:<port>") every controller is driven through.  The controllers
+        share its socket and lock, so this is the resource their assemblies report to the ApplyPool.
+        """
+        return "ate:{:s}:{:d}".format(Drivers.ate_ip, Drivers.backend_ports[Drivers.ate_backend])
 
     @staticmethod
-    def get_gpio():
-        if Drivers.gpio_inst is None:
-            ate = Drivers.get_ate()
-            Drivers.gpio_inst = GPIOController(ate)
-            sleep(1)
-        return Drivers.gpio_inst
+    def set_trace_file(trace_file):
+        """
+        Trace the "replay" backend serves the session from, or for any other backend the file every ATE
+        transaction is recorded to.  None disables recording.  Must be set before get_ate() is first called.
+        """
+        Drivers.trace_file = trace_file
 
     @staticmethod
-    def get_i2c():
-        if Drivers.i2c_inst is None:
-            ate = Drivers.get_ate()
-            Drivers.i2c_inst = I2CController(ate)
-            sleep(1)
-        return Drivers.i2c_inst
+    def register_board_model(board_sim, sit_file):
+        """
+        SIT file the "local" backend builds its chain models from when board_sim is started.
+        """
+        register_board(board_sim, sit_file)
 
     @staticmethod
-    def get_spi():
-        if Drivers.spi_inst is None:
-            ate = Drivers.get_ate()
-            Drivers.spi_inst = SPIController(ate)
-            sleep(1)
-        return Drivers.spi_inst
+    def set_ready_timeout(timeout):
+        """
+        Seconds the Simulator and each controller are given to report ready before get_xxx() gives up.
+        """
+        Drivers.ready_timeout = timeout
+
+    @staticmethod
+    def __remaining(deadline):
+        if deadline is None:
+            return Drivers.ready_timeout
+        return max(0.0, deadline - monotonic())
+
+    @staticmethod
+    def __ready(name, inst, deadline):
+        if not inst.wait_ready(Drivers.__remaining(deadline)):
+            raise TimeoutError("{:s} not ready: {:s}".format(name, str(Drivers.ate_inst.get_error())))
+        return inst
+
+    @staticmethod
+    def get_ate(deadline=None):
+        """
+        @param deadline: time.monotonic() by which the Simulator must be running, ready_timeout from now if None.
+        """
+        with Drivers.locks["ate"]:
+            if Drivers.ate_inst is None:
+                if Drivers.board_sim is None:
+                    raise AssertionError("Drivers board_sim must be defined before getting drivers.")
+                ip = Drivers.ate_ip
+                port = Drivers.backend_ports[Drivers.ate_backend]
+                ate = ATE(ip=ip, port=port, pipeline_depth=Drivers.pipeline_depth, transport=Drivers.ate_backend,
+                          trace_file=Drivers.trace_file)
+                ate.connect(Drivers.board_sim)
+                if not ate.wait_ready(Drivers.__remaining(deadline)):
+                    raise TimeoutError("Simulator not ready: {:s}".format(str(ate.get_error())))
+                Drivers.ate_inst = ate
+            return Drivers.ate_inst
+
+    @staticmethod
+    def get_jtag(deadline=None):
+        with Drivers.locks["jtag"]:
+            if Drivers.jtag_inst is None:
+                ate = Drivers.get_ate(deadline)
+                Drivers.jtag_inst = Drivers.__ready("JTAGController", JTAGController(ate), deadline)
+            return Drivers.jtag_inst
+
+    @staticmethod
+    def get_jtag2(deadline=None):
+        with Drivers.locks["jtag2"]:
+            if Drivers.jtag2_inst is None:
+                ate = Drivers.get_ate(deadline)
+                Drivers.jtag2_inst = Drivers.__ready("JTAGController2", JTAGController2(ate), deadline)
+            return Drivers.jtag2_inst
+
+    @staticmethod
+    def get_gpio(deadline=None):
+        with Drivers.locks["gpio"]:
+            if Drivers.gpio_inst is None:
+                ate = Drivers.get_ate(deadline)
+                Drivers.gpio_inst = Drivers.__ready("GPIOController", GPIOController(ate), deadline)
+            return Drivers.gpio_inst
+
+    @staticmethod
+    def get_i2c(deadline=None):
+        with Drivers.locks["i2c"]:
+            if Drivers.i2c_inst is None:
+                ate = Drivers.get_ate(deadline)
+                Drivers.i2c_inst = Drivers.__ready("I2CController", I2CController(ate), deadline)
+            return Drivers.i2c_inst
+
+    @staticmethod
+    def get_spi(deadline=None):
+        with Drivers.locks["spi"]:
+            if Drivers.spi_inst is None:
+                ate = Drivers.get_ate(deadline)
+                Drivers.spi_inst = Drivers.__ready("SPIController", SPIController(ate), deadline)
+            return Drivers.spi_inst
+
+    @staticmethod
+    def prepare(names, timeout=None):
+        """
+        Bring up the named controllers ("jtag", "jtag2", "gpio", "i2c", "spi") concurrently under one shared
+        deadline, so startup is bounded by the slowest controller rather than by the sum of their readiness
+        checks.  Controllers not named are still created lazily on first use.
+        @param names: Names of the controllers, e.g. required(tree).
+        @param timeout: Seconds for the whole bring-up, ready_timeout if None.
+        @return: List of the controllers in the order of names.
+        """
+        deadline = monotonic() + (Drivers.ready_timeout if timeout is None else timeout)
+        getters = {
+            "jtag": Drivers.get_jtag,
+            "jtag2": Drivers.get_jtag2,
+            "gpio": Drivers.get_gpio,
+            "i2c": Drivers.get_i2c,
+            "spi": Drivers.get_spi,
+        }
+        Drivers.get_ate(deadline)
+        if len(names) < 2 or Drivers.trace_file is not None:
+            # A trace is recorded and replayed in command order, which concurrent bring-up would not keep
+            return [getters[name](deadline) for name in names]
+        # All controllers sit behind one ATE session; their polls interleave on its connection
+        with ThreadPoolExecutor(max_workers=len(names)) as pool:
+            futures = [pool.submit(getters[name], deadline) for name in names]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def required(tree):
+        """
+        @param tree: Top node of the model.
+        @return: Names of the controllers, in the form prepare() takes, driven by the controller assemblies of
+                 the model.
+        """
+        names = []
+        nodes = [tree]
+        while len(nodes):
+            node = nodes.pop()
+            name = Drivers.assemblies.get(node.tstrategy)
+            if name is not None and name not in names:
+                names.append(name)
+            nodes.extend(node.get_children())
+        return names
+
+    @staticmethod
+    def __async_lock(name):
+        if name not in Drivers.async_locks:
+            Drivers.async_locks[name] = asyncio.Lock()
+        return Drivers.async_locks[name]
+
+    @staticmethod
+    async def get_async_ate(deadline=None):
+        """
+        Coroutine returning the asyncio ATE session, connecting it on first use.  The session belongs to the
+        event loop it was first awaited from.
+        """
+        async with Drivers.__async_lock("ate"):
+            if Drivers.async_ate_inst is None:
+                if Drivers.board_sim is None:
+                    raise AssertionError("Drivers board_sim must be defined before getting drivers.")
+                ate = AsyncATE(ip=Drivers.ate_ip, port=Drivers.backend_ports[Drivers.ate_backend],
+                               pipeline_depth=Drivers.pipeline_depth, transport=Drivers.ate_backend)
+                await ate.connect(Drivers.board_sim)
+                if not await ate.wait_ready(Drivers.__remaining(deadline)):
+                    raise TimeoutError("Simulator not ready: {:s}".format(str(ate.get_error())))
+                Drivers.async_ate_inst = ate
+            return Drivers.async_ate_inst
+
+    @staticmethod
+    async def get_async_jtag(deadline=None):
+        async with Drivers.__async_lock("jtag"):
+            if Drivers.async_jtag_inst is None:
+                ate = await Drivers.get_async_ate(deadline)
+                jtag = AsyncJTAGController(ate)
+                if not await jtag.wait_ready(Drivers.__remaining(deadline)):
+                    raise TimeoutError("JTAGController not ready: {:s}".format(str(ate.get_error())))
+                Drivers.async_jtag_inst = jtag
+            return Drivers.async_jtag_inst
+
+    @staticmethod
+    async def get_async_gpio(deadline=None):
+        async with Drivers.__async_lock("gpio"):
+            if Drivers.async_gpio_inst is None:
+                ate = await Drivers.get_async_ate(deadline)
+                gpio = AsyncGPIOController(ate)
+                if not await gpio.wait_ready(Drivers.__remaining(deadline)):
+                    raise TimeoutError("GPIOController not ready: {:s}".format(str(ate.get_error())))
+                Drivers.async_gpio_inst = gpio
+            return Drivers.async_gpio_inst
+
+    @staticmethod
+    async def prepare_async(names, timeout=None):
+        """
+        Coroutine counterpart of prepare() for "jtag" and "gpio", bringing the controllers up concurrently.
+        """
+        deadline = monotonic() + (Drivers.ready_timeout if timeout is None else timeout)
+        getters = {
+            "jtag": Drivers.get_async_jtag,
+            "gpio": Drivers.get_async_gpio,
+        }
+        return await asyncio.gather(*[getters[name](deadline) for name in names])
 
     @staticmethod
     def remove_drivers():
         Drivers.ate_inst = None
-        Drivers.jtag1_inst = None
+        Drivers.jtag_inst = None
         Drivers.jtag2_inst = None
         Drivers.gpio_inst = None
         Drivers.i2c_inst = None
         Drivers.spi_inst = None
+        Drivers.async_ate_inst = None
+        Drivers.async_jtag_inst = None
+        Drivers.async_gpio_inst = None
+        Drivers.async_locks = {}
         Drivers.board_sim = None
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""
+    jsonstream reads a JSON document as a stream of parser events.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    jsonstream reads a JSON document as a stream of parser events, so the Builder can build the nodes of a
+    SIT file while it is being read instead of loading the whole document first.  The events are those of
+    ijson.basic_parse(): ("start_map", None), ("map_key", key), ("end_map", None), ("start_array", None),
+    ("end_array", None), ("string", value), ("number", value), ("boolean", value) and ("null", None).  ijson
+    is used when it is installed; otherwise the document is read in chunks by a tokenizer built on the
+    string scanner of the json module, holding only the chunk being parsed.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import io
+import json
+import re
+from json.decoder import scanstring
+
+try:
+    import ijson
+except ImportError:
+    # ijson is optional; _events() produces the same events
+    ijson = None
+
+import logging
+
+
+module_logger = logging.getLogger('p2654model2.builder.jsonstream')
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_TOKEN = re.compile(r'[^,:\]}\s]*')
+_SCALAR = re.compile(r'-?(?:0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?|true|false|null')
+_CONSTANTS = {"true": ("boolean", True), "false": ("boolean", False), "null": ("null", None)}
+
+# Tokenizer states: a value, a value or the end of an empty array, a key, a key or the end of an empty map,
+# the colon after a key, and what follows a value
+_VALUE, _FIRST_VALUE, _KEY, _FIRST_KEY, _COLON, _NEXT = range(6)
+
+
+def basic_parse(f, buf_size=64 * 1024):
+    """
+    @param f: JSON document opened in binary mode.
+    @param buf_size: Size of the chunks read from the document.
+    @return: Iterator over the parser events of the document.
+    """
+    if ijson is not None:
+        return ijson.basic_parse(f, buf_size=buf_size, use_float=True)
+    return _events(io.TextIOWrapper(f, encoding="utf-8"), buf_size)
+
+
+def _events(f, buf_size):
+    # Whatever is not complete in the chunk being parsed (a string, a number or the whitespace before the
+    # next token) is kept, the next chunk appended and the token parsed again
+    whitespace = _WHITESPACE.match
+    buf = ""
+    pos = 0
+    stack = []
+    state = _VALUE
+    while True:
+        pos = whitespace(buf, pos).end()
+        if pos == len(buf):
+            chunk = f.read(buf_size)
+            if chunk:
+                buf = chunk
+                pos = 0
+                continue
+            if stack or state != _NEXT:
+                raise ValueError("Unexpected end of the JSON document.")
+            return
+        c = buf[pos]
+        if state == _NEXT:
+            if not stack:
+                raise ValueError("Extra data after the JSON document.")
+            pos += 1
+            if c == ",":
+                state = _KEY if stack[-1] == "{" else _VALUE
+            elif c == "}" and stack[-1] == "{":
+                stack.pop()
+                yield "end_map", None
+            elif c == "]" and stack[-1] == "[":
+                stack.pop()
+                yield "end_array", None
+            else:
+                raise ValueError("Unexpected {:s} in the JSON document.".format(repr(c)))
+        elif state == _COLON:
+            if c != ":":
+                raise ValueError("Expected ':' in the JSON document, got {:s}.".format(repr(c)))
+            pos += 1
+            state = _VALUE
+        elif c == '"':
+            try:
+                s, pos = scanstring(buf, pos + 1, True)
+            except json.JSONDecodeError:
+                chunk = f.read(buf_size)
+                if not chunk:
+                    raise
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            if state == _KEY or state == _FIRST_KEY:
+                state = _COLON
+                yield "map_key", s
+            else:
+                state = _NEXT
+                yield "string", s
+        elif state == _KEY or state == _FIRST_KEY:
+            if c == "}" and state == _FIRST_KEY:
+                pos += 1
+                stack.pop()
+                state = _NEXT
+                yield "end_map", None
+            else:
+                raise ValueError("Expected a key in the JSON document, got {:s}.".format(repr(c)))
+        elif c == "{":
+            pos += 1
+            stack.append("{")
+            state = _FIRST_KEY
+            yield "start_map", None
+        elif c == "[":
+            pos += 1
+            stack.append("[")
+            state = _FIRST_VALUE
+            yield "start_array", None
+        elif c == "]" and state == _FIRST_VALUE:
+            pos += 1
+            stack.pop()
+            state = _NEXT
+            yield "end_array", None
+        else:
+            # A number or constant runs up to the next delimiter
+            end = _TOKEN.match(buf, pos).end()
+            if end == len(buf):
+                chunk = f.read(buf_size)
+                if chunk:
+                    buf = buf[pos:] + chunk
+                    pos = 0
+                    continue
+            token = buf[pos:end]
+            m = _SCALAR.fullmatch(token)
+            if m is None:
+                raise ValueError("Invalid JSON value {:s}.".format(repr(token[:20])))
+            pos = end
+            state = _NEXT
+            if token in _CONSTANTS:
+                yield _CONSTANTS[token]
+            elif m.group(1) or m.group(2):
+                yield "number", float(token)
+            else:
+                yield "number", int(token)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+"""
+    ModelCache keeps the expanded descriptions of built models on disk between runs.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    ModelCache keeps the expanded descriptions of built models on disk between runs.  The Builder turns a SIT
+    file into a description: the SIT tree with the tree of every INSTANCE sub-model file inlined under its
+    INSTANCE entry, holding the structure, parameters and selector tables of the whole model.  The
+    description is stored in a versioned artifact named after the SHA-256 of the SIT file, configure.json and
+    the strategy and injector modules it names, so a change to any of them selects another artifact.  The
+    artifact also records the hash of every INSTANCE sub-model file read, and is ignored when one of them
+    changed.  On a hit the Builder builds the model from the stored description without reading or expanding
+    any SIT file.  That is all a hit saves: nodes, strategies, injectors and interfaces are still created and
+    configured for every run, as they hold the driver connections and callbacks of the live model, and the
+    key hashes the strategy and injector modules each time.  It only pays off for models whose SIT files are
+    expensive to read, which is why main() does not use it.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+
+import logging
+
+
+module_logger = logging.getLogger('p2654model2.builder.modelcache')
+
+# Bumped whenever the layout of the descriptions changes so artifacts of older versions are not used
+FORMAT_VERSION = 1
+
+
+class ModelCache(object):
+    def __init__(self, directory=None):
+        """
+        @param directory: Directory of the artifacts, the P2654_MODEL_CACHE environment variable or
+                          .p2654cache in the current directory if None.
+        """
+        self.logger = logging.getLogger('p2654model2.builder.modelcache')
+        self.logger.info('Creating an instance of ModelCache')
+        if directory is None:
+            directory = os.environ.get("P2654_MODEL_CACHE", ".p2654cache")
+        self.directory = directory
+        self.enabled = True
+        self.stats = {"hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def hash_file(filename):
+        h = hashlib.sha256()
+        with open(filename, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def key(self, filename, config_file=None):
+        """
+        @param filename: The SIT file of the model.
+        @param config_file: The configure.json the strategies were loaded from, if any.
+        @return: Hexadecimal SHA-256 naming the artifact of the model.
+        """
+        h = hashlib.sha256()
+        h.update("P2654Model2 model cache {:d}\n".format(FORMAT_VERSION).encode())
+        h.update(self.hash_file(filename).encode())
+        if config_file is not None:
+            h.update(self.hash_file(config_file).encode())
+            with open(config_file) as f:
+                config = json.load(f)
+            for section in ("strategies", "injectors", "debuggers"):
+                for entry in config.get(section, []):
+                    h.update("{:s}={:s}\n".format(entry["module"], self.__module_version(entry["module"])).encode())
+        return h.hexdigest()
+
+    @staticmethod
+    def __module_version(module_name):
+        # Same lookup as ModuleLoader, without importing the module
+        modpath = module_name.replace(".", os.path.sep) + ".py"
+        for pth in sys.path:
+            modname = os.path.join(pth, modpath)
+            if os.path.exists(modname):
+                return ModelCache.hash_file(modname)
+        return "unknown"
+
+    def __artifact(self, key):
+        return os.path.join(self.directory, key + ".model")
+
+    def load(self, filename, config_file=None):
+        """
+        @param filename: The SIT file of the model.
+        @param config_file: The configure.json the strategies were loaded from, if any.
+        @return: The stored description of the model, None if there is no valid artifact for it.
+        """
+        if not self.enabled:
+            return None
+        artifact = self.__artifact(self.key(filename, config_file))
+        try:
+            with open(artifact, "rb") as f:
+                content = pickle.load(f)
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            self.logger.warning("ModelCache.load(): ignoring unreadable artifact {:s} ({:s})".format(
+                artifact, str(e)))
+            self.stats["misses"] += 1
+            return None
+        if content.get("version") != FORMAT_VERSION or not self.__dependencies_match(content["dependencies"]):
+            self.logger.info("ModelCache.load(): artifact {:s} is stale".format(artifact))
+            self.stats["misses"] += 1
+            return None
+        self.logger.info("ModelCache.load(): using {:s} for {:s}".format(artifact, filename))
+        self.stats["hits"] += 1
+        return content["description"]
+
+    def __dependencies_match(self, dependencies):
+        for filename, digest in dependencies.items():
+            try:
+                if self.hash_file(filename) != digest:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def store(self, filename, config_file, description, dependencies):
+        """
+        @param filename: The SIT file of the model.
+        @param config_file: The configure.json the strategies were loaded from, if any.
+        @param description: The expanded description of the model.
+        @param dependencies: Dictionary of the INSTANCE sub-model files read and their hashes.
+        @return: Path of the artifact written, None if the cache is disabled.
+        """
+        if not self.enabled:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        artifact = self.__artifact(self.key(filename, config_file))
+        content = {"version": FORMAT_VERSION, "sit": filename, "dependencies": dependencies,
+                   "description": description}
+        # Written aside and renamed so a concurrent run never reads a partial artifact
+        temp = "{:s}.{:d}.tmp".format(artifact, os.getpid())
+        with open(temp, "wb") as f:
+            pickle.dump(content, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, artifact)
+        self.stats["stores"] += 1
+        self.logger.info("ModelCache.store(): wrote {:s} for {:s}".format(artifact, filename))
+        return artifact
+
+    def clear(self):
+        """
+        Remove every artifact of the cache directory.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".model"):
+                os.remove(os.path.join(self.directory, name))
+
+    def get_stats(self):
+        """
+        @return: Dictionary with the number of loads served from an artifact (hits), of loads finding none
+                 (misses) and of artifacts written (stores).
+        """
+        return dict(self.stats)
+
+
+class ModelCacheFactory(object):
+    inst = None
+
+    @staticmethod
+    def get_modelcache():
+        if ModelCacheFactory.inst is None:
+            ModelCacheFactory.inst = ModelCache()
+        return ModelCacheFactory.inst
@@ -5,7 +5,9 @@
 
     NodeContainer is a helper class used to cache association information used to look up nodes instances.
     The application uses the NodeContainer to locate a node instance based on either the dot path name
-    or the UUID.
+    or the UUID.  The path index is built in one pass when the top is defined and kept up to date as children
+    are added under indexed nodes.  A trie of the path segments resolves paths relative to a prefix (iPrefix)
+    and glob patterns such as JTAGBoard1.JTAGChain.*.IR without scanning the whole model.
 
     This program is free software: you can redistribute it and/or modify
     it under the terms of the GNU General Public License as published by
@@ -34,15 +36,33 @@ __status__ = "Alpha/Experimental"
 __version__ = "0.0.1"
 
 
+from fnmatch import fnmatchcase
+from p2654model2.builder.compiledmodel import CompiledModel
+
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import instrumented
 
 
 module_logger = logging.getLogger('p2654model2.builder.nodecontainer')
 
+GLOB_CHARS = frozenset("*?[")
+
+
+class PathTrieNode(object):
+    """
+    One segment of the path trie: the uid of the node whose path ends here (None for none) and the trie
+    nodes of the next segments by name.
+    """
+    __slots__ = ("uid", "children")
+
+    def __init__(self):
+        self.uid = None
+        self.children = {}
+
 
 @logged
-@traced
+@instrumented("builder")
 class NodeContainer(object):
     inst = None
 
@@ -57,14 +77,40 @@ class NodeContainer(object):
         self.key_obj_map = {}
         self.path_key_map = {}
         self.key_path_map = {}
+        # uid -> (path, trie node) under which the visible children of the node are indexed, for every node
+        # reachable from the top; invisible nodes pass on the context of their parent
+        self.context = {}
+        self.trie = PathTrieNode()
         self.top = None
+        # Flat routing tables of the model, None until compile() and again once nodes are added
+        self.compiled = None
 
     def add_node(self, node):
         self.key_obj_map[len(self.container)] = node
         self.container.append(node)
+        self.compiled = None
+
+    def add_child(self, parent, child):
+        """
+        Index the paths of the subtree of a child just added to parent, if parent is reachable from the top.
+        Subtrees built before the top is defined are indexed by define_top().
+        """
+        ctx = self.context.get(parent.uid)
+        if ctx is not None:
+            self.__index(child, ctx[0], ctx[1])
+
+    def compile(self):
+        """
+        Lay the built and configured model out in the uid indexed tables of a CompiledModel, which message
+        routing uses from then on.
+        @return: The CompiledModel.
+        """
+        self.compiled = CompiledModel().compile(self)
+        return self.compiled
 
     def define_top(self, top_node):
         self.top = top_node
+        self.__build_path_cache()
 
     def get_next_node_id(self):
         return len(self.container)
@@ -74,63 +120,133 @@ class NodeContainer(object):
             raise ValueError("Identifier ({:d}) is out of range!".format(_id))
         return self.container[_id]
 
-    def get_node_by_path(self, _path):
-        key = self.path_key_map.get(_path)
-        node = self.key_obj_map.get(key)
-        if node is None and len(self.path_key_map.keys()) == 0:
-            # Build cache to speed up access for later calls
+    def get_node_by_path(self, _path, prefix=None):
+        """
+        @param _path: Dot path of the node.
+        @param prefix: Optional dot path (iPrefix) _path is relative to; _path is taken as absolute when no
+                       node is found under the prefix.
+        """
+        if not len(self.context) and self.top is not None:
             self.__build_path_cache()
+        key = None
+        if prefix:
+            key = self.__lookup(self.__trie_node(prefix.rstrip(".")), _path)
+        if key is None:
             key = self.path_key_map.get(_path)
-            node = self.key_obj_map.get(key)
+        node = self.key_obj_map.get(key)
         if node is None:
             raise ValueError("Path ({:s}) does not exist".format(_path))
         return node
 
     def get_path_by_id(self, _id):
-        path = self.key_path_map.get(_id)
-        if path is None and len(self.key_path_map.keys()) == 0:
-            # Build cache to speed up access for later calls
+        if not len(self.context) and self.top is not None:
             self.__build_path_cache()
-            path = self.key_path_map.get(_id)
+        path = self.key_path_map.get(_id)
         if path is None:
             raise ValueError("ID ({:d}) does not exist".format(_id))
         return path
 
+    def find_nodes(self, pattern, prefix=None):
+        """
+        Find the nodes whose path matches a glob pattern, each segment matched with fnmatch rules
+        (e.g. JTAGBoard1.JTAGChain.*.IR or U[12].IR).
+        @param pattern: Dot path pattern.
+        @param prefix: Optional dot path the pattern is relative to.
+        @return: List of the matching nodes in model order.
+        """
+        if not len(self.context) and self.top is not None:
+            self.__build_path_cache()
+        start = self.trie if not prefix else self.__trie_node(prefix.rstrip("."))
+        if start is None:
+            return []
+        level = [start]
+        for segment in pattern.split("."):
+            nxt = []
+            glob = not GLOB_CHARS.isdisjoint(segment)
+            for t in level:
+                if glob:
+                    nxt.extend(c for name, c in t.children.items() if fnmatchcase(name, segment))
+                else:
+                    c = t.children.get(segment)
+                    if c is not None:
+                        nxt.append(c)
+            level = nxt
+        return [self.key_obj_map[uid] for uid in sorted(t.uid for t in level if t.uid is not None)]
+
+    def get_paths_with_prefix(self, prefix):
+        """
+        @return: List of the paths at or below prefix, in model order.
+        """
+        if not len(self.context) and self.top is not None:
+            self.__build_path_cache()
+        start = self.__trie_node(prefix.rstrip("."))
+        if start is None:
+            return []
+        uids = []
+        stack = [start]
+        while stack:
+            t = stack.pop()
+            if t.uid is not None:
+                uids.append(t.uid)
+            stack.extend(t.children.values())
+        return [self.key_path_map[uid] for uid in sorted(uids)]
+
+    def __trie_node(self, path):
+        t = self.trie
+        for segment in path.split("."):
+            t = t.children.get(segment)
+            if t is None:
+                return None
+        return t
+
+    @staticmethod
+    def __lookup(start, path):
+        t = start
+        if t is None:
+            return None
+        for segment in path.split("."):
+            t = t.children.get(segment)
+            if t is None:
+                return None
+        return t.uid
+
     def __build_path_cache(self):
         if self.top is None:
             raise AssertionError("top has not been defined.")
-        # Depth first search to discover path to node
-        parent = self.top.name
-        self.key_obj_map[0] = self.top
-        self.path_key_map[parent] = 0
-        self.key_path_map[0] = parent
-        child = self.top
-        children = child.get_children()
-        for c in children:
-            if c.visible:
-                for k in self.key_obj_map.keys():
-                    if c == self.key_obj_map[k]:
-                        self.path_key_map[parent + "." + c.name] = k
-                        self.key_path_map[k] = parent + "." + c.name
-                        self.__build_subpath_cache(parent + "." + c.name, c)
-            else:
-                self.__build_subpath_cache(parent, c)
-
-    def __build_subpath_cache(self, parent, node):
-        children = node.get_children()
-        for c in children:
-            if c.visible:
-                for k in self.key_obj_map.keys():
-                    if c == self.key_obj_map[k]:
-                        self.path_key_map[parent + "." + c.name] = k
-                        self.key_path_map[k] = parent + "." + c.name
-                        self.__build_subpath_cache(parent + "." + c.name, c)
+        self.path_key_map = {}
+        self.key_path_map = {}
+        self.context = {}
+        self.trie = PathTrieNode()
+        top = self.trie.children[self.top.name] = PathTrieNode()
+        self.__record(self.top, self.top.name, top)
+        for c in self.top.get_children():
+            self.__index(c, self.top.name, top)
+
+    def __record(self, node, path, trie_node):
+        self.key_obj_map[node.uid] = node
+        self.path_key_map[path] = node.uid
+        self.key_path_map[node.uid] = path
+        trie_node.uid = node.uid
+        self.context[node.uid] = (path, trie_node)
+
+    def __index(self, node, parent_path, parent_trie):
+        # Depth first over the subtree; invisible nodes take no path segment of their own
+        stack = [(node, parent_path, parent_trie)]
+        while stack:
+            n, path, t = stack.pop()
+            if n.visible:
+                path = path + "." + n.name
+                t = t.children.setdefault(n.name, PathTrieNode())
+                self.__record(n, path, t)
             else:
-                self.__build_subpath_cache(parent, c)
+                self.context[n.uid] = (path, t)
+            for c in reversed(n.get_children()):
+                stack.append((c, path, t))
 
     def dump(self):
         print("Dumping path cache:")
-        self.__build_path_cache()
+        if not len(self.context) and self.top is not None:
+            self.__build_path_cache()
         print(str(self.container))
         for key in self.path_key_map.keys():
             print("path = {:s}, uid = {:d}".format(key, self.key_obj_map[self.path_key_map[key]].uid))
@@ -39,14 +39,16 @@ import p2654model2.rvf.commands.register_pb2
 import p2654model2.rvf.protocols.GPIO_pb2
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 
 module_logger = logging.getLogger('p2654model2.injectors.GPio')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("injector")
 class GPio(object):
     __indent = 0
 
@@ -104,7 +106,8 @@ class GPio(object):
         pending = 0
         err = 0
         if self.has_write:
-            self.logger.debug("GPio.apply(): processing OUTPUT RVF\n")
+            if instrument.injector:
+                instrument.emit("injector", "GPio.apply", command="OUTPUT")
             metaname = "OUTPUT"
             rvf1 = p2654model2.rvf.protocols.GPIO_pb2.OUTPUT()
             rvf1.UID = self.node_uid
@@ -114,7 +117,8 @@ class GPio(object):
             if not self.__sendRequest(self.node_uid, rvf1, metaname):
                 err += 1
         elif self.has_read:
-            self.logger.debug("GPio.apply(): processing INPUT RVF\n")
+            if instrument.injector:
+                instrument.emit("injector", "GPio.apply", command="INPUT")
             metaname = "INPUT"
             rvf1 = p2654model2.rvf.protocols.GPIO_pb2.INPUT()
             rvf1.UID = self.node_uid
@@ -125,7 +129,8 @@ class GPio(object):
             if not self.__sendRequest(self.node_uid, rvf1, metaname):
                 err += 1
         else:
-            self.logger.debug("GPio.apply(): processing no RVF\n")
+            if instrument.injector:
+                instrument.emit("injector", "GPio.apply", command=None)
             return 0
         if err:
             return -1
@@ -141,7 +146,8 @@ class GPio(object):
         return ["WRITE", "READ", "GET"]
 
     def handleResponse(self, iid, message):
-        self.logger.debug("GPio.handleResponse(): handling {:s} RVF.\n".format(message.metaname))
+        if instrument.injector:
+            instrument.emit("injector", "GPio.handleResponse", command=message.metaname)
         # message = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         # message.ParseFromString(rvf_message)
         if message.metaname == "INPUT":
@@ -154,7 +160,8 @@ class GPio(object):
             return self.__output_resp_cb(iid, s)
 
     def handleCommand(self, iid, wrapper):
-        self.logger.debug("GPio.handleCommand(): handling command ({:s}).\n".format(wrapper.metaname))
+        if instrument.injector:
+            instrument.emit("injector", "GPio.handleCommand", command=wrapper.metaname)
         print("gpio handling command ({:s}).".format(wrapper.metaname))
         if wrapper.metaname == "WRITE":
             s = p2654model2.rvf.commands.register_pb2.WRITE()
@@ -211,7 +218,8 @@ class GPio(object):
         return True
 
     def __sendRequest(self, uid, message, metaname):
-        self.logger.debug("GPio.__sendRequest(): sending {:s} RVF.\n".format(metaname))
+        if instrument.injector:
+            instrument.emit("injector", "GPio.__sendRequest", command=metaname)
         rvf = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         rvf.UID = uid
         rvf.metaname = metaname
@@ -219,7 +227,8 @@ class GPio(object):
         return self.sendRequestCallback(rvf)
 
     def __updateDataValue(self, node_uid):
-        self.logger.debug("GPio.__updateDataValue({:s}):\n".format(self.name))
+        if instrument.injector:
+            instrument.emit("injector", "GPio.__updateDataValue", node=self.name)
         dvmsg = p2654model2.rvf.rvfmessage_pb2.RVFDataValue()
         dvmsg.UID = node_uid
         dvmsg.data.append(self.input)
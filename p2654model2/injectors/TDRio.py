@@ -42,13 +42,15 @@ import p2654model2.rvf.protocols.SCAN_pb2
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 module_logger = logging.getLogger('P2654Model2.injectors.TDRio')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("injector")
 class TDRio(object):
     __indent = 0
 
@@ -127,7 +129,8 @@ class TDRio(object):
         err = 0
         rvf1 = None
         if self.has_write and self.has_read:
-            self.logger.debug("TDRio.apply(): processing CSU RVF\n")
+            if instrument.injector:
+                instrument.emit("injector", "TDRio.apply", command="CSU")
             metaname = "CSU"
             rvf1 = p2654model2.rvf.protocols.SCAN_pb2.CSU()
             self.local_access_mutex.acquire()
@@ -140,7 +143,8 @@ class TDRio(object):
             self.has_write = False
             self.has_read = False
         elif self.has_write:
-            self.logger.debug("TDRio.apply(): processing SU RVF\n")
+            if instrument.injector:
+                instrument.emit("injector", "TDRio.apply", command="SU")
             metaname = "SU"
             rvf1 = p2654model2.rvf.protocols.SCAN_pb2.SU()
             self.local_access_mutex.acquire()
@@ -150,7 +154,8 @@ class TDRio(object):
             pending += 1
             self.has_write = False
         elif self.has_read:
-            self.logger.debug("TDRio.apply(): processing CS RVF\n")
+            if instrument.injector:
+                instrument.emit("injector", "TDRio.apply", command="CS")
             metaname = "CS"
             rvf1 = p2654model2.rvf.protocols.SCAN_pb2.CS()
             self.local_access_mutex.acquire()
@@ -160,7 +165,8 @@ class TDRio(object):
             pending += 1
             self.has_read = False
         else:
-            self.logger.debug("TDRio.apply(): processing no RVF\n")
+            if instrument.injector:
+                instrument.emit("injector", "TDRio.apply", command=None)
             return 0
         rvf1.UID = self.node_uid
         rvf1.nrbits = self.size
@@ -180,7 +186,8 @@ class TDRio(object):
         return ["WRITE", "READ", "GET", "SHIFT", "ENDSTATE"]
 
     def handleResponse(self, iid, message):
-        self.logger.debug("GPio.handleResponse(): handling {:s} RVF.\n".format(message.metaname))
+        if instrument.injector:
+            instrument.emit("injector", "GPio.handleResponse", command=message.metaname)
         # message = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         # message.ParseFromString(rvf_message)
         if message.metaname == "CSU":
@@ -205,7 +212,8 @@ class TDRio(object):
             return self.__endstate_resp_cb(iid, s)
 
     def handleCommand(self, iid, wrapper):
-        self.logger.debug("TDRio.handleCommand(): handling command ({:s}).\n".format(wrapper.metaname))
+        if instrument.injector:
+            instrument.emit("injector", "TDRio.handleCommand", command=wrapper.metaname)
         print("tdrio handling command ({:s}).".format(wrapper.metaname))
         if wrapper.metaname == "WRITE":
             s = p2654model2.rvf.commands.register_pb2.WRITE()
@@ -354,7 +362,8 @@ class TDRio(object):
         return True
 
     def __sendRequest(self, uid, message, metaname):
-        self.logger.debug("TDRio.__sendRequest(): sending {:s} RVF.\n".format(metaname))
+        if instrument.injector:
+            instrument.emit("injector", "TDRio.__sendRequest", command=metaname)
         rvf = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         rvf.UID = uid
         rvf.metaname = metaname
@@ -362,7 +371,8 @@ class TDRio(object):
         return self.sendRequestCallback(rvf)
 
     def __updateDataValue(self, node_uid):
-        self.logger.debug("TDRio.__updateDataValue({:s}):\n".format(self.name))
+        if instrument.injector:
+            instrument.emit("injector", "TDRio.__updateDataValue", node=self.name)
         dvmsg = p2654model2.rvf.rvfmessage_pb2.RVFDataValue()
         dvmsg.UID = node_uid
         for v in self.so:
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+"""
+    Instrument is the switchable tracing layer of the model, drivers and parser.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    Instrument is the switchable tracing layer of the model, drivers and parser.  Classes are registered with
+    @instrumented(subsystem) instead of being wrapped by @traced, and hot paths guard their trace points with
+    a plain flag test (if instrument.engine: instrument.emit(...)).  While a subsystem is disabled, which is
+    the default, its classes are left exactly as defined and its trace points cost one attribute test, so
+    nothing is formatted or wrapped.  enable() turns subsystems on at run time: the methods of their classes
+    are replaced by wrappers emitting call and return events, and their trace points start emitting.
+    disable() puts the original methods back.  Callables bound before enable() (e.g. callbacks registered
+    while building the model) keep calling the original methods.
+
+    Events are structured: an Event tuple carrying the time, thread, subsystem, event name and a dictionary
+    of fields, handed to every registered sink.  Without a sink, events are logged at DEBUG level on the
+    'p2654model2.instrument.<subsystem>' logger, formatted only if that logger emits them.
+
+    The subsystems named in the P2654_INSTRUMENT environment variable (comma separated, or "all") are
+    enabled when the Instrument is created.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+from collections import namedtuple
+from functools import wraps
+from time import perf_counter_ns
+import os
+import threading
+
+import logging
+
+
+module_logger = logging.getLogger('p2654model2.instrument.instrument')
+
+SUBSYSTEMS = ("driver", "strategy", "engine", "interface", "injector", "parser", "scheduler", "builder")
+
+Event = namedtuple("Event", ["time", "thread", "subsystem", "name", "fields"])
+
+
+class Instrument(object):
+    """
+    Holds one boolean attribute per subsystem (instrument.engine, instrument.strategy, ...) telling whether
+    it is enabled.
+    """
+    def __init__(self):
+        self.logger = logging.getLogger('p2654model2.instrument.instrument')
+        self.lock = threading.Lock()
+        for subsystem in SUBSYSTEMS:
+            setattr(self, subsystem, False)
+        # subsystem -> registered classes, and class -> {name: original member} while it is wrapped
+        self.classes = {subsystem: [] for subsystem in SUBSYSTEMS}
+        self.originals = {}
+        self.sinks = []
+        self.loggers = {subsystem: logging.getLogger('p2654model2.instrument.' + subsystem)
+                        for subsystem in SUBSYSTEMS}
+        names = os.environ.get("P2654_INSTRUMENT", "")
+        if names:
+            self.enable(*[n.strip() for n in names.split(",") if n.strip()])
+
+    def register(self, subsystem, cls):
+        """
+        Add a class to a subsystem, wrapping its methods at once if the subsystem is enabled.
+        """
+        self.__check(subsystem)
+        with self.lock:
+            self.classes[subsystem].append(cls)
+            if getattr(self, subsystem):
+                self.__wrap(subsystem, cls)
+        return cls
+
+    def enable(self, *subsystems):
+        """
+        @param subsystems: Names of the subsystems to turn on, or "all".
+        """
+        with self.lock:
+            for subsystem in self.__expand(subsystems):
+                if not getattr(self, subsystem):
+                    for cls in self.classes[subsystem]:
+                        self.__wrap(subsystem, cls)
+                    setattr(self, subsystem, True)
+                    self.logger.info("Instrument.enable(): {:s} enabled".format(subsystem))
+
+    def disable(self, *subsystems):
+        """
+        @param subsystems: Names of the subsystems to turn off, or "all".
+        """
+        with self.lock:
+            for subsystem in self.__expand(subsystems):
+                if getattr(self, subsystem):
+                    setattr(self, subsystem, False)
+                    for cls in self.classes[subsystem]:
+                        self.__unwrap(cls)
+                    self.logger.info("Instrument.disable(): {:s} disabled".format(subsystem))
+
+    def is_enabled(self, subsystem):
+        self.__check(subsystem)
+        return getattr(self, subsystem)
+
+    def add_sink(self, sink):
+        """
+        @param sink: Callable receiving every Event emitted; replaces the default logging of events.
+        """
+        with self.lock:
+            self.sinks = self.sinks + [sink]
+
+    def remove_sink(self, sink):
+        with self.lock:
+            self.sinks = [s for s in self.sinks if s is not sink]
+
+    def emit(self, subsystem, name, **fields):
+        """
+        Hand an event to the sinks.  Callers test the subsystem flag first so nothing is built when it is off.
+        @param subsystem: Subsystem emitting the event.
+        @param name: Name of the event, normally "Class.method".
+        @param fields: Values describing the event, passed as they are.
+        """
+        event = Event(perf_counter_ns(), threading.get_ident(), subsystem, name, fields)
+        sinks = self.sinks
+        if not sinks:
+            self.loggers[subsystem].debug("%s %r", name, fields)
+            return
+        for sink in sinks:
+            sink(event)
+
+    def __check(self, subsystem):
+        if subsystem not in self.classes:
+            raise ValueError("Unknown instrumentation subsystem {:s}.".format(str(subsystem)))
+
+    def __expand(self, subsystems):
+        if "all" in subsystems:
+            return SUBSYSTEMS
+        for subsystem in subsystems:
+            self.__check(subsystem)
+        return subsystems
+
+    def __wrap(self, subsystem, cls):
+        # Same selection as autologging @traced: every routine defined by the class except the special
+        # methods other than __init__ and __call__
+        originals = {}
+        for name, member in list(cls.__dict__.items()):
+            if name.startswith("__") and name.endswith("__") and name not in ("__init__", "__call__"):
+                continue
+            if isinstance(member, (staticmethod, classmethod)):
+                fn = member.__func__
+            elif callable(member) and hasattr(member, "__code__"):
+                fn = member
+            else:
+                continue
+            qualname = cls.__name__ + "." + (name[len(cls.__name__) + 1:] if name.startswith(
+                "_" + cls.__name__ + "__") else name)
+            wrapper = self.__tracer(subsystem, qualname, fn, isinstance(member, staticmethod))
+            if isinstance(member, staticmethod):
+                wrapper = staticmethod(wrapper)
+            elif isinstance(member, classmethod):
+                wrapper = classmethod(wrapper)
+            originals[name] = member
+            setattr(cls, name, wrapper)
+        self.originals[cls] = originals
+
+    def __unwrap(self, cls):
+        for name, member in self.originals.pop(cls, {}).items():
+            setattr(cls, name, member)
+
+    def __tracer(self, subsystem, qualname, fn, static):
+        emit = self.emit
+        skip = 0 if static else 1
+
+        @wraps(fn)
+        def traced_call(*args, **kwargs):
+            emit(subsystem, "call", method=qualname, args=args[skip:], kwargs=kwargs)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                emit(subsystem, "raise", method=qualname, exception=e)
+                raise
+            emit(subsystem, "return", method=qualname, result=result)
+            return result
+        return traced_call
+
+
+class InstrumentFactory(object):
+    inst = None
+
+    @staticmethod
+    def get_instrument():
+        if InstrumentFactory.inst is None:
+            InstrumentFactory.inst = Instrument()
+        return InstrumentFactory.inst
+
+
+def instrumented(subsystem):
+    """
+    Class decorator registering the class with a subsystem of the Instrument, in place of @traced.
+    @param subsystem: One of SUBSYSTEMS.
+    """
+    def register(cls):
+        return InstrumentFactory.get_instrument().register(subsystem, cls)
+    return register
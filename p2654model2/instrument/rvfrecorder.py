@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+    RVFRecorder keeps the most recent RVF hops of the model in a fixed size ring buffer.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    RVFRecorder keeps the most recent RVF hops of the model in a fixed size ring buffer.  Each
+    TransformEngine records the messages it sends, handles and updates: the time, the uid of the node, the
+    UID and metaname carried by the message, the direction of the hop and the number of bits when the
+    message carries them (RVFDataValue; the RVFMessage wrappers keep theirs in the serialized payload, which
+    is not decoded, and record -1).  The slots are allocated once and a record only stores one tuple in the
+    next slot, so the recorder stays on in production.  The content is dumped
+    to a logger when an iApply fails, or on demand with dump() and snapshot().
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+from itertools import count
+from time import perf_counter_ns
+import threading
+
+import logging
+
+
+module_logger = logging.getLogger('p2654model2.instrument.rvfrecorder')
+
+SEND_REQUEST, HANDLE_REQUEST, SEND_RESPONSE, HANDLE_RESPONSE, UPDATE_REQUEST, UPDATE_RESPONSE, \
+    UPDATE_DATA_VALUE = range(7)
+DIRECTIONS = ("sendRequest", "handleRequest", "sendResponse", "handleResponse", "updateRequest",
+              "updateResponse", "updateDataValue")
+
+
+class RVFRecorder(object):
+    def __init__(self, capacity=4096):
+        self.logger = logging.getLogger('p2654model2.instrument.rvfrecorder')
+        self.lock = threading.Lock()
+        self.enabled = True
+        self.__allocate(capacity)
+
+    def __allocate(self, capacity):
+        if capacity < 1:
+            raise ValueError("RVFRecorder capacity must be at least 1.")
+        self.capacity = capacity
+        # slot -> (sequence number, time in ns, node uid, message UID, direction, metaname, nrbits), None while
+        # unused
+        self.slots = [None] * capacity
+        # next() on itertools.count is atomic, so the apply threads of the ApplyPool each get their own slot
+        self.counter = count()
+
+    def set_capacity(self, capacity):
+        """
+        Reallocate the buffer, dropping what it holds.
+        """
+        with self.lock:
+            self.__allocate(capacity)
+
+    def record(self, direction, node_uid, message):
+        """
+        @param direction: One of SEND_REQUEST ... UPDATE_DATA_VALUE.
+        @param node_uid: uid of the node the message passes.
+        @param message: The RVF message.
+        """
+        if not self.enabled:
+            return
+        n = next(self.counter)
+        if direction == UPDATE_DATA_VALUE:
+            # RVFDataValue, the only hop carrying its bits outside a serialized payload
+            self.slots[n % self.capacity] = (n, perf_counter_ns(), node_uid, message.UID, direction, None,
+                                             message.nrbits)
+        else:
+            self.slots[n % self.capacity] = (n, perf_counter_ns(), node_uid, message.UID, direction,
+                                             message.metaname, -1)
+
+    def clear(self):
+        with self.lock:
+            self.counter = count()
+            self.slots = [None] * self.capacity
+
+    def get_recorded(self):
+        """
+        @return: Number of hops recorded since the last clear(), including those the buffer no longer holds.
+        """
+        with self.lock:
+            return self.__total()
+
+    def __total(self):
+        # Derived from the sequence numbers stored, so a thread finishing its record after a newer one was
+        # stored never makes the total go backwards
+        return max((slot[0] + 1 for slot in self.slots if slot is not None), default=0)
+
+    def snapshot(self):
+        """
+        @return: List of the recorded hops, oldest first, as tuples (time in ns, node uid, message UID,
+                 direction name, metaname, nrbits).
+        """
+        with self.lock:
+            oldest = self.__total() - self.capacity
+            # A slot still empty was taken by a thread that has not stored its record yet
+            slots = sorted(slot for slot in self.slots if slot is not None and slot[0] >= oldest)
+            return [(t, node, uid, DIRECTIONS[direction], metaname, nrbits)
+                    for n, t, node, uid, direction, metaname, nrbits in slots]
+
+    def dump(self, logger=None, level=logging.ERROR):
+        """
+        Log the recorded hops, oldest first, with times relative to the newest one.
+        @param logger: Logger to write to, the recorder's own if None.
+        @param level: Logging level of the lines.
+        @return: Number of hops logged.
+        """
+        logger = self.logger if logger is None else logger
+        hops = self.snapshot()
+        if not len(hops):
+            return 0
+        last = hops[-1][0]
+        logger.log(level, "RVF flow, last {:d} of {:d} hops:".format(len(hops), self.get_recorded()))
+        for t, node, uid, direction, metaname, nrbits in hops:
+            logger.log(level, "{:12.3f} us node={:d} UID={:d} {:s} {:s} nrbits={:d}".format(
+                (t - last) / 1e3, node, uid, direction, str(metaname), nrbits))
+        return len(hops)
+
+
+class RVFRecorderFactory(object):
+    inst = None
+
+    @staticmethod
+    def get_recorder():
+        if RVFRecorderFactory.inst is None:
+            RVFRecorderFactory.inst = RVFRecorder()
+        return RVFRecorderFactory.inst
@@ -34,58 +34,98 @@ __status__ = "Alpha/Experimental"
 __version__ = "0.0.1"
 
 
+from itertools import count
 from threading import Event
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 
 import p2654model2.rvf.rvfmessage_pb2
 # create logger
 module_logger = logging.getLogger('P2654Model2.interface.accessinterface')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("interface")
 class AccessInterface(object):
     __indent = 0
     stop_event = Event()
+    # Correlation IDs are unique over all the interfaces; next() on a count is atomic
+    cids = count()
+    __slots__ = ("req_cb", "resp_cb", "updreq_cb", "updresp_cb", "current_uid", "pending")
+    logger = logging.getLogger('P2654Model2.interface.accessinterface')
 
     @staticmethod
     def stop():
         AccessInterface.stop_event.set()
 
     def __init__(self):
-        self.logger = logging.getLogger('P2654Model2.interface.accessinterface')
         self.logger.info('Creating an instance of AccessInterface')
         self.req_cb = None
         self.resp_cb = {}
         self.updreq_cb = {}
         self.updresp_cb = {}
         self.current_uid = None
+        # Correlation ID -> uid of the requester, for the requests waiting for their response
+        self.pending = {}
+
+    def open_request(self, rvf):
+        """
+        Give the request a correlation ID, unless it has one, and remember its requester until the response
+        carrying the ID comes back.
+        """
+        if not rvf.CID:
+            rvf.CID = next(AccessInterface.cids) % 0xFFFFFFFF + 1
+        self.pending[rvf.CID] = rvf.UID
+        self.current_uid = rvf.UID
+
+    def close_request(self, rvf):
+        """
+        @return: uid of the requester the response goes to: the one that sent the request with the same
+                 correlation ID, or the last requester for responses carrying none.
+        """
+        uid = self.pending.pop(rvf.CID, None) if rvf.CID else None
+        return self.current_uid if uid is None else uid
+
+    def find_request(self, rvf):
+        """
+        @return: uid of the requester an update response goes to, found the same way as by close_request().
+                 The request stays pending until its response is sent.
+        """
+        uid = self.pending.get(rvf.CID) if rvf.CID else None
+        return self.current_uid if uid is None else uid
+
+    def get_pending(self):
+        """
+        @return: Dictionary of correlation ID to requester uid of the requests waiting for their response.
+        """
+        return dict(self.pending)
 
     def sendRequest(self, rvf):
-        self.logger.debug("AccessInterface: Request(uid={:d}, command={:s})\n".format(rvf.UID, rvf.metaname))
         if self.req_cb is not None:
-            self.logger.debug("AccessInterface.sendRequest(): Before call to self.req_cb().\n")
-            self.current_uid = rvf.UID
-            self.logger.debug("AccessInterface: Dispatching Request(uid={:d}, command={:s})\n".format(rvf.UID,
-                                                                                                      rvf.metaname))
-            self.logger.debug("dump of req_cb\n{:s}\n".format(str(self.req_cb)))
+            self.open_request(rvf)
+            if instrument.interface:
+                instrument.emit("interface", "AccessInterface.sendRequest", uid=rvf.UID, cid=rvf.CID,
+                                command=rvf.metaname, callback=self.req_cb)
             return self.req_cb(rvf)
         else:
             return None
 
     def set_req_callback(self, uid, cb):
-        self.logger.debug("set_req_callback({:d}, {:s})\n".format(uid, str(cb)))
+        if instrument.interface:
+            instrument.emit("interface", "AccessInterface.set_req_callback", uid=uid, callback=cb)
         self.req_cb = cb
 
     def sendResponse(self, rvf):
-        self.logger.debug("AccessInterface: Response(uid={:d}, command={:s})\n".format(rvf.UID, rvf.metaname))
         if self.resp_cb is not None:
-            self.logger.debug("AccessInterface: Dispatching Response(uid={:d}, command={:s})\n".format(rvf.UID,
-                                                                                                       rvf.metaname))
-            return self.resp_cb[self.current_uid](rvf)
+            requester = self.close_request(rvf)
+            if instrument.interface:
+                instrument.emit("interface", "AccessInterface.sendResponse", uid=rvf.UID, cid=rvf.CID,
+                                command=rvf.metaname, requester=requester)
+            return self.resp_cb[requester](rvf)
         else:
             return None
 
@@ -93,26 +133,26 @@ class AccessInterface(object):
         self.resp_cb.update({uid: cb})
 
     def updateRequest(self, rvf):
-        self.logger.debug("AccessInterface: updateRequest(uid={:d}, command={:s})\n".format(rvf.UID, rvf.metaname))
         if self.updreq_cb is not None:
-            self.logger.debug("AccessInterface: Dispatching updateRequest(uid={:d}, command={:s})\n".format(rvf.UID,
-                                                                                                            rvf.metaname))
-            self.logger.debug("dump of updreq_cb\n{:s}\n".format(str(self.updreq_cb)))
+            if instrument.interface:
+                instrument.emit("interface", "AccessInterface.updateRequest", uid=rvf.UID, command=rvf.metaname,
+                                callback=self.updreq_cb)
             return self.updreq_cb[rvf.UID](rvf)
         else:
             return None
 
     def set_update_req_callback(self, uid, cb):
-        self.logger.debug("set_upd_req_callback({:d}, {:s})\n".format(uid, str(cb)))
+        if instrument.interface:
+            instrument.emit("interface", "AccessInterface.set_update_req_callback", uid=uid, callback=cb)
         self.updreq_cb = cb
 
     def updateResponse(self, rvf):
-        self.logger.debug(
-            "AccessInterface: updateResponse(uid={:d}, command={:s})\n".format(rvf.UID, rvf.metaname))
         if self.updresp_cb is not None:
-            self.logger.debug("AccessInterface: Dispatching updateResponse(uid={:d}, command={:s})\n".format(rvf.UID,
-                                                                                                             rvf.metaname))
-            return self.updresp_cb[self.current_uid](rvf)
+            requester = self.find_request(rvf)
+            if instrument.interface:
+                instrument.emit("interface", "AccessInterface.updateResponse", uid=rvf.UID, cid=rvf.CID,
+                                command=rvf.metaname, requester=requester)
+            return self.updresp_cb[requester](rvf)
         else:
             return None
 
@@ -38,36 +38,42 @@ __version__ = "0.0.1"
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 
 module_logger = logging.getLogger('P2654Model2.interface.clientinterface')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("interface")
 class ClientInterface(object):
     __indent = 0
+    __slots__ = ("access_interface", "transform_engine")
+    logger = logging.getLogger('P2654Model2.interface.clientinterface')
 
     def __init__(self):
-        self.logger = logging.getLogger('P2654Model2.interface.clientinterface')
         self.logger.info('Creating an instance of ClientInterface')
         self.access_interface = None
         self.transform_engine = None
 
     def handleResponse(self, message):
-        self.logger.debug("ClientInterface.handleResponse({:s}): processing {:s} RVF\n".format(self.transform_engine.name, message.metaname))
+        if instrument.interface:
+            instrument.emit("interface", "ClientInterface.handleResponse", node=self.transform_engine.name, command=message.metaname)
         # ret = self.transform_engine.handleModelResponse(message)
         ret = self.transform_engine.handleResponse(message)
         return ret
 
     def handleUpdateRequest(self, message):
-        self.logger.debug("ClientInterface.handleUpdateRequest({:s}): processing {:s} RVF\n".format(self.transform_engine.name, message.metaname))
+        if instrument.interface:
+            instrument.emit("interface", "ClientInterface.handleUpdateRequest", node=self.transform_engine.name, command=message.metaname)
         ret = self.transform_engine.handleUpdateRequest(message)
         return ret
 
     def handleUpdateResponse(self, message):
-        self.logger.debug("ClientInterface.handleUpdateResponse({:s}): processing {:s} RVF\n".format(self.transform_engine.name, message.metaname))
+        if instrument.interface:
+            instrument.emit("interface", "ClientInterface.handleUpdateResponse", node=self.transform_engine.name, command=message.metaname)
         ret = self.transform_engine.handleUpdateResponse(message)
         return ret
 
@@ -82,7 +88,8 @@ class ClientInterface(object):
     #     return ret
 
     def sendRequest(self, message):
-        self.logger.debug("ClientInterface.sendRequest({:s}): processing {:s} RVF\n".format(self.transform_engine.name, message.metaname))
+        if instrument.interface:
+            instrument.emit("interface", "ClientInterface.sendRequest", node=self.transform_engine.name, command=message.metaname)
         ret = self.access_interface.sendRequest(message)
         return ret
 
@@ -38,40 +38,47 @@ __version__ = "0.0.1"
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 
 module_logger = logging.getLogger('P2654Model2.interface.hostinterface')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("interface")
 class HostInterface(object):
     __indent = 0
+    __slots__ = ("access_interface", "transform_engine")
+    logger = logging.getLogger('P2654Model2.interface.hostinterface')
 
     def __init__(self):
-        self.logger = logging.getLogger('P2654Model2.interface.hostinterface')
         self.logger.info('Creating an instance of HostInterface')
         self.access_interface = None
         self.transform_engine = None
 
     def handleRequest(self, message):
-        self.logger.debug("HostInterface.handleRequest({:s}): processing {:s} RVF\n".format(self.transform_engine.name, message.metaname))
+        if instrument.interface:
+            instrument.emit("interface", "HostInterface.handleRequest", node=self.transform_engine.name, command=message.metaname)
         ret = self.transform_engine.handleModelRequest(message)
         return ret
 
     def sendResponse(self, message):
-        self.logger.debug("HostInterface.sendResponse({:s}): processing {:s} RVF\n".format(self.transform_engine.name, message.metaname))
+        if instrument.interface:
+            instrument.emit("interface", "HostInterface.sendResponse", node=self.transform_engine.name, command=message.metaname)
         ret = self.access_interface.sendResponse(message)
         return ret
 
     def updateRequest(self, message):
-        self.logger.debug("HostInterface.updateRequest({:s}): processing {:s} RVF\n".format(self.transform_engine.name, message.metaname))
+        if instrument.interface:
+            instrument.emit("interface", "HostInterface.updateRequest", node=self.transform_engine.name, command=message.metaname)
         ret = self.access_interface.updateRequest(message)
         return ret
 
     def updateResponse(self, message):
-        self.logger.debug("HostInterface.updateResponse({:s}): processing {:s} RVF\n".format(self.transform_engine.name, message.metaname))
+        if instrument.interface:
+            instrument.emit("interface", "HostInterface.updateResponse", node=self.transform_engine.name, command=message.metaname)
         ret = self.access_interface.updateResponse(message)
         return ret
 
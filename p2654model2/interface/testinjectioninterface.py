@@ -35,44 +35,52 @@ __version__ = "0.0.1"
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 
 module_logger = logging.getLogger('P2654Model2.interface.testinjectioninterface')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("interface")
 class TestInjectionInterface(object):
     __indent = 0
+    __slots__ = ("access_interface", "__transform_engine", "__injector")
+    logger = logging.getLogger('P2654Model2.interface.testinjectioninterface')
 
     def __init__(self):
-        self.logger = logging.getLogger('P2654Model2.interface.testinjectioninterface')
         self.logger.info('Creating an instance of TestInjectionInterface')
         self.access_interface = None
         self.__transform_engine = None
 
     def handleRequest(self, message):
-        self.logger.debug("TestInjectionInterface.handleRequest({:s}): processing {:s} RVF\n".format(self.__transform_engine.name, message.metaname))
+        if instrument.interface:
+            instrument.emit("interface", "TestInjectionInterface.handleRequest", node=self.__transform_engine.name, command=message.metaname)
         ret = self.__transform_engine.handleInjectionRequest(message)
         return ret
 
     def sendRequest(self, message):
-        self.logger.debug("TestInjectionInterface.sendRequest({:s}): processing {:s} RVF\n".format(self.__transform_engine.name, message.metaname))
+        if instrument.interface:
+            instrument.emit("interface", "TestInjectionInterface.sendRequest", node=self.__transform_engine.name, command=message.metaname)
         ret = self.access_interface.sendRequest(message)
         return ret
 
     def sendResponse(self, message):
-        self.logger.debug("TestInjectionInterface.sendResponse({:s}): processing {:s} RVF\n".format(self.__transform_engine.name, message.metaname))
+        if instrument.interface:
+            instrument.emit("interface", "TestInjectionInterface.sendResponse", node=self.__transform_engine.name, command=message.metaname)
         ret = self.access_interface.sendResponse(message)
         return ret
 
     def handleCommand(self, message):
-        self.logger.debug("TestInjectionInterface.handleCommand({:s}): processing {:s} RVF\n".format(self.__transform_engine.name, message.metaname))
+        if instrument.interface:
+            instrument.emit("interface", "TestInjectionInterface.handleCommand", node=self.__transform_engine.name, command=message.metaname)
         return self.__injector.handleCommand(message)
 
     def updateDataValue(self, message):
-        self.logger.debug("TestInjectionInterface.updateDataValue({:s}): processing {:s} RVF\n".format(self.__transform_engine.name, message.metaname))
+        if instrument.interface:
+            instrument.emit("interface", "TestInjectionInterface.updateDataValue", node=self.__transform_engine.name, command=message.metaname)
         return self.__transform_engine.updateDataValue(message)
 
     def registerAccessInterface(self, uid, __access_interface):
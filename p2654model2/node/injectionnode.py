@@ -40,20 +40,24 @@ from p2654model2.builder.moduleloader import ModuleLoader
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 
 module_logger = logging.getLogger('P2654Model2.node.injectionnode')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("engine")
 class InjectionNode(object):
     injid = 0
     __indent = 0
+    __slots__ = ("name", "node_uid", "transform_engine", "testinjection_interface", "parameters", "injector",
+                 "cproto", "class_obj", "module", "iid")
+    logger = logging.getLogger('P2654Model2.node.injectionnode')
 
     def __init__(self, name, node_uid, transform_engine, injector, cproto):
-        self.logger = logging.getLogger('P2654Model2.node.injectionnode')
         self.logger.info('Creating an instance of InjectionNode')
         self.name = name
         self.node_uid = node_uid
@@ -65,7 +69,6 @@ class InjectionNode(object):
         self.class_obj = None
         self.module = None
         self.iid = self.injid
-        self.injid += 1
 
     def create(self, parameters):
         self.parameters = parameters
@@ -86,7 +89,8 @@ class InjectionNode(object):
         return ret
 
     def apply(self, timeout=0):
-        self.logger.debug("InjectionNode.apply(): processing\n")
+        if instrument.engine:
+            instrument.emit("engine", "InjectionNode.apply")
         return self.class_obj.apply(self.iid, timeout)
 
     def destroy(self):
@@ -99,19 +103,23 @@ class InjectionNode(object):
         return self.class_obj.get_commands(self.iid)
 
     def handleCommand(self, message):
-        self.logger.debug("InjectionNode.handleCommand(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.engine:
+            instrument.emit("engine", "InjectionNode.handleCommand", command=message.metaname)
         return self.class_obj.handleCommand(self.iid, message)
 
     def handleResponse(self, message):
-        self.logger.debug("InjectionNode.handleResponse(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.engine:
+            instrument.emit("engine", "InjectionNode.handleResponse", command=message.metaname)
         return self.class_obj.handleResponse(self.iid, message)
 
     def sendRequest(self, message):
-        self.logger.debug("InjectionNode.sendRequest(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.engine:
+            instrument.emit("engine", "InjectionNode.sendRequest", command=message.metaname)
         return self.testinjection_interface.sendRequest(message)
 
     def updateDataValue(self, message):
-        self.logger.debug("InjectionNode.updateDataValue(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.engine:
+            instrument.emit("engine", "InjectionNode.updateDataValue", command=message.metaname)
         return self.testinjection_interface.updateDataValue(message)
 
     def indent(self):
@@ -52,7 +52,8 @@ from p2654model2.node.transformengine import TransformEngine
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import instrumented
 
 
 module_logger = logging.getLogger('p2654model2.node.modelnode')
@@ -69,8 +70,13 @@ class NodeTypes(Enum):
 
 
 @logged
-@traced
+@instrumented("engine")
 class ModelNode(object):
+    # A large model holds one node, engine and set of interfaces per register, so none of them has a __dict__
+    __slots__ = ("node_type", "__cproto", "__hproto", "__injectors", "__visible", "__transform_engine",
+                 "__path_state", "__inodeParams")
+    logger = logging.getLogger('p2654model2.node.modelnode')
+
     class Actions(Enum):
         NO_ACTION = 0
         ACTIVATE_PATH = 1
@@ -89,7 +95,6 @@ class ModelNode(object):
 
     # def __init__(self, name, depth_next):
     def __init__(self, name, node_type):
-        self.logger = logging.getLogger('p2654model2.node.modelnode')
         self.logger.info('Creating an instance of ModelNode')
         self.node_type = NodeTypes.UNKNOWN
         # self.__uid = None  # universal identifier as int
@@ -154,6 +159,7 @@ class ModelNode(object):
 
     def add_child(self, child):
         self.__transform_engine.add_model_child(child)
+        NodeContainer.get_nodecontainer().add_child(self, child)
 
     def add_injector(self, injector):
         self.__transform_engine.add_injector_child(injector)
@@ -362,10 +368,11 @@ class ModelNode(object):
 
 
 @logged
-@traced
+@instrumented("engine")
 class Register(ModelNode):
+    __slots__ = ("__size", "__safe", "__sticky")
+
     def __init__(self, name):
-        self.logger = logging.getLogger('p2654model2.node.modelnode')
         self.logger.info('Creating an instance of Register')
         super(Register, self).__init__(name, TransformEngine.NodeType.LEAF)
         self.__size = 0
@@ -410,10 +417,11 @@ class Register(ModelNode):
 
 
 @logged
-@traced
+@instrumented("engine")
 class Instance(ModelNode):
+    __slots__ = ("__sit", "__factory")
+
     def __init__(self, name):
-        self.logger = logging.getLogger('p2654model2.node.modelnode')
         self.logger.info('Creating an instance of Instance')
         super(Instance, self).__init__(name, TransformEngine.NodeType.TRANSFORM)
         self.__sit = None
@@ -445,10 +453,11 @@ class Instance(ModelNode):
 
 
 @logged
-@traced
+@instrumented("engine")
 class Chain(ModelNode):
+    __slots__ = ()
+
     def __init__(self, name):
-        self.logger = logging.getLogger('p2654model2.node.modelnode')
         self.logger.info('Creating an instance of Chain')
         super(Chain, self).__init__(name, TransformEngine.NodeType.TRANSFORM)
 
@@ -460,10 +469,11 @@ class Chain(ModelNode):
 
 
 @logged
-@traced
+@instrumented("engine")
 class Linker(ModelNode):
+    __slots__ = ("__selector", "__control", "__derivations", "__parameters")
+
     def __init__(self, name):
-        self.logger = logging.getLogger('p2654model2.node.modelnode')
         self.logger.info('Creating an instance of Linker')
         super(Linker, self).__init__(name, TransformEngine.NodeType.TRANSFORM)
         self.__selector = None
@@ -519,10 +529,11 @@ class Linker(ModelNode):
 
 
 @logged
-@traced
+@instrumented("engine")
 class ModelPoint(ModelNode):
+    __slots__ = ()
+
     def __init__(self, name):
-        self.logger = logging.getLogger('p2654model2.node.modelnode')
         self.logger.info('Creating an instance of ModelPoint')
         super(ModelPoint, self).__init__(name, TransformEngine.NodeType.MODELPOINT)
 
@@ -534,10 +545,11 @@ class ModelPoint(ModelNode):
 
 
 @logged
-@traced
+@instrumented("engine")
 class Custom(ModelNode):
+    __slots__ = ("__selector", "__control", "__derivations", "__parameters")
+
     def __init__(self, name, flow_type=TransformEngine.NodeType.TRANSFORM):
-        self.logger = logging.getLogger('p2654model2.node.modelnode')
         self.logger.info('Creating an instance of Custom')
         super(Custom, self).__init__(name, flow_type)
         self.__selector = None
@@ -590,10 +602,11 @@ class Custom(ModelNode):
 
 
 @logged
-@traced
+@instrumented("engine")
 class Controller(ModelNode):
+    __slots__ = ()
+
     def __init__(self, name):
-        self.logger = logging.getLogger('p2654model2.node.modelnode')
         self.logger.info('Creating an instance of Controller')
         super(Controller, self).__init__(name, TransformEngine.NodeType.TRANSFORM)
 
@@ -605,10 +618,11 @@ class Controller(ModelNode):
 
 
 @logged
-@traced
+@instrumented("engine")
 class Root(ModelNode):
+    __slots__ = ()
+
     def __init__(self, name):
-        self.logger = logging.getLogger('p2654model2.node.modelnode')
         self.logger.info('Creating an instance of Root')
         super(Root, self).__init__(name, TransformEngine.NodeType.TRANSFORM)
 
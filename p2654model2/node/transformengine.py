@@ -32,27 +32,43 @@ __status__ = "Alpha/Experimental"
 __version__ = "0.0.1"
 
 
+from collections import deque
 from enum import Enum
 from p2654model2.builder.moduleloader import ModuleLoader
 from p2654model2.builder.nodecontainer import NodeContainer
 from p2654model2.error.ModelError import ModelError
+from p2654model2.scheduler.applypool import ApplyPoolFactory
+from p2654model2.scheduler.scheduler import SchedulerFactory
 from p2654model2.strategy.inject.injectionstrategy import InjectionStrategy
 from p2654model2.strategy.transform.transformstrategy import TransformStrategy
 import p2654model2.rvf.rvfmessage_pb2
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
+from p2654model2.instrument.rvfrecorder import RVFRecorderFactory, SEND_REQUEST, HANDLE_REQUEST, SEND_RESPONSE, \
+    HANDLE_RESPONSE, UPDATE_REQUEST, UPDATE_RESPONSE, UPDATE_DATA_VALUE
 
 
 module_logger = logging.getLogger('p2654model2.node.transformengine')
+instrument = InstrumentFactory.get_instrument()
+recorder = RVFRecorderFactory.get_recorder()
 
 
 @logged
-@traced
+@instrumented("engine")
 class TransformEngine(object):
     # global_uid = 0
     __indent = 0
+    __slots__ = ("__uid", "__name", "__tstrategy", "__inj_models", "__istrategy", "__dstrategy", "__cstrategy",
+                 "__transformParams", "__injectParams", "__debugParams", "__inodeParams", "__transform_strategy",
+                 "__injection_strategy", "__debug_strategy", "__custom_strategy", "_client_interface",
+                 "_host_interface", "_testinjection_interface", "__status", "__error", "__flow", "__node_type",
+                 "__model_children", "__children_uids", "__children_names", "__injection_children",
+                 "__injection_iids", "data_value", "__data_nrbits", "__observers", "__notified", "__requests",
+                 "__resources", "__resources_nodes")
+    logger = logging.getLogger('p2654model2.node.transformengine')
 
     class NodeType(Enum):
         LEAF = 0
@@ -64,7 +80,6 @@ class TransformEngine(object):
         INJECTION = 1
 
     def __init__(self, name, node_type):
-        self.logger = logging.getLogger('p2654model2.node.transformengine')
         self.logger.info('Creating an instance of TransformEngine({:s})'.format(name))
         # global global_uid
         # self.__uid = global_uid  # universal identifier as int
@@ -117,7 +132,15 @@ class TransformEngine(object):
         self.__injection_children = []
         self.__injection_iids = []
         self.data_value = None
+        self.__data_nrbits = 0
         self.__observers = []
+        # Data value last delivered to the observers, None until one is
+        self.__notified = None
+        # Child uid -> correlation IDs of its requests not answered yet, oldest first
+        self.__requests = {}
+        # Driver resources of this subtree and the model size they were computed for
+        self.__resources = None
+        self.__resources_nodes = 0
 
     def add_model_child(self, child):
         self.__model_children.append(child)
@@ -139,7 +162,12 @@ class TransformEngine(object):
         return lerr
 
     def handleModelRequest(self, message):
-        self.logger.debug("TransformEngine.handleModelRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.engine:
+            instrument.emit("engine", "TransformEngine.handleModelRequest", node=self.name, command=message.metaname)
+        recorder.record(HANDLE_REQUEST, self.__uid, message)
+        if message.CID:
+            self.__requests.setdefault(message.UID, deque()).append(message.CID)
+        self.__schedule()
         if self.__transform_strategy is None:
             raise ModelError("transform_strategy not registered for {:s}.".format(self.name))
         else:
@@ -169,7 +197,10 @@ class TransformEngine(object):
                     return None
 
     def handleInjectionRequest(self, message):
-        self.logger.debug("TransformEngine.handleInjectionRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.engine:
+            instrument.emit("engine", "TransformEngine.handleInjectionRequest", node=self.name, command=message.metaname)
+        recorder.record(HANDLE_REQUEST, self.__uid, message)
+        self.__schedule()
         if self.__injection_strategy is None:
             raise ModelError("injection_strategy not registered for {:s}.".format(self.name))
         else:
@@ -202,7 +233,10 @@ class TransformEngine(object):
                     return None
 
     def handleResponse(self, message):
-        self.logger.debug("TransformEngine.handleResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.engine:
+            instrument.emit("engine", "TransformEngine.handleResponse", node=self.name, command=message.metaname)
+        recorder.record(HANDLE_RESPONSE, self.__uid, message)
+        self.__schedule()
         if self.__flow == TransformEngine.Flow.TRANSFORM:
             ret = self.__transform_strategy.handleResponse(message)
             return ret
@@ -211,22 +245,42 @@ class TransformEngine(object):
             return ret
 
     def handleUpdateRequest(self, message):
-        self.logger.debug("TransformEngine.handleUpdateRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.engine:
+            instrument.emit("engine", "TransformEngine.handleUpdateRequest", node=self.name, command=message.metaname)
+        self.__schedule()
         return self.__transform_strategy.updateRequest(message)
 
     def handleUpdateResponse(self, message):
-        self.logger.debug("TransformEngine.handleUpdateResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.engine:
+            instrument.emit("engine", "TransformEngine.handleUpdateResponse", node=self.name, command=message.metaname)
+        self.__schedule()
         ret = self.__transform_strategy.updateResponse(message)
         return ret
 
     def sendRequest(self, message):
-        self.logger.debug("TransformEngine.sendRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.engine:
+            instrument.emit("engine", "TransformEngine.sendRequest", node=self.name, command=message.metaname)
+        recorder.record(SEND_REQUEST, self.__uid, message)
+        self.__schedule()
+        compiled = NodeContainer.get_nodecontainer().compiled
+        if compiled is not None:
+            return compiled.request[self.__uid](message)
         ret = self._client_interface.sendRequest(message)
         return ret
 
     def sendResponse(self, message):
-        self.logger.debug("TransformEngine.sendResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.engine:
+            instrument.emit("engine", "TransformEngine.sendResponse", node=self.name, command=message.metaname)
+        recorder.record(SEND_RESPONSE, self.__uid, message)
         if self.__flow == TransformEngine.Flow.TRANSFORM:
+            if not message.CID:
+                # Strategies address responses by child uid; answer that child's oldest request
+                cids = self.__requests.get(message.UID)
+                if cids:
+                    message.CID = cids.popleft()
+            compiled = NodeContainer.get_nodecontainer().compiled
+            if compiled is not None:
+                return compiled.response[self.__uid](message)
             ret = self._host_interface.sendResponse(message)
             return ret
         elif self.__flow == TransformEngine.Flow.INJECTION:
@@ -234,44 +288,81 @@ class TransformEngine(object):
             return ret
 
     def updateRequest(self, message):
-        self.logger.debug("TransformEngine.updateRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.engine:
+            instrument.emit("engine", "TransformEngine.updateRequest", node=self.name, command=message.metaname)
+        recorder.record(UPDATE_REQUEST, self.__uid, message)
+        self.__schedule()
         if self.__node_type == TransformEngine.NodeType.LEAF or self.__node_type == TransformEngine.NodeType.MODELPOINT:
             return self.__transform_strategy.updateRequest(message)
         else:
             return self._host_interface.updateRequest(message)
 
     def updateResponse(self, message):
-        self.logger.debug("TransformEngine.updateResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.engine:
+            instrument.emit("engine", "TransformEngine.updateResponse", node=self.name, command=message.metaname)
+        recorder.record(UPDATE_RESPONSE, self.__uid, message)
+        self.__schedule()
         if self.__node_type == TransformEngine.NodeType.LEAF or self.__node_type == TransformEngine.NodeType.MODELPOINT:
             ret = self.__transform_strategy.updateResponse(message)
             return ret
         else:
+            if not message.CID:
+                # Same addressing as sendResponse(), but the request stays open for its response
+                cids = self.__requests.get(message.UID)
+                if cids:
+                    message.CID = cids[0]
             ret = self._host_interface.updateResponse(message)
             return ret
 
     def updateDataValue(self, message):
+        recorder.record(UPDATE_DATA_VALUE, self.__uid, message)
         self.data_value = message.data
-        # TBD - send notification to observers for state change event on this node value
+        self.__data_nrbits = message.nrbits
         if len(self.__observers):
-            nc = NodeContainer.get_nodecontainer()
-            obsmsg = p2654model2.rvf.rvfmessage_pb2.RVFSelectEvent()
-            my_path = nc.get_path_by_id(self.uid)
-            obsmsg.path = my_path
-            obsmsg.nrbits = message.nrbits
-            for v in message.data:
-                obsmsg.data.append(v)
-            for obs_id in self.__observers:
-                obs_node = nc.get_node_by_id(obs_id)
-                ote = obs_node.transform_engine
-                ote.update_observer(obsmsg)
+            # Delivered once at the end of the apply pass in progress, with the last value of the pass
+            SchedulerFactory.get_scheduler().notify(self)
+
+    def notify_observers(self):
+        """
+        Send the data value of this node to its observers as a RVFSelectEvent, unless they already have it.
+        @return: True if the event was delivered.
+        """
+        value = tuple(self.data_value)
+        if value == self.__notified:
+            return False
+        self.__notified = value
+        nc = NodeContainer.get_nodecontainer()
+        obsmsg = p2654model2.rvf.rvfmessage_pb2.RVFSelectEvent()
+        obsmsg.path = nc.get_path_by_id(self.uid) if nc.compiled is None else nc.compiled.paths[self.uid]
+        obsmsg.nrbits = self.__data_nrbits
+        for v in value:
+            obsmsg.data.append(v)
+        for obs_id in self.__observers:
+            if nc.compiled is not None:
+                ote = nc.compiled.engines[obs_id]
+            else:
+                ote = nc.get_node_by_id(obs_id).transform_engine
+            ote.update_observer(obsmsg)
+        return True
 
     def update_observer(self, message):
+        self.__schedule()
         return self.__transform_strategy.update_observer(message)
 
+    def is_selected(self, child_uid):
+        if self.__transform_strategy is None:
+            return True
+        return self.__transform_strategy.is_selected(child_uid)
+
+    def __schedule(self):
+        # Whatever was just handed to this node is carried out by its next apply
+        SchedulerFactory.get_scheduler().schedule(self.__uid)
+
     def apply(self, timeout):
         pending = 0
         err = 0
-        self.logger.debug("TransformEngine.apply({:s}): processing\n".format(self.name))
+        if instrument.engine:
+            instrument.emit("engine", "TransformEngine.apply", node=self.name)
         r = self.__applyInjection(timeout)
         if r == 1:
             pending += 1
@@ -289,8 +380,31 @@ class TransformEngine(object):
         else:
             return 0
 
+    def apply_node(self, timeout):
+        """
+        Apply the injectors and strategies of this node only, without descending into the model children.
+        Used by the Scheduler, which visits the children that have work on its own.
+        """
+        pending = 0
+        err = 0
+        if instrument.engine:
+            instrument.emit("engine", "TransformEngine.apply_node", node=self.name)
+        for r in (self.__applyInjection(timeout), self.__applyTransform(timeout)):
+            if r == 1:
+                pending += 1
+            elif r == -1:
+                err += 1
+        if err:
+            return -1
+        elif pending:
+            return 1
+        else:
+            return 0
+
     def handleCommand(self, wrapper):
-        self.logger.debug("TransformEngine.handleCommand({:s}): processing {:s} RVF\n".format(self.name, wrapper.metaname))
+        if instrument.engine:
+            instrument.emit("engine", "TransformEngine.handleCommand", node=self.name, command=wrapper.metaname)
+        self.__schedule()
         for node in self.__injection_children:
             if node.iid == wrapper.IID:
                 return node.handleCommand(wrapper)
@@ -336,6 +450,7 @@ class TransformEngine(object):
         :return:
         """
         self.__observers.append(node_uid)
+        self.__notified = None
 
     def get_name(self):
         return self.name
@@ -343,6 +458,12 @@ class TransformEngine(object):
     def get_children(self):
         return self.__model_children
 
+    def get_injection_children(self):
+        return self.__injection_children
+
+    def get_transform_strategy(self):
+        return self.__transform_strategy
+
     def configure(self):
         ret = True
         for seg in self.__model_children:
@@ -352,7 +473,8 @@ class TransformEngine(object):
             if not self.__transform_strategy.configure():
                 ret = False
         else:
-            self.logger.debug("TransformEngine.configure(): self.__transform_strategy is not defined for ({:s}).\n".format(self.name))
+            if instrument.engine:
+                instrument.emit("engine", "TransformEngine.configure", node=self.name, missing="transform_strategy")
         return ret
 
     # def configure(self):
@@ -397,23 +519,45 @@ class TransformEngine(object):
     #         self.__debug_strategy.create(self.debugParams)
     #         self.__transform_engine.registerDebugStrategy(self.__debug_strategy)
     #
+    def get_resources(self):
+        """
+        @return: Set of the driver resources used by the transform strategies of this subtree.
+        """
+        nodes = NodeContainer.get_nodecontainer().get_next_node_id()
+        if self.__resources is None or self.__resources_nodes != nodes:
+            resources = set()
+            if self.__transform_strategy is not None:
+                resources |= self.__transform_strategy.get_resources()
+            for seg in self.__model_children:
+                resources |= seg.transform_engine.get_resources()
+            self.__resources = resources
+            self.__resources_nodes = nodes
+        return self.__resources
+
+    def __applyChildren(self, timeout):
+        pool = ApplyPoolFactory.get_applypool()
+        if not pool.is_enabled() or len(self.__model_children) < 2:
+            return [seg.apply(timeout) for seg in self.__model_children]
+        # Subtrees driving different hardware are applied concurrently, the others by this thread
+        groups, rest = pool.partition([seg.transform_engine for seg in self.__model_children])
+        results = [te.apply(timeout) for te in rest]
+        for group_results in pool.run(lambda group: [te.apply(timeout) for te in group], groups):
+            results.extend(group_results)
+        return results
+
     def __applyModel(self, timeout):
         pending = 0
         err = 0
-        for seg in self.__model_children:
-            r = seg.apply(timeout)
+        for r in self.__applyChildren(timeout):
             if r == 1:
                 pending += 1
             elif r == -1:
                 err += 1
-        if self.__transform_strategy is not None:
-            r = self.__transform_strategy.apply(timeout)
-            if r == 1:
-                pending += 1
-            elif r == -1:
-                err += 1
-        else:
-            self.logger.debug("TransformEngine.__applyModel(): self.__transform_strategy is not defined for ({:s}).\n".format(self.name))
+        r = self.__applyTransform(timeout)
+        if r == 1:
+            pending += 1
+        elif r == -1:
+            err += 1
         if err:
             return -1
         elif pending:
@@ -421,6 +565,13 @@ class TransformEngine(object):
         else:
             return 0
 
+    def __applyTransform(self, timeout):
+        if self.__transform_strategy is None:
+            if instrument.engine:
+                instrument.emit("engine", "TransformEngine.__applyModel", node=self.name, missing="transform_strategy")
+            return 0
+        return self.__transform_strategy.apply(timeout)
+
     def __applyInjection(self, timeout):
         pending = 0
         err = 0
@@ -437,7 +588,8 @@ class TransformEngine(object):
             elif r == -1:
                 err += 1
         else:
-            self.logger.debug("TransformEngine.__applyInjection(): self.__injection_strategy is not defined for ({:s}).\n".format(self.name))
+            if instrument.engine:
+                instrument.emit("engine", "TransformEngine.__applyInjection", node=self.name, missing="injection_strategy")
         if err:
             return -1
         elif pending:
@@ -40,19 +40,23 @@ from myhdl import intbv
 from p2654model2.builder.nodecontainer import NodeContainer
 from p2654model2.parser.agenda import Agenda
 from p2654model2.parser.symboltable import SymbolTable
+from p2654model2.scheduler.scheduler import SchedulerFactory
+from p2654model2.scheduler.retargeter import RetargeterFactory
+from p2654model2.instrument.rvfrecorder import RVFRecorderFactory
 
 import p2654model2.rvf.commands.register_pb2
 import p2654model2.rvf.rvfmessage_pb2
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import instrumented
 
 
 module_logger = logging.getLogger('p2654model2.parser.pdlmodel')
 
 
 @logged
-@traced
+@instrumented("parser")
 class SourceElement(object):
     '''
     A SourceElement is the base class for all elements that occur in a PDL
@@ -103,7 +107,7 @@ class SourceElement(object):
 
 
 @logged
-@traced
+@instrumented("parser")
 class VectorId(SourceElement):
     def __init__(self, lnum, scalar_id, index=None, range=None):
         super(VectorId, self).__init__(lnum)
@@ -113,7 +117,7 @@ class VectorId(SourceElement):
 
 
 @logged
-@traced
+@instrumented("parser")
 class Range(SourceElement):
     def __init__(self, lnum, start, end):
         super(Range, self).__init__(lnum)
@@ -122,7 +126,7 @@ class Range(SourceElement):
 
 
 @logged
-@traced
+@instrumented("parser")
 class Command(SourceElement):
     """
     Description: An abstract base class defining the primitive
@@ -188,7 +192,7 @@ class Command(SourceElement):
 
 
 @logged
-@traced
+@instrumented("parser")
 class iWriteCommand(Command):
     def __init__(self, lnum, reg=None, port=None, pdl_number=None, enum_name=None):
         super(iWriteCommand, self).__init__(lnum)
@@ -203,7 +207,7 @@ class iWriteCommand(Command):
     def execute(self):
         nc = NodeContainer.get_nodecontainer()
         if self.reg:
-            reg_inst = nc.get_node_by_path(self.reg)
+            reg_inst = nc.get_node_by_path(self.reg, SymbolTable.get_symbol_table().get_prefix())
             iid = reg_inst.get_command_id("WRITE")
             if iid is None:
                 raise AssertionError("iWrite statement is not supported by this node ({:s}).".format(self.reg))
@@ -233,7 +237,7 @@ class iWriteCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class iReadCommand(Command):
     def __init__(self, lnum, reg=None, port=None, pdl_number=None, enum_name=None):
         super(iReadCommand, self).__init__(lnum)
@@ -245,7 +249,7 @@ class iReadCommand(Command):
     def execute(self):
         nc = NodeContainer.get_nodecontainer()
         if self.reg:
-            reg_inst = nc.get_node_by_path(self.reg)
+            reg_inst = nc.get_node_by_path(self.reg, SymbolTable.get_symbol_table().get_prefix())
             iid = reg_inst.get_command_id("READ")
             if iid is None:
                 raise AssertionError("iRead statement is not supported by this node ({:s}).".format(self.reg))
@@ -283,7 +287,7 @@ class iReadCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class iGetReadDataCommand(Command):
     def __init__(self, lnum, reg=None, port=None, scanif_name=None, chain_id=None, format=None):
         super(iGetReadDataCommand, self).__init__(lnum)
@@ -296,7 +300,7 @@ class iGetReadDataCommand(Command):
     def execute(self):
         nc = NodeContainer.get_nodecontainer()
         if self.reg:
-            reg_inst = nc.get_node_by_path(self.reg)
+            reg_inst = nc.get_node_by_path(self.reg, SymbolTable.get_symbol_table().get_prefix())
             iid = reg_inst.get_command_id("GET")
             if iid is None:
                 raise AssertionError("iGetReadData statement is not supported by this node ({:s}).".format(self.reg))
@@ -330,7 +334,7 @@ class iGetReadDataCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class iGetMiscomparesCommand(Command):
     def __init__(self, lnum, reg=None, port=None, scanif_name=None, chain_id=None, format=None):
         super(iGetMiscomparesCommand, self).__init__(lnum)
@@ -345,7 +349,7 @@ class iGetMiscomparesCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class iResetCommand(Command):
     def __init__(self, lnum, sync=False):
         super(iResetCommand, self).__init__(lnum)
@@ -356,7 +360,7 @@ class iResetCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class iCallCommand(Command):
     def __init__(self, lnum, proc_name, args):
         super(iCallCommand, self).__init__(lnum)
@@ -382,7 +386,7 @@ class iCallCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class iScanCommand(Command):
     def __init__(self, lnum, name=None, length=0, si=None, so=None, ir=False, chain_id=None, stable=False):
         super(iScanCommand, self).__init__(lnum)
@@ -397,13 +401,8 @@ class iScanCommand(Command):
     def execute(self):
         nc = NodeContainer.get_nodecontainer()
         if self.name:
-            symtbl = SymbolTable.get_symbol_table()
-            prefix = symtbl.get_prefix()
-            if prefix is None:
-                path_name = self.name
-            else:
-                path_name = prefix + self.name
-            reg_inst = nc.get_node_by_path(path_name)
+            path_name = self.name
+            reg_inst = nc.get_node_by_path(path_name, SymbolTable.get_symbol_table().get_prefix())
             if self.so is not None and self.si is None:
                 iid = reg_inst.get_command_iid("READ")
                 if iid is None:
@@ -485,44 +484,33 @@ class iScanCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class iApplyCommand(Command):
     def __init__(self, lnum, together=False):
         super(iApplyCommand, self).__init__(lnum)
         self.together = together
 
     def execute(self):
-        nc = NodeContainer.get_nodecontainer()
-        root_inst = nc.get_node_by_id(0)
+        # Only the nodes handed work since the last iApply (and their ancestors) are visited.  Accesses to
+        # registers behind unselected Linker branches wait while the Retargeter selects their paths.
+        sched = SchedulerFactory.get_scheduler()
+        rt = RetargeterFactory.get_retargeter()
         err = 0
-        pending = 1
-        while pending:
-            ret = root_inst.apply(0)
-            if ret == -1:
+        rt.retarget()
+        while sched.is_pending():
+            if sched.apply(0) == -1:
                 err += 1
-            elif ret == 1:
-                pending = 1
-            else:
-                pending = 0
+            rt.retarget()
         if err:
+            # Show the RVF traffic that led to the failure
+            RVFRecorderFactory.get_recorder().dump(module_logger)
             return False
         else:
             return True
 
 
-        # from p2654model2.scheduler.scheduler import SchedulerFactory
-        # ret = True
-        # sched = SchedulerFactory.get_scheduler()
-        # root_inst.apply(0)
-        # while sched.is_pending():
-        #     if not root_inst.apply(0):
-        #         ret = False
-        # return ret
-        # # return root_inst.apply(0)
-
-
 @logged
-@traced
+@instrumented("parser")
 class iNoteCommand(Command):
     def __init__(self, lnum, comment=False, status=False, quoted=None):
         super(iNoteCommand, self).__init__(lnum)
@@ -535,7 +523,7 @@ class iNoteCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class iOverrideScanInterfaceCommand(Command):
     def __init__(self, lnum, scanInterfaceRef_list, capture=False, update=False, broadcast=False):
         super(iOverrideScanInterfaceCommand, self).__init__(lnum)
@@ -549,7 +537,7 @@ class iOverrideScanInterfaceCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class iClockCommand(Command):
     def __init__(self, lnum, clock):
         super(iClockCommand, self).__init__(lnum)
@@ -560,7 +548,7 @@ class iClockCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class iClockOverrideCommand(Command):
     def __init__(self, lnum, sysClock, sourceClock=None, freqmultiplier=None, freqdivider=None):
         super(iClockOverrideCommand, self).__init__(lnum)
@@ -574,7 +562,7 @@ class iClockOverrideCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class iRunLoopCommand(Command):
     def __init__(self, lnum, cyclecount=None, tck=False, sck=None, time=None):
         super(iRunLoopCommand, self).__init__(lnum)
@@ -588,7 +576,7 @@ class iRunLoopCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class iPrefixCommand(Command):
     def __init__(self, lnum, dot_id=None):
         super( iPrefixCommand, self).__init__(lnum)
@@ -607,7 +595,7 @@ class iPrefixCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class ConditionalCommand(Command):
     """
     Description: An intermediate specialized class that represents
@@ -629,7 +617,7 @@ class ConditionalCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class CompoundCommand(ConditionalCommand):
     """
     Description: An intermediate specialized class for all types
@@ -674,7 +662,7 @@ class CompoundCommand(ConditionalCommand):
 
 
 @logged
-@traced
+@instrumented("parser")
 class PopiProcCommand(Command):
     def __init__(self, lineno, proc_name):
         super(PopiProcCommand, self).__init__(lineno)
@@ -691,7 +679,7 @@ class PopiProcCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class SetCommand(Command):
     def __init__(self, lnum, var_name, expression=None):
         super(SetCommand, self).__init__(lnum)
@@ -711,7 +699,7 @@ class SetCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class PutsCommand(Command):
     def __init__(self, lnum, string_def, nonewline=False):
         super(PutsCommand, self).__init__(lnum)
@@ -734,7 +722,7 @@ class PutsCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class ExpressionCommand(Command):
     def __init__(self, lnum, brace_block=None, expression=None):
         super(ExpressionCommand, self).__init__(lnum)
@@ -750,7 +738,7 @@ class ExpressionCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class SquareBracketBlock(Command):
     def __init__(self, lnum, command):
         super(SquareBracketBlock, self).__init__(lnum)
@@ -763,7 +751,7 @@ class SquareBracketBlock(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class BraceBlock(Command):
     def __init__(self, lnum, commands):
         super(BraceBlock, self).__init__(lnum)
@@ -796,7 +784,7 @@ class BraceBlock(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class IfCommand(CompoundCommand):
     def __init__(self, lnum, condition, body, elseif_cmd):
         super(IfCommand, self).__init__(lnum, condition, body)
@@ -815,7 +803,7 @@ class IfCommand(CompoundCommand):
 
 
 @logged
-@traced
+@instrumented("parser")
 class ElseIfCommand(CompoundCommand):
     def __init__(self, lnum, condition, body, elseif_cmd):
         super(ElseIfCommand, self).__init__(lnum, condition)
@@ -835,7 +823,7 @@ class ElseIfCommand(CompoundCommand):
 
 
 @logged
-@traced
+@instrumented("parser")
 class ElseCommand(Command):
     def __init__(self, lnum, body):
         super(ElseCommand, self).__init__(lnum)
@@ -859,7 +847,7 @@ class ElseCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class SubStringCommand(Command):
     def __init__(self, lnum, str, start, end):
         super(SubStringCommand, self).__init__(lnum)
@@ -879,7 +867,7 @@ class SubStringCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class StringLengthCommand(Command):
     def __init__(self, lnum, str):
         super(StringLengthCommand, self).__init__(lnum)
@@ -895,7 +883,7 @@ class StringLengthCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class StringIndexCommand(Command):
     def __init__(self, lnum, str, index):
         super(StringIndexCommand, self).__init__(lnum)
@@ -912,7 +900,7 @@ class StringIndexCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class StringEqualCommand(Command):
     def __init__(self, lnum, str1, str2, nocase=False, length=False, posint=0):
         super(StringEqualCommand, self).__init__(lnum)
@@ -980,7 +968,7 @@ class StringEqualCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class StringCompareCommand(Command):
     def __init__(self, lnum, str1, str2, nocase=False, length=False, posint=0):
         super(StringCompareCommand, self).__init__(lnum)
@@ -1034,7 +1022,7 @@ class StringCompareCommand(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class iProcDef(Command):
     def __init__(self, lineno, file=None, name=None, arguments=None, commands=None):
         super(iProcDef, self).__init__(lineno)
@@ -1089,7 +1077,7 @@ class iProcDef(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class CommandDefs(object):
     def __init__(self):
         self.command_defs = []
@@ -1109,7 +1097,7 @@ class CommandDefs(object):
 
 
 @logged
-@traced
+@instrumented("parser")
 class Argument(object):
     def __init__(self, lnum, scalar_id):
         self.scalar_id = scalar_id
@@ -1120,14 +1108,14 @@ class Argument(object):
 
 
 @logged
-@traced
+@instrumented("parser")
 class ScalarArgument(Argument):
     def __init__(self, lnum, scalar_id):
         super(ScalarArgument, self).__init__(lnum, scalar_id)
 
 
 @logged
-@traced
+@instrumented("parser")
 class NumberArgument(Argument):
     def __init__(self, lnum, scalar_id, default_value):
         super(NumberArgument, self).__init__(lnum, scalar_id)
@@ -1135,7 +1123,7 @@ class NumberArgument(Argument):
 
 
 @logged
-@traced
+@instrumented("parser")
 class EnumArgument(Argument):
     def __init__(self, lnum, scalar_id, default_value):
         super(EnumArgument, self).__init__(lnum, scalar_id)
@@ -1143,7 +1131,7 @@ class EnumArgument(Argument):
 
 
 @logged
-@traced
+@instrumented("parser")
 class RegisterArgument(Argument):
     def __init__(self, lnum, scalar_id, default_value):
         super(RegisterArgument, self).__init__(lnum, scalar_id)
@@ -1151,7 +1139,7 @@ class RegisterArgument(Argument):
 
 
 @logged
-@traced
+@instrumented("parser")
 class PDLSource(object):
     def __init__(self):
         self.nodes = []
@@ -1172,7 +1160,7 @@ class PDLSource(object):
 
 
 @logged
-@traced
+@instrumented("parser")
 class PDLModule(object):
     def __init__(self, name, filename, ast):
         self.name = name
@@ -1206,7 +1194,7 @@ class PDLModule(object):
 
 
 @logged
-@traced
+@instrumented("parser")
 class Expression(SourceElement):
     def __init__(self, lnum):
         super(Expression, self).__init__(lnum)
@@ -1245,7 +1233,7 @@ class Expression(SourceElement):
 
 
 @logged
-@traced
+@instrumented("parser")
 class ConditionExpression(Expression):
     def __init__(self, lnum, expression):
         super(ConditionExpression, self).__init__(lnum)
@@ -1256,7 +1244,7 @@ class ConditionExpression(Expression):
 
 
 @logged
-@traced
+@instrumented("parser")
 class BinaryExpression(Expression):
     def __init__(self, lnum, operator, lhs, rhs):
         super(BinaryExpression, self).__init__(lnum)
@@ -1319,7 +1307,7 @@ class BinaryExpression(Expression):
 
 
 @logged
-@traced
+@instrumented("parser")
 class Value(Expression):
     def __init__(self, lnum, value):
         super(Value, self).__init__(lnum)
@@ -1332,7 +1320,7 @@ class Value(Expression):
 
 
 @logged
-@traced
+@instrumented("parser")
 class Conditional(Expression):
     def __init__(self, lnum, predicate, if_true, if_false):
         super(Conditional, self).__init__(lnum)
@@ -1393,7 +1381,7 @@ class Multiplicative(BinaryExpression):
 
 
 @logged
-@traced
+@instrumented("parser")
 class Unary(Expression):
     def __init__(self, lnum, sign, expression):
         super(Unary, self).__init__(lnum)
@@ -1414,7 +1402,7 @@ class Unary(Expression):
 
 
 @logged
-@traced
+@instrumented("parser")
 class ExpressionStatement(Command):
     def __init__(self, lnum, expression):
         super(ExpressionStatement, self).__init__(lnum)
@@ -1427,7 +1415,7 @@ class ExpressionStatement(Command):
 
 
 @logged
-@traced
+@instrumented("parser")
 class Variable(Expression):
     def __init__(self, lnum, name):
         super(Variable, self).__init__(lnum)
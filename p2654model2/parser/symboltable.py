@@ -32,14 +32,15 @@ __status__ = "Alpha/Experimental"
 __version__ = "0.0.1"
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import instrumented
 
 
 module_logger = logging.getLogger('p2654model2.parser.symboltable')
 
 
 @logged
-@traced
+@instrumented("parser")
 class Symbol(object):
     def __init__(self):
         self.value = None
@@ -55,7 +56,7 @@ class Symbol(object):
 
 
 @logged
-@traced
+@instrumented("parser")
 class SymbolTable(object):
     """
 
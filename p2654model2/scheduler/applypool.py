@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+"""
+    ApplyPool runs the apply of independent controller subtrees concurrently.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    ApplyPool runs the apply of independent controller subtrees concurrently.  Every transform strategy
+    driving hardware names the driver resources it uses (get_resources()), which is the transport it reaches
+    the hardware through, e.g. the ATE session "ate:127.0.0.1:5023".  Sibling subtrees whose resources do not
+    overlap are applied on worker threads.  Subtrees sharing a resource stay on the same worker, in model
+    order: the controllers of one ATE session share its socket and lock, so their commands could not overlap
+    anyway and only subtrees behind different sessions gain from the pool.  Subtrees using no driver at all
+    are applied by the calling thread.  The pool is disabled (everything applied sequentially as before) until
+    set_workers() is given more than one worker, from the "apply" section of configure.json.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import logging
+from autologging import logged
+from p2654model2.instrument.instrument import instrumented
+
+
+module_logger = logging.getLogger('p2654model2.scheduler.applypool')
+
+
+@logged
+@instrumented("scheduler")
+class ApplyPool(object):
+    def __init__(self):
+        self.logger = logging.getLogger('p2654model2.scheduler.applypool')
+        self.logger.info('Creating an instance of ApplyPool')
+        self.lock = threading.Lock()
+        # Set on the worker threads, whose own subtrees are applied sequentially so nested applies cannot
+        # exhaust the pool waiting on each other
+        self.local = threading.local()
+        self.workers = 0
+        self.executor = None
+        # Incremented whenever the pool is reconfigured so cached partitions can be recomputed
+        self.generation = 0
+        self.stats = {"parallel": 0, "tasks": 0}
+
+    def set_workers(self, workers):
+        """
+        @param workers: Threads applying independent subtrees; 0 or 1 applies everything sequentially.
+        """
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+                self.executor = None
+            self.workers = workers
+            if workers > 1:
+                self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="apply")
+            self.generation += 1
+
+    def is_enabled(self):
+        return self.executor is not None
+
+    def get_stats(self):
+        """
+        @return: Dictionary with the number of concurrent applies (parallel) and of groups they ran (tasks).
+        """
+        return dict(self.stats)
+
+    def partition(self, engines):
+        """
+        Split sibling TransformEngines into groups that can be applied concurrently.
+        @param engines: TransformEngines in model order.
+        @return: (groups, rest) where groups is a list of lists of engines whose resources overlap, each in
+                 model order, and rest the engines using no driver resource.
+        """
+        groups = []
+        rest = []
+        for engine in engines:
+            resources = engine.get_resources()
+            if not len(resources):
+                rest.append(engine)
+                continue
+            merged = [engine]
+            owned = set(resources)
+            keep = []
+            for g_owned, g_engines in groups:
+                if g_owned & owned:
+                    owned |= g_owned
+                    merged = g_engines + merged
+                else:
+                    keep.append((g_owned, g_engines))
+            keep.append((owned, merged))
+            groups = keep
+        order = {id(e): i for i, e in enumerate(engines)}
+        groups = [sorted(g, key=lambda e: order[id(e)]) for _, g in groups]
+        groups.sort(key=lambda g: order[id(g[0])])
+        return groups, rest
+
+    def run(self, fn, tasks):
+        """
+        Call fn on every task, concurrently when the pool is enabled.
+        @return: List of the results in task order.  An exception raised by a task is re-raised once all
+                 of them have finished.
+        """
+        if self.executor is None or len(tasks) < 2 or getattr(self.local, "worker", False):
+            return [fn(t) for t in tasks]
+        self.stats["parallel"] += 1
+        self.stats["tasks"] += len(tasks)
+        futures = [self.executor.submit(self.__task, fn, t) for t in tasks]
+        results = []
+        error = None
+        for f in futures:
+            try:
+                results.append(f.result())
+            except Exception as e:
+                if error is None:
+                    error = e
+                results.append(None)
+        if error is not None:
+            raise error
+        return results
+
+    def __task(self, fn, task):
+        self.local.worker = True
+        try:
+            return fn(task)
+        finally:
+            self.local.worker = False
+
+
+class ApplyPoolFactory(object):
+    inst = None
+
+    @staticmethod
+    def get_applypool():
+        if ApplyPoolFactory.inst is None:
+            ApplyPoolFactory.inst = ApplyPool()
+        return ApplyPoolFactory.inst
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+    PlanCache memoizes the retargeting plans computed by the Retargeter.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    PlanCache memoizes the retargeting plans computed by the Retargeter.  A plan is keyed by the selector
+    state it starts from and the set of registers it activates, so a test program accessing the same
+    registers over and over plans them once.  The least recently used plan is evicted when the cache is
+    full.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+from collections import OrderedDict
+
+
+class PlanCache(object):
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.plans = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def key(state, targets):
+        """
+        @param state: Dictionary of Linker uid to the uid of the child it selects (None when none is).
+        @param targets: uids of the registers to activate.
+        """
+        return tuple(sorted(state.items(), key=lambda i: i[0])), frozenset(targets)
+
+    def get(self, key):
+        """
+        @return: The cached plan, or None counting a miss.
+        """
+        plan = self.plans.get(key)
+        if plan is None:
+            self.stats["misses"] += 1
+            return None
+        self.plans.move_to_end(key)
+        self.stats["hits"] += 1
+        return plan
+
+    def put(self, key, plan):
+        self.plans[key] = plan
+        self.plans.move_to_end(key)
+        while len(self.plans) > self.capacity:
+            self.plans.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, key=None):
+        """
+        Drop the plan for key, or every plan if key is None.
+        """
+        if key is None:
+            if len(self.plans):
+                self.stats["invalidations"] += 1
+            self.plans = OrderedDict()
+        elif self.plans.pop(key, None) is not None:
+            self.stats["invalidations"] += 1
+
+    def set_capacity(self, capacity):
+        self.capacity = capacity
+        while len(self.plans) > self.capacity:
+            self.plans.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get_stats(self):
+        """
+        @return: Dictionary with hits, misses, evictions, invalidations and the number of cached plans (size).
+        """
+        stats = dict(self.stats)
+        stats["size"] = len(self.plans)
+        return stats
+
+    def __len__(self):
+        return len(self.plans)
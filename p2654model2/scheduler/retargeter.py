@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+"""
+    Retargeter activates the scan paths of the registers accessed by iApply.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    Retargeter activates the scan paths of the registers accessed by iApply.  A register behind a Linker
+    using a Table selector (TAPMux) can only be scanned while the Linker selects the branch holding it.  Before
+    each apply pass the Retargeter holds back the scheduled nodes whose branch is not selected.  Once the rest
+    of the model is idle it plans the sequence of control register writes activating all of them: each step
+    writes the control register of each blocking Linker with the Table key that activates the most held nodes,
+    so nodes needing the same configuration share one CSU cycle, and a control register that is itself behind
+    an unselected branch gets its branch selected first.  The plan is carried out one step per idle model and
+    the held nodes are released as soon as the Linker reports their branch selected.
+
+    Plans are kept in a PlanCache keyed by the selector state and the held registers, so a test program that
+    accesses the same registers repeatedly plans them once.  The cache is flushed when nodes are added to the
+    model, and a plan is dropped when a selector register is written outside it or a step does not select
+    what the plan expected.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+from myhdl import intbv
+from p2654model2.builder.nodecontainer import NodeContainer
+from p2654model2.node.modelnode import Linker
+from p2654model2.scheduler.scheduler import SchedulerFactory
+from p2654model2.scheduler.plancache import PlanCache
+import p2654model2.rvf.commands.register_pb2
+import p2654model2.rvf.rvfmessage_pb2
+
+import logging
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
+
+
+module_logger = logging.getLogger('p2654model2.scheduler.retargeter')
+instrument = InstrumentFactory.get_instrument()
+
+
+@logged
+@instrumented("scheduler")
+class Retargeter(object):
+    def __init__(self):
+        self.logger = logging.getLogger('p2654model2.scheduler.retargeter')
+        self.logger.info('Creating an instance of Retargeter')
+        # Nodes taken out of the apply passes until their branch is selected
+        self.held = set()
+        # uid -> [(linker uid, child uid, control uid, [keys selecting child])] for every Table selector above it
+        self.requirements = {}
+        # linker uid -> {key: child uid} decoded from its Table selector
+        self.tables = {}
+        # uids of every control register found in the requirements and linker uid -> its control register uid
+        self.controls = set()
+        self.linkers = {}
+        self.nodes = 0
+        # control uid -> value written by the current retargeting step
+        self.issued = {}
+        # Plan being carried out: its cache key, its steps and the index of the next step
+        self.cache = PlanCache()
+        self.plan_key = None
+        self.plan = None
+        self.plan_index = 0
+        self.stats = {"holds": 0, "steps": 0, "writes": 0, "plans": 0, "aborted": 0}
+
+    def is_pending(self):
+        return len(self.held) > 0
+
+    def get_stats(self):
+        """
+        @return: Dictionary with the nodes held back (holds), the retargeting steps run (steps), the control
+                 register writes they issued (writes), the plans computed (plans) and abandoned (aborted), and
+                 the plan cache statistics prefixed with plan_.
+        """
+        stats = dict(self.stats)
+        for k, v in self.cache.get_stats().items():
+            stats["plan_" + k] = v
+        return stats
+
+    def set_plan_cache_size(self, size):
+        self.cache.set_capacity(size)
+
+    def invalidate_plans(self):
+        """
+        Forget every cached plan, e.g. after the model was changed without adding nodes.
+        """
+        self.cache.invalidate()
+        self.__abandon()
+
+    def clear(self):
+        self.held = set()
+        self.issued = {}
+        self.plan = None
+
+    @staticmethod
+    def __key(k):
+        try:
+            return int(k, 0)
+        except ValueError:
+            return int(k)
+
+    def __requirements(self, uid):
+        nc = NodeContainer.get_nodecontainer()
+        if self.nodes != nc.get_next_node_id():
+            # The model changed so neither the requirements nor the plans built on them can be trusted
+            self.requirements = {}
+            self.tables = {}
+            self.controls = set()
+            self.linkers = {}
+            self.cache.invalidate()
+            self.plan = None
+            self.nodes = nc.get_next_node_id()
+        reqs = self.requirements.get(uid)
+        if reqs is not None:
+            return reqs
+        sched = SchedulerFactory.get_scheduler()
+        reqs = []
+        child = uid
+        parent = sched.get_parent(child)
+        while parent is not None:
+            linker = nc.get_node_by_id(parent)
+            if isinstance(linker, Linker) and isinstance(linker.selector, dict) and "Table" in linker.selector:
+                table = self.__table(linker)
+                keys = sorted(k for k, v in table.items() if v == child)
+                if not len(keys):
+                    raise AssertionError("No selector value of {:s} activates {:s}.".format(
+                        linker.name, nc.get_node_by_id(child).name))
+                if not len(linker.control):
+                    raise AssertionError("{:s} has a Table selector but no control register.".format(linker.name))
+                # TAPMux decodes a single control register
+                control = nc.get_node_by_path(linker.control[0]).uid
+                self.controls.add(control)
+                self.linkers[parent] = control
+                reqs.append((parent, child, control, keys))
+            child = parent
+            parent = sched.get_parent(child)
+        self.requirements[uid] = reqs
+        return reqs
+
+    def __table(self, linker):
+        table = self.tables.get(linker.uid)
+        if table is None:
+            children = {c.name: c.uid for c in linker.get_children()}
+            table = {Retargeter.__key(k): children.get(v) for k, v in linker.selector["Table"][0].items()}
+            self.tables[linker.uid] = table
+        return table
+
+    def __unmet(self, uid):
+        nc = NodeContainer.get_nodecontainer()
+        return [r for r in self.__requirements(uid) if not nc.get_node_by_id(r[0]).transform_engine.is_selected(r[1])]
+
+    def retarget(self):
+        """
+        Called by iApply before every apply pass.  Holds back the scheduled nodes behind unselected branches,
+        releases the held nodes whose branch became selected and, once nothing else is pending, issues the
+        control register writes of the next step of the retargeting plan.
+        """
+        sched = SchedulerFactory.get_scheduler()
+        for uid in list(self.held):
+            if not len(self.__unmet(uid)):
+                self.held.discard(uid)
+                sched.schedule(uid)
+        scheduled = sched.get_scheduled()
+        if self.plan is not None:
+            for uid in scheduled:
+                if uid in self.controls and uid not in self.issued:
+                    # A selector register is being written outside the plan, which no longer describes the path
+                    if instrument.scheduler:
+                        instrument.emit("scheduler", "Retargeter.retarget", control=uid, outside_plan=True)
+                    self.cache.invalidate(self.plan_key)
+                    self.__abandon()
+                    break
+        for uid in scheduled:
+            if uid not in self.held and len(self.__unmet(uid)) and sched.hold(uid):
+                self.held.add(uid)
+                self.stats["holds"] += 1
+        if not len(self.held):
+            self.plan = None
+            return
+        if sched.is_pending():
+            return
+        self.__step()
+
+    def __abandon(self):
+        if self.plan is not None:
+            self.stats["aborted"] += 1
+        self.plan = None
+        self.issued = {}
+
+    def __step(self):
+        nc = NodeContainer.get_nodecontainer()
+        if self.plan is not None and self.plan_index > 0:
+            for linker, child in self.plan[self.plan_index - 1][1].items():
+                if not nc.get_node_by_id(linker).transform_engine.is_selected(child):
+                    self.cache.invalidate(self.plan_key)
+                    self.__abandon()
+                    raise AssertionError("Retargeting step {:d} did not select {:s} in {:s}.".format(
+                        self.plan_index, nc.get_node_by_id(child).name, nc.get_node_by_id(linker).name))
+        if self.plan is None or self.plan_index >= len(self.plan):
+            state = self.__state(self.held)
+            self.plan_key = PlanCache.key(state, self.held)
+            self.plan = self.cache.get(self.plan_key)
+            if self.plan is None:
+                self.plan = self.__plan(state, self.held)
+                self.cache.put(self.plan_key, self.plan)
+            self.plan_index = 0
+        writes = self.plan[self.plan_index][0]
+        self.plan_index += 1
+        self.issued = dict(writes)
+        self.stats["steps"] += 1
+        for control in sorted(writes):
+            self.__write(control, writes[control])
+
+    def __state(self, targets):
+        """
+        @return: Dictionary of the uid of each Linker the targets (or the control registers they need) sit
+                 behind to the uid of the child it currently selects, None when it selects none.
+        """
+        nc = NodeContainer.get_nodecontainer()
+        state = {}
+        pending = list(targets)
+        seen = set(pending)
+        while pending:
+            for linker, _, control, _ in self.__requirements(pending.pop()):
+                if linker not in state:
+                    engine = nc.get_node_by_id(linker).transform_engine
+                    state[linker] = None
+                    for child in self.__table(nc.get_node_by_id(linker)).values():
+                        if child is not None and engine.is_selected(child):
+                            state[linker] = child
+                            break
+                if control not in seen:
+                    seen.add(control)
+                    pending.append(control)
+        return state
+
+    def __plan(self, state, targets):
+        """
+        Work out, on a copy of the selector state, the sequence of control register writes activating every
+        target.  Each step writes the value of each blocking control register that selects the branch of the
+        most remaining targets, so targets needing the same configuration share one CSU cycle; a control
+        register that is itself behind an unselected branch gets its own branch selected first.
+        @return: Tuple of steps, each a pair of {control uid: value} and {linker uid: child uid expected selected}.
+        """
+        self.stats["plans"] += 1
+        sim = dict(state)
+        controlled = {}
+        for linker in sim:
+            controlled.setdefault(self.linkers[linker], []).append(linker)
+
+        def met(uid):
+            return all(sim[linker] == child for linker, child, _, _ in self.__requirements(uid))
+
+        def vote(uid, votes, seen):
+            for linker, child, control, keys in self.__requirements(uid):
+                if sim[linker] == child:
+                    continue
+                if met(control):
+                    tally = votes.setdefault(control, {})
+                    for k in keys:
+                        tally[k] = tally.get(k, 0) + 1
+                elif control not in seen:
+                    seen.add(control)
+                    vote(control, votes, seen)
+
+        steps = []
+        remaining = set(targets)
+        limit = len(remaining) * (len(sim) + 1)
+        while True:
+            remaining = {uid for uid in remaining if not met(uid)}
+            if not len(remaining):
+                break
+            votes = {}
+            seen = set()
+            for uid in sorted(remaining):
+                vote(uid, votes, seen)
+            if not len(votes) or len(steps) >= limit:
+                nc = NodeContainer.get_nodecontainer()
+                raise AssertionError("Cannot activate {:s}.".format(
+                    ", ".join(nc.get_node_by_id(uid).name for uid in sorted(remaining))))
+            writes = {}
+            expect = {}
+            for control, tally in votes.items():
+                value = max(sorted(tally), key=lambda k: tally[k])
+                writes[control] = value
+                for linker in sorted(controlled.get(control, ())):
+                    sim[linker] = self.tables[linker].get(value)
+                    expect[linker] = sim[linker]
+            steps.append((writes, expect))
+        return tuple(steps)
+
+    def __write(self, uid, value):
+        nc = NodeContainer.get_nodecontainer()
+        node = nc.get_node_by_id(uid)
+        iid = node.get_command_id("WRITE")
+        if iid is None:
+            raise AssertionError("Control register {:s} does not support WRITE.".format(node.name))
+        if instrument.scheduler:
+            instrument.emit("scheduler", "Retargeter.__write", node=node.name, value=value)
+        s = p2654model2.rvf.commands.register_pb2.WRITE()
+        s.IID = iid
+        s.nrbits = node.size
+        bv = intbv(value)
+        for _ in range((node.size + 31) // 32):
+            s.value.append(bv & 0xFFFFFFFF)
+            bv = bv >> 32
+        wrapper = p2654model2.rvf.rvfmessage_pb2.RVFCommand()
+        wrapper.IID = s.IID
+        wrapper.metaname = "WRITE"
+        wrapper.rvf_type = p2654model2.rvf.rvfmessage_pb2.WRAPPER
+        wrapper.serialized = s.SerializeToString()
+        self.stats["writes"] += 1
+        return node.handleCommand(wrapper)
+
+
+class RetargeterFactory(object):
+    inst = None
+
+    @staticmethod
+    def get_retargeter():
+        if RetargeterFactory.inst is None:
+            RetargeterFactory.inst = Retargeter()
+        return RetargeterFactory.inst
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+"""
+    Scheduler keeps the set of model nodes that have pending work for iApply.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    Scheduler keeps the set of model nodes that have pending work for iApply.  A TransformEngine schedules
+    itself whenever something hands it work (an injector command, a request from a child, a response from
+    its parent, an update or an observer event) and stays scheduled while its apply() reports pending.  An
+    apply pass then visits only the scheduled nodes and their ancestors in the order a whole tree apply()
+    would visit them (children before their parent), so the cost of iApply follows the number of touched
+    registers instead of the size of the model.  Data value changes of the registers observed by Linkers are
+    collected during the pass and delivered once per register at its end.  When the ApplyPool is enabled the
+    nodes of controller subtrees behind different driver resources are put in separate lanes and the lanes of a pass are visited
+    concurrently, before the nodes above them.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import heapq
+import threading
+from p2654model2.builder.nodecontainer import NodeContainer
+from p2654model2.scheduler.applypool import ApplyPoolFactory
+
+import logging
+from autologging import logged
+from p2654model2.instrument.instrument import instrumented
+
+
+module_logger = logging.getLogger('p2654model2.scheduler.scheduler')
+
+
+@logged
+@instrumented("scheduler")
+class Scheduler(object):
+    def __init__(self):
+        self.logger = logging.getLogger('p2654model2.scheduler.scheduler')
+        self.logger.info('Creating an instance of Scheduler')
+        self.lock = threading.Lock()
+        self.dirty = set()
+        # uid -> parent uid and uid -> position in the post-order walk of the model tree
+        self.parent = {}
+        self.order = {}
+        # uid -> lane of the independent subtree holding it, nodes not in the map are in the main lane (None)
+        self.lane = {}
+        self.nodes = 0
+        self.generation = -1
+        # lane -> heap and lane -> position reached of the pass in progress, and its membership; None between
+        # passes
+        self.heaps = None
+        self.current = None
+        self.queued = None
+        # uid -> TransformEngine whose data value changed during the pass in progress; None between passes
+        self.changed = None
+        self.stats = {"passes": 0, "visits": 0, "notifications": 0}
+
+    def schedule(self, uid):
+        """
+        Record that the node with this uid has work for the next apply pass.  When called during a pass for
+        a node the pass has not reached yet (normally an ancestor receiving a request) the node is visited in
+        the same pass, as the whole tree apply() would have done.
+        """
+        with self.lock:
+            if self.heaps is not None:
+                pos = self.order.get(uid)
+                lane = self.lane.get(uid)
+                if pos is not None and lane in self.heaps and pos > self.current[lane]:
+                    if uid not in self.queued:
+                        self.queued.add(uid)
+                        heapq.heappush(self.heaps[lane], (pos, uid))
+                    return
+            self.dirty.add(uid)
+
+    def notify(self, te):
+        """
+        Record that the data value of a node with observers changed.  During an apply pass the observers are
+        notified once, at the end of the pass, with the last value; otherwise they are notified at once.
+        @param te: TransformEngine of the node.
+        """
+        with self.lock:
+            if self.changed is not None:
+                self.changed[te.uid] = te
+                return
+        if te.notify_observers():
+            self.stats["notifications"] += 1
+
+    def is_pending(self):
+        return len(self.dirty) > 0
+
+    def is_scheduled(self, uid):
+        return uid in self.dirty
+
+    def get_scheduled(self):
+        with self.lock:
+            return set(self.dirty)
+
+    def hold(self, uid):
+        """
+        Take the node out of the next apply passes; its work stays queued in its strategies until schedule().
+        @return: True if the node was scheduled.
+        """
+        with self.lock:
+            if uid in self.dirty:
+                self.dirty.discard(uid)
+                return True
+            return False
+
+    def clear(self):
+        with self.lock:
+            self.dirty = set()
+
+    def get_stats(self):
+        """
+        @return: Dictionary with the number of apply passes, of node visits they made and of observer
+                 notifications delivered.
+        """
+        return dict(self.stats)
+
+    def get_parent(self, uid):
+        """
+        @return: uid of the model parent of the node, None for the root.
+        """
+        with self.lock:
+            self.__refresh()
+            return self.parent.get(uid)
+
+    def __refresh(self):
+        if self.nodes != NodeContainer.get_nodecontainer().get_next_node_id() or \
+                self.generation != ApplyPoolFactory.get_applypool().generation:
+            self.__build()
+
+    def __build(self):
+        # Post-order walk so that a node comes after all its descendants
+        nc = NodeContainer.get_nodecontainer()
+        root = nc.top if nc.top is not None else nc.get_node_by_id(0)
+        self.parent = {root.uid: None}
+        self.order = {}
+        stack = [(root, False)]
+        while stack:
+            node, done = stack.pop()
+            if done:
+                self.order[node.uid] = len(self.order)
+                continue
+            stack.append((node, True))
+            for child in reversed(node.get_children()):
+                self.parent[child.uid] = node.uid
+                stack.append((child, False))
+        self.lane = {}
+        pool = ApplyPoolFactory.get_applypool()
+        if pool.is_enabled():
+            self.__build_lanes(root, pool)
+        self.nodes = nc.get_next_node_id()
+        self.generation = pool.generation
+
+    def __build_lanes(self, root, pool):
+        # Descend until a node splits into independent groups of children; each group becomes a lane
+        nc = NodeContainer.get_nodecontainer()
+        nodes = [root]
+        lane = 0
+        while nodes:
+            node = nodes.pop()
+            children = node.get_children()
+            groups = pool.partition([child.transform_engine for child in children])[0] if len(children) > 1 else []
+            if len(groups) < 2:
+                nodes.extend(children)
+                continue
+            for group in groups:
+                subtree = [te.uid for te in group]
+                while subtree:
+                    uid = subtree.pop()
+                    self.lane[uid] = lane
+                    subtree.extend(child.uid for child in nc.get_node_by_id(uid).get_children())
+                lane += 1
+
+    def apply(self, timeout=0):
+        """
+        Run one apply pass over the scheduled nodes and their ancestors.
+        @return: -1 if a node reported an error, 1 if work is still pending, 0 when nothing is left to do.
+        """
+        with self.lock:
+            self.__refresh()
+            self.queued = set()
+            self.heaps = {None: []}
+            self.current = {None: -1}
+            self.changed = {}
+            for uid in self.dirty:
+                while uid is not None and uid not in self.queued:
+                    self.queued.add(uid)
+                    lane = self.lane.get(uid)
+                    if lane not in self.heaps:
+                        self.heaps[lane] = []
+                        self.current[lane] = -1
+                    self.heaps[lane].append((self.order.get(uid, -1), uid))
+                    uid = self.parent.get(uid)
+            for heap in self.heaps.values():
+                heapq.heapify(heap)
+            self.dirty = set()
+            lanes = [lane for lane in self.heaps if lane is not None]
+        self.stats["passes"] += 1
+        results = [0, 0]
+        try:
+            # Independent subtrees first, concurrently, then the nodes above them
+            for r in ApplyPoolFactory.get_applypool().run(lambda lane: self.__visit(lane, timeout), lanes):
+                results[0] += r[0]
+                results[1] += r[1]
+            r = self.__visit(None, timeout)
+            results[0] += r[0]
+            results[1] += r[1]
+        finally:
+            with self.lock:
+                self.heaps = None
+                self.current = None
+                self.queued = None
+                changed = self.changed
+                self.changed = None
+            # Selector changes reach the Linkers once per pass, for the registers whose value changed
+            for te in changed.values():
+                if te.notify_observers():
+                    self.stats["notifications"] += 1
+        err, pending = results
+        if err:
+            return -1
+        elif pending or len(self.dirty):
+            return 1
+        else:
+            return 0
+
+    def __visit(self, lane, timeout):
+        """
+        Apply the nodes of one lane of the pass in progress in post-order.
+        @return: (number of nodes reporting an error, number of nodes reporting pending)
+        """
+        nc = NodeContainer.get_nodecontainer()
+        err = 0
+        pending = 0
+        heap = self.heaps[lane]
+        while True:
+            with self.lock:
+                if not len(heap):
+                    # Nodes of this lane scheduled from now on wait for the next pass
+                    self.current[lane] = len(self.order)
+                    break
+                self.current[lane], uid = heapq.heappop(heap)
+                self.stats["visits"] += 1
+            r = nc.get_node_by_id(uid).transform_engine.apply_node(timeout)
+            if r == 1:
+                pending += 1
+                with self.lock:
+                    self.dirty.add(uid)
+            elif r == -1:
+                err += 1
+        return err, pending
+
+
+class SchedulerFactory(object):
+    inst = None
+
+    @staticmethod
+    def get_scheduler():
+        if SchedulerFactory.inst is None:
+            SchedulerFactory.inst = Scheduler()
+        return SchedulerFactory.inst
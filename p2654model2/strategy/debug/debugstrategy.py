@@ -35,13 +35,15 @@ __version__ = "0.0.1"
 from p2654model2.builder.moduleloader import ModuleLoader
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 module_logger = logging.getLogger('P2654Model2.strategy.transforms.strategies.TAPTransform')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("strategy")
 class DebugStrategy(object):
     __indent = 0
 
@@ -69,27 +71,33 @@ class DebugStrategy(object):
         return self.class_obj.create(self.name, self.node_uid, self.child_uids, params)
 
     def handleRequest(self, message):
-        self.logger.debug("DebugStrategy.handleRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "DebugStrategy.handleRequest", node=self.name, command=message.metaname)
         return self.class_obj.handleRequest(self.node_uid, message)
 
     def updateRequest(self, message):
-        self.logger.debug("DebugStrategy.updateRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "DebugStrategy.updateRequest", node=self.name, command=message.metaname)
         return self.class_obj.updateRequest(self.node_uid, message)
 
     def sendRequest(self, message):
-        self.logger.debug("DebugStrategy.sendRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "DebugStrategy.sendRequest", node=self.name, command=message.metaname)
         return self.class_obj.sendRequest(self.node_uid, message)
 
     def handleResponse(self, message):
-        self.logger.debug("DebugStrategy.handleResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "DebugStrategy.handleResponse", node=self.name, command=message.metaname)
         return self.class_obj.handleResponse(self.node_uid, message)
 
     def updateResponse(self, message):
-        self.logger.debug("DebugStrategy.updateResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "DebugStrategy.updateResponse", node=self.name, command=message.metaname)
         return self.class_obj.updateResponse(self.node_uid, message)
 
     def sendResponse(self, message):
-        self.logger.debug("DebugStrategy.sendResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "DebugStrategy.sendResponse", node=self.name, command=message.metaname)
         return self.class_obj.sendResponse(self.node_uid, message)
 
     def getStatus(self, timeout):
@@ -99,7 +107,8 @@ class DebugStrategy(object):
         return self.class_obj.getError(self.node_uid, timeout)
 
     def apply(self, timeout=0):
-        self.logger.debug("DebugStrategy.apply({:s}): processing\n".format(self.name))
+        if instrument.strategy:
+            instrument.emit("strategy", "DebugStrategy.apply", node=self.name)
         return self.class_obj.apply(self.node_uid, timeout)
 
     def getCallbackNames(self):
@@ -37,14 +37,16 @@ from p2654model2.builder.nodecontainer import NodeContainer
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 
 module_logger = logging.getLogger('p2654model2.strategy.inject.injectionstrategy')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("strategy")
 class InjectionStrategy(object):
     global_iid = 0
     __indent = 0
@@ -80,11 +82,13 @@ class InjectionStrategy(object):
         return ret
 
     def handleRequest(self, message):
-        self.logger.debug("InjectionStrategy.handleRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "InjectionStrategy.handleRequest", node=self.name, command=message.metaname)
         return self.class_obj.handleRequest(self.node_uid, message)
 
     def handleResponse(self, message):
-        self.logger.debug("InjectionStrategy.handleResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "InjectionStrategy.handleResponse", node=self.name, command=message.metaname)
         return self.class_obj.handleResponse(self.node_uid, message)
 
     def getStatus(self, timeout=0):
@@ -94,7 +98,8 @@ class InjectionStrategy(object):
         return self.class_obj.getError(self.node_uid, timeout)
 
     def apply(self, timeout=0):
-        self.logger.debug("InjectionStrategy.apply({:s}): processing\n".format(self.name))
+        if instrument.strategy:
+            instrument.emit("strategy", "InjectionStrategy.apply", node=self.name)
         return self.class_obj.apply(self.node_uid, timeout)
 
     def getCallbackNames(self):
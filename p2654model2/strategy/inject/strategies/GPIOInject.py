@@ -40,13 +40,15 @@ from p2654model2.error.ModelError import ModelError
 from queue import Queue
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 module_logger = logging.getLogger('p2654model2.strategy.inject.strategies.GPIOInject')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("strategy")
 class GPIOInject(object):
     __indent = 0
 
@@ -83,7 +85,8 @@ class GPIOInject(object):
         return None
 
     def handleRequest(self, node_uid, message):
-        self.logger.debug("GPIOInject.handleRequest(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOInject.handleRequest", command=message.metaname)
         print("GPIOInject handling request ({:s}).".format(message.metaname))
         if message.metaname == "INPUT":
             s = p2654model2.rvf.protocols.GPIO_pb2.INPUT()
@@ -96,7 +99,8 @@ class GPIOInject(object):
         return None
 
     def handleResponse(self, node_uid, message):
-        self.logger.debug("GPIOInject.handleResponse(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOInject.handleResponse", command=message.metaname)
         print("GPIOInject handling response ({:s}).".format(message.metaname))
         if message.metaname == "INPUT":
             s = p2654model2.rvf.protocols.GPIO_pb2.INPUT()
@@ -127,7 +131,8 @@ class GPIOInject(object):
         return rvf
 
     def apply(self, node_uid, timeout=0):
-        self.logger.debug("GPIOInject.apply(): processing {:d} node_uid\n".format(node_uid))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOInject.apply", node_uid=node_uid)
         return 0
 
     def getCallbackNames(self):
@@ -207,7 +212,8 @@ class GPIOInject(object):
         return True
 
     def __sendRequest(self, node_uid, message, metaname):
-        self.logger.debug("GPIOInject.__sendRequest(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOInject.__sendRequest", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = self.node_uid
         wrapper.metaname = metaname
@@ -216,7 +222,8 @@ class GPIOInject(object):
         return self.sendRequestCallback(node_uid, wrapper)
 
     def __sendResponse(self, node_uid, message, metaname, uid):
-        self.logger.debug("GPIOInject.__sendResponse(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOInject.__sendResponse", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = uid
         wrapper.metaname = self.command
@@ -225,7 +232,8 @@ class GPIOInject(object):
         return self.sendResponseCallback(node_uid, wrapper)
 
     def __updateRequest(self, node_uid, message, metaname):
-        self.logger.debug("GPIOInject.__updateRequest(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOInject.__updateRequest", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = node_uid
         wrapper.metaname = metaname
@@ -234,7 +242,8 @@ class GPIOInject(object):
         return self.updateRequestCallback(node_uid, wrapper)
 
     def __updateResponse(self, node_uid, message, metaname, uid):
-        self.logger.debug("GPIOInject.__updateResponse(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOInject.__updateResponse", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = uid
         wrapper.metaname = metaname
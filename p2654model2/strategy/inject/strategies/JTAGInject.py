@@ -40,13 +40,15 @@ import p2654model2.rvf.protocols.JTAG_pb2
 import p2654model2.rvf.rvfmessage_pb2
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 module_logger = logging.getLogger('p2654model2.strategy.inject.strategies.JTAGInject')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("strategy")
 class JTAGInject(object):
     __indent = 0
 
@@ -89,7 +91,8 @@ class JTAGInject(object):
         return None
 
     def handleRequest(self, node_uid, message):
-        self.logger.debug("JTAGInject.handleRequest(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGInject.handleRequest", command=message.metaname)
         print("JTAGInject handling request ({:s}).".format(message.metaname))
         if message.metaname == "ENDDR":
             s = p2654model2.rvf.protocols.JTAG_pb2.ENDDR()
@@ -126,7 +129,8 @@ class JTAGInject(object):
         return None
 
     def handleResponse(self, node_uid, message):
-        self.logger.debug("JTAGInject.handleResponse(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGInject.handleResponse", command=message.metaname)
         print("JTAGInject handling response ({:s}).".format(message.metaname))
         if message.metaname == "ENDDR":
             s = p2654model2.rvf.protocols.JTAG_pb2.ENDDR()
@@ -181,7 +185,8 @@ class JTAGInject(object):
         return rvf
 
     def apply(self, node_uid, timeout=0):
-        self.logger.debug("JTAGInject.apply(): processing {:d} node_uid\n".format(node_uid))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGInject.apply", node_uid=node_uid)
         return 0
 
     def getCallbackNames(self):
@@ -451,7 +456,8 @@ class JTAGInject(object):
         return True
 
     def __sendRequest(self, node_uid, message, metaname):
-        self.logger.debug("JTAGInject.__sendRequest(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGInject.__sendRequest", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = self.node_uid
         wrapper.metaname = metaname
@@ -460,7 +466,8 @@ class JTAGInject(object):
         return self.sendRequestCallback(node_uid, wrapper.SerializeToString())
 
     def __sendResponse(self, node_uid, message, metaname):
-        self.logger.debug("JTAGInject.__sendResponse(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGInject.__sendResponse", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = node_uid
         wrapper.metaname = self.command
@@ -469,7 +476,8 @@ class JTAGInject(object):
         return self.sendResponseCallback(node_uid, wrapper.SerializeToString())
 
     def __updateRequest(self, node_uid, message, metaname):
-        self.logger.debug("JTAGInject.__updateRequest(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGInject.__updateRequest", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = node_uid
         wrapper.metaname = metaname
@@ -478,7 +486,8 @@ class JTAGInject(object):
         return self.updateRequestCallback(node_uid, wrapper.SerializeToString())
 
     def __updateResponse(self, node_uid, message, metaname, uid):
-        self.logger.debug("JTAGInject.__updateResponse(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGInject.__updateResponse", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = uid
         wrapper.metaname = metaname
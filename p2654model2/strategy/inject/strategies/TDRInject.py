@@ -41,13 +41,15 @@ from threading import Lock, Condition
 from queue import Queue
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 module_logger = logging.getLogger('p2654model2.strategy.inject.strategies.TDRInject')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("strategy")
 class TDRInject(object):
     __indent = 0
 
@@ -90,7 +92,8 @@ class TDRInject(object):
         return None
 
     def handleRequest(self, node_uid, message):
-        self.logger.debug("TDRInject.handleRequest(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRInject.handleRequest", command=message.metaname)
         print("TDRInject handling request ({:s}).".format(message.metaname))
         if message.metaname == "CSU":
             s = p2654model2.rvf.protocols.SCAN_pb2.CSU()
@@ -115,7 +118,8 @@ class TDRInject(object):
         return None
 
     def handleResponse(self, node_uid, message):
-        self.logger.debug("TDRInject.handleResponse(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRInject.handleResponse", command=message.metaname)
         print("TDRInject handling response ({:s}).".format(message.metaname))
         if message.metaname == "CSU":
             s = p2654model2.rvf.protocols.SCAN_pb2.CSU()
@@ -158,7 +162,8 @@ class TDRInject(object):
         return rvf
 
     def apply(self, node_uid, timeout=0):
-        self.logger.debug("TDRInject.apply(): processing {:d} node_uid\n".format(node_uid))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRInject.apply", node_uid=node_uid)
         print("TDRInject apply()")
         pending = 0
         err = 0
@@ -302,7 +307,8 @@ class TDRInject(object):
         return True
 
     def __sendRequest(self, node_uid, message, metaname):
-        self.logger.debug("TDRInject.__sendRequest(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRInject.__sendRequest", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = self.node_uid
         wrapper.metaname = metaname
@@ -311,7 +317,8 @@ class TDRInject(object):
         return self.sendRequestCallback(node_uid, wrapper)
 
     def __sendResponse(self, node_uid, message, metaname, uid):
-        self.logger.debug("TDRInject.__sendResponse(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRInject.__sendResponse", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = uid
         wrapper.metaname = self.command
@@ -320,7 +327,8 @@ class TDRInject(object):
         return self.sendResponseCallback(node_uid, wrapper)
 
     def __updateRequest(self, node_uid, message, metaname):
-        self.logger.debug("TDRInject.__updateRequest(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRInject.__updateRequest", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = node_uid
         wrapper.metaname = metaname
@@ -329,7 +337,8 @@ class TDRInject(object):
         return self.updateRequestCallback(node_uid, wrapper)
 
     def __updateResponse(self, node_uid, message, metaname, uid):
-        self.logger.debug("TDRInject.__updateResponse(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRInject.__updateResponse", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = uid
         wrapper.metaname = metaname
@@ -36,17 +36,19 @@ __version__ = "0.0.1"
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 import p2654model2.rvf.protocols.GPIO_pb2
 import p2654model2.rvf.rvfmessage_pb2
 from p2654model2.builder.drivers import Drivers
 
 # create logger
 module_logger = logging.getLogger('p2654model2.strategy.transform.strategies.GPIOControllerAssembly')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("strategy")
 class GPIOControllerAssembly(object):
     __indent = 0
 
@@ -72,7 +74,7 @@ class GPIOControllerAssembly(object):
         self.update = None
         self.pending = None
         self.capture = None
-        self.gpio_controller = Drivers.get_gpio()
+        self.gpio_controller = None
 
     def create(self, name, node_uid, children_uids, children_names, params):
         # print("GPIOControllerAssembly params = {:s}".format(str(params)))
@@ -87,7 +89,8 @@ class GPIOControllerAssembly(object):
         return True
 
     def handleRequest(self, node_uid, message):
-        self.logger.debug("GPIOControllerAssembly.handleRequest(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOControllerAssembly.handleRequest", command=message.metaname)
         print("GPIOControllerAssembly handling request ({:s}).".format(message.metaname))
         if message.metaname == "INPUT":
             s = p2654model2.rvf.protocols.GPIO_pb2.INPUT()
@@ -100,7 +103,8 @@ class GPIOControllerAssembly(object):
         return None
 
     def handleResponse(self, node_uid, message):
-        self.logger.debug("GPIOControllerAssembly.handleResponse(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOControllerAssembly.handleResponse", command=message.metaname)
         print("GPIOControllerAssembly handling response ({:s}).".format(message.metaname))
         if message.metaname == "INPUT":
             s = p2654model2.rvf.protocols.GPIO_pb2.INPUT()
@@ -131,33 +135,26 @@ class GPIOControllerAssembly(object):
         return rvf
 
     def apply(self, node_uid, timeout=0):
-        self.logger.debug("GPIOControllerAssembly.apply(): processing {:d} node_uid\n".format(node_uid))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOControllerAssembly.apply", node_uid=node_uid)
         print("GPIOControllerAssembly apply()")
         pending = 0
         err = 0
         if self.pending:
             if self.capture:
-                self.gpio_controller.read()
-                wrvf = p2654model2.rvf.protocols.GPIO_pb2.INPUT()
-                wrvf.UID = node_uid
-                wrvf.value = self.gpio_controller.get_value()
+                gpio_controller = self.__get_gpio_controller()
+                gpio_controller.read()
                 pending += 1
-                ret = self.__sendResponse(node_uid, wrvf, "INPUT", self.child_uid)
-                if not ret:
+                if not self.__input_response(node_uid, gpio_controller.get_value()):
                     err += 1
-                self.pending = False
-                self.capture = False
             if self.update:
-                wrvf = p2654model2.rvf.protocols.GPIO_pb2.OUTPUT()
-                wrvf.UID = node_uid
-                ret = self.gpio_controller.write(self.output)
-                if not ret:
+                gpio_controller = self.__get_gpio_controller()
+                # The write joins the pipeline; its outcome is known once flushed, before the child is answered
+                if not gpio_controller.write(self.output) or not gpio_controller.flush():
                     err += 1
                 pending += 1
-                ret = self.__sendResponse(node_uid, wrvf, "OUTPUT", self.child_uid)
-                if not ret:
+                if not self.__output_response(node_uid):
                     err += 1
-                self.update = False
         self.pending = False
         if err:
             return -1
@@ -166,12 +163,68 @@ class GPIOControllerAssembly(object):
         else:
             return 0
 
+    async def apply_async(self, node_uid, timeout=0):
+        """
+        Coroutine counterpart of apply() driving the GPIO controller through the asyncio drivers.
+        """
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOControllerAssembly.apply_async", node_uid=node_uid)
+        pending = 0
+        err = 0
+        if self.pending:
+            gpio_controller = await Drivers.get_async_gpio()
+            if self.capture:
+                await gpio_controller.read()
+                pending += 1
+                if not self.__input_response(node_uid, gpio_controller.get_value()):
+                    err += 1
+            if self.update:
+                if not await gpio_controller.write(self.output) or not await gpio_controller.flush():
+                    err += 1
+                pending += 1
+                if not self.__output_response(node_uid):
+                    err += 1
+        self.pending = False
+        if err:
+            return -1
+        elif pending:
+            return 1
+        else:
+            return 0
+
+    def __get_gpio_controller(self):
+        # Acquired on first use so assemblies only driven through apply_async() never open a blocking session
+        if self.gpio_controller is None:
+            self.gpio_controller = Drivers.get_gpio()
+        return self.gpio_controller
+
+    def __input_response(self, node_uid, value):
+        wrvf = p2654model2.rvf.protocols.GPIO_pb2.INPUT()
+        wrvf.UID = node_uid
+        wrvf.value = value
+        self.pending = False
+        self.capture = False
+        return self.__sendResponse(node_uid, wrvf, "INPUT", self.child_uid)
+
+    def __output_response(self, node_uid):
+        wrvf = p2654model2.rvf.protocols.GPIO_pb2.OUTPUT()
+        wrvf.UID = node_uid
+        self.update = False
+        return self.__sendResponse(node_uid, wrvf, "OUTPUT", self.child_uid)
+
     def getCallbackNames(self):
         return ["INPUT", "OUTPUT"]
 
     def destroy(self, node_uid):
         return None
 
+    def get_resources(self, node_uid):
+        """
+        Driver resources used by apply().  Every controller is driven through the one ATE session, so this is
+        the session and the assembly shares its lane with the other controller assemblies on it.
+        """
+        return {Drivers.get_ate_resource()}
+
     def get_size(self):
         return self.nrbits
 
@@ -206,7 +259,8 @@ class GPIOControllerAssembly(object):
         return self.sendResponseCallback(node_uid, wrapper)
 
     def __updateDataValue(self, node_uid, message):
-        self.logger.debug("GPIOControllerAssembly.__updateDataValue({:s}):\n".format(self.name))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOControllerAssembly.__updateDataValue", node=self.name)
         dvmsg = p2654model2.rvf.rvfmessage_pb2.RVFDataValue()
         dvmsg.UID = node_uid
         dvmsg.nrbits = message.nrbits
@@ -40,14 +40,16 @@ import p2654model2.rvf.rvfmessage_pb2
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 
 module_logger = logging.getLogger('p2654model2.strategy.transforms.strategies.GPIOTransform')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("strategy")
 class GPIOTransform(object):
     __indent = 0
 
@@ -84,17 +86,20 @@ class GPIOTransform(object):
         return True
 
     def handleRequest(self, node_uid, message):
-        self.logger.debug("GPIOTransform.handleRequest(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOTransform.handleRequest", command=message.metaname)
         # print("GPIOTransform handling request ({:s}).".format(message.metaname))
         raise AssertionError("handleRequest called for leaf GPIOTransform.")
 
     def handleResponse(self, node_uid, message):
-        self.logger.debug("GPIOTransform.handleResponse(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOTransform.handleResponse", command=message.metaname)
         # print("GPIOTransform handling response ({:s}).".format(message.metaname))
         raise AssertionError("handleResponse called for leaf GPIOTransform.")
 
     def updateRequest(self, node_uid, message):
-        self.logger.debug("GPIOTransform.updateRequest(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOTransform.updateRequest", command=message.metaname)
         if message.metaname == "INPUT":
             s = p2654model2.rvf.protocols.GPIO_pb2.INPUT()
             s.ParseFromString(message.serialized)
@@ -106,7 +111,8 @@ class GPIOTransform(object):
         return 0
 
     def updateResponse(self, node_uid, message):
-        self.logger.debug("GPIOTransform.updateResponse(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOTransform.updateResponse", command=message.metaname)
         if message.metaname == "INPUT":
             s = p2654model2.rvf.protocols.GPIO_pb2.INPUT()
             s.ParseFromString(message.serialized)
@@ -136,7 +142,8 @@ class GPIOTransform(object):
         return rvf
 
     def apply(self, node_uid, timeout=0):
-        self.logger.debug("GPIOTransform.apply(): processing {:d} node_uid\n".format(node_uid))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOTransform.apply", node_uid=node_uid)
         print("GPIOTransform apply()")
         return 0
 
@@ -169,7 +176,8 @@ class GPIOTransform(object):
         return True
 
     def __sendRequest(self, node_uid, message, metaname):
-        self.logger.debug("GPIOTransform.__sendRequest(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOTransform.__sendRequest", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = self.node_uid
         wrapper.metaname = metaname
@@ -178,7 +186,8 @@ class GPIOTransform(object):
         return self.sendRequestCallback(node_uid, wrapper)
 
     def __sendResponse(self, node_uid, message, metaname, uid):
-        self.logger.debug("GPIOTransform.__sendResponse(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOTransform.__sendResponse", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = uid
         wrapper.metaname = metaname
@@ -187,7 +196,8 @@ class GPIOTransform(object):
         return self.sendResponseCallback(node_uid, wrapper)
 
     def __updateDataValue(self, node_uid, message):
-        self.logger.debug("GPIOTransform.__updateDataValue({:s}):\n".format(self.name))
+        if instrument.strategy:
+            instrument.emit("strategy", "GPIOTransform.__updateDataValue", node=self.name)
         dvmsg = p2654model2.rvf.rvfmessage_pb2.RVFDataValue()
         dvmsg.UID = node_uid
         dvmsg.nrbits = message.nrbits
@@ -36,15 +36,17 @@ __version__ = "0.0.1"
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 import p2654model2.rvf.rvfmessage_pb2
 
 # create logger
 module_logger = logging.getLogger('p2654model2.strategy.transform.strategies.JTAGBoard1')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("strategy")
 class JTAGBoard1(object):
     __indent = 0
 
@@ -79,11 +81,13 @@ class JTAGBoard1(object):
         return True
 
     def handleRequest(self, node_uid, message):
-        self.logger.debug("JTAGBoard1.handleRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGBoard1.handleRequest", node=self.name, command=message.metaname)
         return None
 
     def handleResponse(self, node_uid, message):
-        self.logger.debug("JTAGBoard1.handleResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGBoard1.handleResponse", node=self.name, command=message.metaname)
         return None
 
     def getStatus(self, node_uid, timeout):
@@ -105,7 +109,8 @@ class JTAGBoard1(object):
         return rvf
 
     def apply(self, node_uid, timeout=0):
-        self.logger.debug("JTAGBoard1.apply({:s}): processing {:d} node_uid\n".format(self.name, node_uid))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGBoard1.apply", node=self.name, node_uid=node_uid)
         print("JTAGBoard1Transform apply()")
         return 0
 
@@ -41,14 +41,16 @@ import p2654model2.rvf.rvfmessage_pb2
 from p2654model2.error.ModelError import ModelError
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 
 module_logger = logging.getLogger('p2654model2.strategy.transforms.strategies.JTAGChain')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("strategy")
 class JTAGChain(object):
     __indent = 0
 
@@ -97,7 +99,8 @@ class JTAGChain(object):
         return True
 
     def handleRequest(self, node_uid, message):
-        self.logger.debug("JTAGChain.handleRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGChain.handleRequest", node=self.name, command=message.metaname)
         print("JTAGChain handling request ({:s}).".format(message.metaname))
         if message.metaname == "ENDDR":
             s = p2654model2.rvf.protocols.JTAG_pb2.ENDDR()
@@ -134,7 +137,8 @@ class JTAGChain(object):
         return None
 
     def handleResponse(self, node_uid, message):
-        self.logger.debug("JTAGChain.handleResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGChain.handleResponse", node=self.name, command=message.metaname)
         print("TDRTransform handling response ({:s}).".format(message.metaname))
         if message.metaname == "ENDDR":
             s = p2654model2.rvf.protocols.JTAG_pb2.ENDDR()
@@ -261,7 +265,8 @@ class JTAGChain(object):
         return rvf
 
     def apply(self, node_uid, timeout=0):
-        self.logger.debug("JTAGChain.apply({:s}): processing {:d} node_uid\n".format(self.name, node_uid))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGChain.apply", node=self.name, node_uid=node_uid)
         print("JTAGChainTransform apply()")
         pending = 0
         err = 0
@@ -750,7 +755,8 @@ class JTAGChain(object):
     #     return True
 
     def __sendRequest(self, node_uid, message, metaname):
-        self.logger.debug("JTAGChain.__sendRequest({:s}): sending {:s} RVF\n".format(self.name, metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGChain.__sendRequest", node=self.name, command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = self.node_uid
         wrapper.metaname = metaname
@@ -759,7 +765,8 @@ class JTAGChain(object):
         return self.sendRequestCallback(node_uid, wrapper)
 
     def __sendResponse(self, node_uid, message, metaname, uid):
-        self.logger.debug("JTAGChain.__sendResponse({:s}): sending {:s} RVF\n".format(self.name, metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGChain.__sendResponse", node=self.name, command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = uid
         wrapper.metaname = metaname
@@ -768,7 +775,8 @@ class JTAGChain(object):
         return self.sendResponseCallback(node_uid, wrapper)
 
     def __updateDataValue(self, node_uid, message):
-        self.logger.debug("JTAGChain.__updateDataValue({:s}):\n".format(self.name))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGChain.__updateDataValue", node=self.name)
         dvmsg = p2654model2.rvf.rvfmessage_pb2.RVFDataValue()
         dvmsg.UID = node_uid
         dvmsg.nrbits = message.nrbits
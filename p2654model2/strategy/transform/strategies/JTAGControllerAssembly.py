@@ -36,7 +36,8 @@ __version__ = "0.0.1"
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 from myhdl import intbv, concat
 import p2654model2.rvf.protocols.JTAG_pb2
 import p2654model2.rvf.rvfmessage_pb2
@@ -46,10 +47,11 @@ from drivers.ate.atesim import RUN_TEST_IDLE, SHIFT_IR, SHIFT_DR, PAUSE_DR, PAUS
 
 # create logger
 module_logger = logging.getLogger('p2654model2.strategy.transform.strategies.JTAGControllerAssembly')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("strategy")
 class JTAGControllerAssembly(object):
     __indent = 0
 
@@ -86,7 +88,7 @@ class JTAGControllerAssembly(object):
         self.trst_message = None
         self.state_message = None
         self.frequency_message = None
-        self.jtag_controller = Drivers.get_jtag()
+        self.jtag_controller = None
 
     def create(self, name, node_uid, children_uids, children_names, params):
         # print("JTAGControllerAssembly params = {:s}".format(str(params)))
@@ -101,7 +103,8 @@ class JTAGControllerAssembly(object):
         return True
 
     def handleRequest(self, node_uid, message):
-        self.logger.debug("JTAGControllerAssembly.handleRequest(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGControllerAssembly.handleRequest", command=message.metaname)
         print("JTAGControllerAssembly handling request ({:s}).".format(message.metaname))
         if message.metaname == "ENDDR":
             s = p2654model2.rvf.protocols.JTAG_pb2.ENDDR()
@@ -138,7 +141,8 @@ class JTAGControllerAssembly(object):
         return None
 
     def handleResponse(self, node_uid, message):
-        self.logger.debug("JTAGControllerAssembly.handleResponse(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGControllerAssembly.handleResponse", command=message.metaname)
         print("JTAGControllerAssembly handling response ({:s}).".format(message.metaname))
         if message.metaname == "ENDDR":
             s = p2654model2.rvf.protocols.JTAG_pb2.ENDDR()
@@ -193,101 +197,78 @@ class JTAGControllerAssembly(object):
         return rvf
 
     def apply(self, node_uid, timeout=0):
-        self.logger.debug("JTAGControllerAssembly.apply(): processing {:d} node_uid\n".format(node_uid))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGControllerAssembly.apply", node_uid=node_uid)
         print("JTAGControllerAssembly apply()")
         pending = 0
         err = 0
         if self.pending:
-            if self.data_mode is None:
-                raise ModelError("Pending conflict with data_mode!")
+            self.__check_pending()
             if self.runtest_message is not None:
-                self.jtag_controller.runtest(self.runtest_message.run_count)
-                wrvf = p2654model2.rvf.protocols.JTAG_pb2.RUNTEST()
-                wrvf.UID = self.child_uid
-                wrvf.run_state = self.runtest_message.run_state
-                wrvf.run_count = self.runtest_message.run_count
-                wrvf.run_clk = self.runtest_message.run_clk
-                wrvf.min_time = self.runtest_message.min_time
-                wrvf.max_time = self.runtest_message.max_time
-                wrvf.end_state = self.runtest_message.end_state
+                self.__get_jtag_controller().runtest(self.runtest_message.run_count)
                 pending += 1
-                ret = self.__sendResponse(node_uid, wrvf, "RUNTEST", self.child_uid)
-                if not ret:
-                    err +=1
-                self.runtest_message = None
+                if not self.__runtest_response(node_uid):
+                    err += 1
+            if self.trst_message is not None:
+                if self.trst_message.state:
+                    self.__get_jtag_controller().softreset()
+                pending += 1
+                if not self.__trst_response(node_uid):
+                    err += 1
+            if self.capture and self.data_mode:
+                hextdi = JTAGControllerAssembly.intbv2hexstring(self.tdi)
+                tdo = self.__get_jtag_controller().scan_dr(len(self.tdi), hextdi, end=self.enddr)  # self.tdi must be an intbv type
+                pending += 1
+                if not self.__scan_response(node_uid, tdo, "SDR"):
+                    err += 1
+            elif self.capture and not self.data_mode:
+                hextdi = JTAGControllerAssembly.intbv2hexstring(self.tdi)
+                tdo = self.__get_jtag_controller().scan_ir(len(self.tdi), hextdi, end=self.endir)  # self.tdi must be an intbv type
+                pending += 1
+                if not self.__scan_response(node_uid, tdo, "SIR"):
+                    err += 1
+        if err:
+            return -1
+        elif pending:
+            return 1
+        else:
+            return 0
+
+    async def apply_async(self, node_uid, timeout=0):
+        """
+        Coroutine counterpart of apply() driving the JTAG controller through the asyncio drivers, so
+        assemblies on different boards can be applied concurrently from one event loop.
+        """
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGControllerAssembly.apply_async", node_uid=node_uid)
+        pending = 0
+        err = 0
+        if self.pending:
+            self.__check_pending()
+            jtag_controller = await Drivers.get_async_jtag()
+            if self.runtest_message is not None:
+                await jtag_controller.runtest(self.runtest_message.run_count)
+                pending += 1
+                if not self.__runtest_response(node_uid):
+                    err += 1
             if self.trst_message is not None:
                 if self.trst_message.state:
-                    self.jtag_controller.softreset()
-                wrvf = p2654model2.rvf.protocols.JTAG_pb2.TRST()
-                wrvf.UID = self.child_uid
-                wrvf.state = self.trst_message.state
+                    await jtag_controller.softreset()
                 pending += 1
-                ret = self.__sendResponse(node_uid, wrvf, "TRST", self.child_uid)
-                if not ret:
+                if not self.__trst_response(node_uid):
                     err += 1
-                self.trst_message = None
-            if self.state_message is not None:
-                raise NotImplementedError("Support for state is not yet implemented.")
-                # wrvf = p2654model2.rvf.protocols.JTAG_pb2.STATE()
-                # wrvf.UID = node_uid
-                # for s in self.state_message.state:
-                #     wrvf.state.append(s)
-                # wrvf.end_state = self.state_message.end_state
-                # self.__sendRequest(node_uid, wrvf, "STATE")
-                # self.state_message = None
-            if self.frequency_message is not None:
-                raise NotImplementedError("Support for frequency is not yet implemented.")
-                # wrvf = p2654model2.rvf.protocols.JTAG_pb2.FREQUENCY()
-                # wrvf.UID = node_uid
-                # wrvf.cycles = self.frequency_message.cycles
-                # self.__sendRequest(node_uid, wrvf, "FREQUENCY")
-                # self.frequency_message = None
             if self.capture and self.data_mode:
                 hextdi = JTAGControllerAssembly.intbv2hexstring(self.tdi)
-                tdo = self.jtag_controller.scan_dr(len(self.tdi), hextdi, end=self.enddr)  # self.tdi must be an intbv type
-                wrvf = p2654model2.rvf.protocols.JTAG_pb2.SDR()
-                wrvf.UID = node_uid
-                self.nrbits = len(self.tdi)
-                wrvf.nrbits = self.nrbits
-                ltdi = self.__vector_to_list(self.nrbits, self.tdi)
-                for v in ltdi:
-                    wrvf.tdi.append(v)
-                ltdo = self.__vector_to_list(self.nrbits, intbv(int("0x" + tdo, 16), _nrbits=len(self.tdi)))
-                for v in ltdo:
-                    wrvf.tdo.append(v)
-                lmask = self.__vector_to_list(self.nrbits, self.mask)
-                for v in lmask:
-                    wrvf.mask.append(v)
+                tdo = await jtag_controller.scan_dr(len(self.tdi), hextdi, end=self.enddr)
                 pending += 1
-                ret = self.__sendResponse(node_uid, wrvf, "SDR", self.child_uid)
-                if not ret:
+                if not self.__scan_response(node_uid, tdo, "SDR"):
                     err += 1
-                self.pending = False
-                self.capture = False
-                self.data_mode = None
             elif self.capture and not self.data_mode:
                 hextdi = JTAGControllerAssembly.intbv2hexstring(self.tdi)
-                tdo = self.jtag_controller.scan_ir(len(self.tdi), hextdi, end=self.endir)  # self.tdi must be an intbv type
-                wrvf = p2654model2.rvf.protocols.JTAG_pb2.SIR()
-                wrvf.UID = node_uid
-                self.nrbits = len(self.tdi)
-                wrvf.nrbits = self.nrbits
-                ltdi = self.__vector_to_list(self.nrbits, self.tdi)
-                for v in ltdi:
-                    wrvf.tdi.append(v)
-                ltdo = self.__vector_to_list(self.nrbits, intbv(int("0x" + tdo, 16), _nrbits=len(self.tdi)))
-                for v in ltdo:
-                    wrvf.tdo.append(v)
-                lmask = self.__vector_to_list(self.nrbits, self.mask)
-                for v in lmask:
-                    wrvf.mask.append(v)
+                tdo = await jtag_controller.scan_ir(len(self.tdi), hextdi, end=self.endir)
                 pending += 1
-                ret = self.__sendResponse(node_uid, wrvf, "SIR", self.child_uid)
-                if not ret:
+                if not self.__scan_response(node_uid, tdo, "SIR"):
                     err += 1
-                self.pending = False
-                self.capture = False
-                self.data_mode = None
         if err:
             return -1
         elif pending:
@@ -295,12 +276,86 @@ class JTAGControllerAssembly(object):
         else:
             return 0
 
+    def __get_jtag_controller(self):
+        # Acquired on first use so assemblies only driven through apply_async() never open a blocking session
+        if self.jtag_controller is None:
+            self.jtag_controller = Drivers.get_jtag()
+        return self.jtag_controller
+
+    def __check_pending(self):
+        if self.data_mode is None:
+            raise ModelError("Pending conflict with data_mode!")
+        if self.state_message is not None:
+            raise NotImplementedError("Support for state is not yet implemented.")
+            # wrvf = p2654model2.rvf.protocols.JTAG_pb2.STATE()
+            # wrvf.UID = node_uid
+            # for s in self.state_message.state:
+            #     wrvf.state.append(s)
+            # wrvf.end_state = self.state_message.end_state
+            # self.__sendRequest(node_uid, wrvf, "STATE")
+            # self.state_message = None
+        if self.frequency_message is not None:
+            raise NotImplementedError("Support for frequency is not yet implemented.")
+            # wrvf = p2654model2.rvf.protocols.JTAG_pb2.FREQUENCY()
+            # wrvf.UID = node_uid
+            # wrvf.cycles = self.frequency_message.cycles
+            # self.__sendRequest(node_uid, wrvf, "FREQUENCY")
+            # self.frequency_message = None
+
+    def __runtest_response(self, node_uid):
+        wrvf = p2654model2.rvf.protocols.JTAG_pb2.RUNTEST()
+        wrvf.UID = self.child_uid
+        wrvf.run_state = self.runtest_message.run_state
+        wrvf.run_count = self.runtest_message.run_count
+        wrvf.run_clk = self.runtest_message.run_clk
+        wrvf.min_time = self.runtest_message.min_time
+        wrvf.max_time = self.runtest_message.max_time
+        wrvf.end_state = self.runtest_message.end_state
+        self.runtest_message = None
+        return self.__sendResponse(node_uid, wrvf, "RUNTEST", self.child_uid)
+
+    def __trst_response(self, node_uid):
+        wrvf = p2654model2.rvf.protocols.JTAG_pb2.TRST()
+        wrvf.UID = self.child_uid
+        wrvf.state = self.trst_message.state
+        self.trst_message = None
+        return self.__sendResponse(node_uid, wrvf, "TRST", self.child_uid)
+
+    def __scan_response(self, node_uid, tdo, metaname):
+        if metaname == "SDR":
+            wrvf = p2654model2.rvf.protocols.JTAG_pb2.SDR()
+        else:
+            wrvf = p2654model2.rvf.protocols.JTAG_pb2.SIR()
+        wrvf.UID = node_uid
+        self.nrbits = len(self.tdi)
+        wrvf.nrbits = self.nrbits
+        ltdi = self.__vector_to_list(self.nrbits, self.tdi)
+        for v in ltdi:
+            wrvf.tdi.append(v)
+        ltdo = self.__vector_to_list(self.nrbits, intbv(int("0x" + tdo, 16), _nrbits=len(self.tdi)))
+        for v in ltdo:
+            wrvf.tdo.append(v)
+        lmask = self.__vector_to_list(self.nrbits, self.mask)
+        for v in lmask:
+            wrvf.mask.append(v)
+        self.pending = False
+        self.capture = False
+        self.data_mode = None
+        return self.__sendResponse(node_uid, wrvf, metaname, self.child_uid)
+
     def getCallbackNames(self):
         return ["ENDDR", "ENDIR", "SDR", "SIR", "RUNTEST", "TRST", "STATE", "FREQUENCY"]
 
     def destroy(self, node_uid):
         return None
 
+    def get_resources(self, node_uid):
+        """
+        Driver resources used by apply().  Every controller is driven through the one ATE session, so this is
+        the session and the assembly shares its lane with the other controller assemblies on it.
+        """
+        return {Drivers.get_ate_resource()}
+
     def get_size(self):
         return self.nrbits
 
@@ -407,7 +462,8 @@ class JTAGControllerAssembly(object):
         return True
 
     def __sendRequest(self, node_uid, message, metaname):
-        self.logger.debug("JTAGControllerAssembly.__sendRequest(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGControllerAssembly.__sendRequest", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = self.node_uid
         wrapper.metaname = metaname
@@ -416,7 +472,8 @@ class JTAGControllerAssembly(object):
         return self.sendRequestCallback(node_uid, wrapper)
 
     def __sendResponse(self, node_uid, message, metaname, uid):
-        self.logger.debug("JTAGControllerAssembly.__sendResponse(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGControllerAssembly.__sendResponse", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = uid
         wrapper.metaname = metaname
@@ -425,7 +482,8 @@ class JTAGControllerAssembly(object):
         return self.sendResponseCallback(node_uid, wrapper)
 
     def __updateDataValue(self, node_uid, message):
-        self.logger.debug("JTAGControllerAssembly.__updateDataValue({:s}):\n".format(self.name))
+        if instrument.strategy:
+            instrument.emit("strategy", "JTAGControllerAssembly.__updateDataValue", node=self.name)
         dvmsg = p2654model2.rvf.rvfmessage_pb2.RVFDataValue()
         dvmsg.UID = node_uid
         dvmsg.nrbits = message.nrbits
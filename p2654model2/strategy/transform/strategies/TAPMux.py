@@ -43,13 +43,15 @@ from queue import Queue
 import ast
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 module_logger = logging.getLogger('p2654model2.strategy.transforms.strategies.TAPMux')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("strategy")
 class TAPMux(object):
     __indent = 0
 
@@ -115,7 +117,8 @@ class TAPMux(object):
 
 
     def handleRequest(self, node_uid, message):
-        self.logger.debug("TAPMux.handleRequest(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPMux.handleRequest", command=message.metaname)
         print("TAPMux handling request ({:s}).".format(message.metaname))
         self.status_message = "OK"
         self.status_code = 0
@@ -152,7 +155,8 @@ class TAPMux(object):
         return None
 
     def handleResponse(self, node_uid, message):
-        self.logger.debug("TAPMux.handleResponse(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPMux.handleResponse", command=message.metaname)
         print("TAPMux handling response ({:s}).".format(message.metaname))
         if message.metaname == "ERROR":
             s = p2654model2.rvf.rvfmessage_pb2.RVFError()
@@ -197,7 +201,8 @@ class TAPMux(object):
         return None
 
     def updateRequest(self, node_uid, message):
-        self.logger.debug("TAPMux.updateRequest(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPMux.updateRequest", command=message.metaname)
         self.status_message = "OK"
         self.status_code = 0
         self.error_message = "UNKNOWN"
@@ -233,7 +238,8 @@ class TAPMux(object):
         return None
 
     def updateResponse(self, node_uid, message):
-        self.logger.debug("TAPMux.updateResponse(): processing {:s} RVF\n".format(message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPMux.updateResponse", command=message.metaname)
         if message.metaname == "ERROR":
             s = p2654model2.rvf.rvfmessage_pb2.RVFError()
             s.ParseFromString(message.serialized)
@@ -300,6 +306,12 @@ class TAPMux(object):
         raise AssertionError("Invalid code given to IR ({:s}).".format(hex(ir_value)))
         # return False
 
+    def is_selected(self, node_uid, child_uid):
+        for i, uid in enumerate(self.children_uids):
+            if uid == child_uid:
+                return self.selections[i]
+        return False
+
     def select(self, index):
         self.selections[index] = True
 
@@ -325,7 +337,8 @@ class TAPMux(object):
         return rvf
 
     def apply(self, node_uid, timeout=0):
-        self.logger.debug("TAPMux.apply(): processing {:d} node_uid\n".format(node_uid))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPMux.apply", node_uid=node_uid)
         print("TAPMux apply()")
         pending = 0
         err = 0
@@ -364,7 +377,8 @@ class TAPMux(object):
             if uid == message.UID:
                 break
             i += 1
-        self.logger.debug("TAPMux.__su_cb(): i={:d}, node_uid={:d}, selections={:s}\n".format(i, node_uid, str(self.selections)))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPMux.__su_cb", i=i, node_uid=node_uid, selections=self.selections)
         if self.selections[i]:
             rvf = p2654model2.rvf.protocols.SCAN_pb2.SU()
             rvf.UID = node_uid
@@ -816,7 +830,8 @@ class TAPMux(object):
     #     return True
 
     def __sendRequest(self, node_uid, message, metaname):
-        self.logger.debug("TAPMux.__sendRequest(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPMux.__sendRequest", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = self.node_uid
         wrapper.metaname = metaname
@@ -825,7 +840,8 @@ class TAPMux(object):
         return self.sendRequestCallback(node_uid, wrapper)
 
     def __sendResponse(self, node_uid, message, metaname, uid):
-        self.logger.debug("TAPMux.__sendResponse(): sending {:s} RVF\n".format(metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPMux.__sendResponse", command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = uid
         wrapper.metaname = metaname
@@ -834,7 +850,8 @@ class TAPMux(object):
         return self.sendResponseCallback(node_uid, wrapper)
 
     def __updateDataValue(self, node_uid, message):
-        self.logger.debug("TAPMux.__updateDataValue():\n")
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPMux.__updateDataValue")
         dvmmsg = p2654model2.rvf.rvfmessage_pb2.RVFDataValue()
         dvmmsg.UID = node_uid
         dvmmsg.nrbits = message.nrbits
@@ -906,11 +923,11 @@ class TAPMux(object):
 
     @staticmethod
     def ipint2int(val):
-        logger = logging.getLogger('p2654model2.strategy.transforms.strategies.TAPMux')
         v = 0
         i = 0
         for n in val:
-            logger.debug("TAPMux.ipint2int(): val = {:s}, v = {:d}, n = {:d}, i = {:d}, (n << (i * 32) = {:d}\n".format(str(val), v, n, i, (n << (i * 32))))
+            if instrument.strategy:
+                instrument.emit("strategy", "TAPMux.ipint2int", val=val, v=v, n=n, i=i)
             v = v + (n << (i * 32))
             i += 1
         return v
@@ -935,8 +952,8 @@ class TAPMux(object):
         """
         try:
             self.selector = v["Table"][0]
-            self.logger.debug("TAPMux.__setup_selector(): self.selector {:s}\n".format(str(self.selector)))
-            self.logger.debug("TAPMux.__setup_selector(): self.selector type {:s}\n".format(str(type(self.selector))))
+            if instrument.strategy:
+                instrument.emit("strategy", "TAPMux.__setup_selector", selector=self.selector)
             for k, v in self.selector.items():
                 if "0x" in k:
                     self.selkeys.append(intbv(int(k, 16)))
@@ -952,11 +969,13 @@ class TAPMux(object):
 
     def __setup_derivations(self, v):
         self.derivations = v
-        self.logger.debug("TAPMux.__setup_derivations(): self.derivations {:s}\n".format(str(self.derivations)))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPMux.__setup_derivations", derivations=self.derivations)
 
     def __setup_control(self, v):
         self.control = v
-        self.logger.debug("TAPMux.__setup_control(): self.control {:s}\n".format(str(self.control)))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPMux.__setup_control", control=self.control)
         self.registerObserverCallback(self.node_uid, self.control)
 
     def __parse_params(self, args):
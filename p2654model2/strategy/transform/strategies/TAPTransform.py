@@ -43,14 +43,16 @@ from queue import Queue
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 
 module_logger = logging.getLogger('p2654model2.strategy.transforms.strategies.TAPTransform')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("strategy")
 class TAPTransform(object):
     __indent = 0
 
@@ -105,7 +107,8 @@ class TAPTransform(object):
         return True
 
     def handleRequest(self, node_uid, message):
-        self.logger.debug("TAPTransform.handleRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPTransform.handleRequest", node=self.name, command=message.metaname)
         print("TAPTransform handling request ({:s}).".format(message.metaname))
         self.status_message = "OK"
         self.status_code = 0
@@ -142,7 +145,8 @@ class TAPTransform(object):
         return None
 
     def handleResponse(self, node_uid, message):
-        self.logger.debug("TAPTransform.handleResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPTransform.handleResponse", node=self.name, command=message.metaname)
         print("TAPTransform handling response ({:s}).".format(message.metaname))
         if message.metaname == "ERROR":
             s = p2654model2.rvf.rvfmessage_pb2.RVFError()
@@ -183,7 +187,8 @@ class TAPTransform(object):
         return None
 
     def updateRequest(self, node_uid, message):
-        self.logger.debug("TAPTransform.updateRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPTransform.updateRequest", node=self.name, command=message.metaname)
         self.status_message = "OK"
         self.status_code = 0
         self.error_message = "UNKNOWN"
@@ -223,7 +228,8 @@ class TAPTransform(object):
         return 0
 
     def updateResponse(self, node_uid, message):
-        self.logger.debug("TAPTransform.updateResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPTransform.updateResponse", node=self.name, command=message.metaname)
         if message.metaname == "ERROR":
             s = p2654model2.rvf.rvfmessage_pb2.RVFError()
             s.ParseFromString(message.serialized)
@@ -289,7 +295,8 @@ class TAPTransform(object):
         return rvf
 
     def apply(self, node_uid, timeout=0):
-        self.logger.debug("TAPTransform.apply({:s}): processing {:d} node_uid\n".format(self.name, node_uid))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPTransform.apply", node=self.name, node_uid=node_uid)
         print("TAPTransform apply()")
         pending = 0
         err = 0
@@ -751,7 +758,8 @@ class TAPTransform(object):
         return True
 
     def __sendRequest(self, node_uid, message, metaname):
-        self.logger.debug("TAPTransform.__sendRequest({:s}): sending {:s} RVF\n".format(self.name, metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPTransform.__sendRequest", node=self.name, command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = self.node_uid
         wrapper.metaname = metaname
@@ -760,7 +768,8 @@ class TAPTransform(object):
         return self.sendRequestCallback(node_uid, wrapper)
 
     def __sendResponse(self, node_uid, message, metaname, uid):
-        self.logger.debug("TAPTransform.__sendResponse({:s}): sending {:s} RVF\n".format(self.name, metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPTransform.__sendResponse", node=self.name, command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = uid
         wrapper.metaname = metaname
@@ -785,7 +794,8 @@ class TAPTransform(object):
         return self.updateResponseCallback(node_uid, wrapper)
 
     def __updateDataValue(self, node_uid, tdo):
-        self.logger.debug("TAPTransform.__updateDataValue({:s}):\n".format(self.name))
+        if instrument.strategy:
+            instrument.emit("strategy", "TAPTransform.__updateDataValue", node=self.name)
         dvmsg = p2654model2.rvf.rvfmessage_pb2.RVFDataValue()
         dvmsg.UID = node_uid
         for v in tdo:
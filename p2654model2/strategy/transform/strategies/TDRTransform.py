@@ -40,13 +40,15 @@ import p2654model2.rvf.rvfmessage_pb2
 
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 module_logger = logging.getLogger('p2654model2.strategy.transforms.strategies.TDRTransform')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("strategy")
 class TDRTransform(object):
     __indent = 0
 
@@ -87,17 +89,20 @@ class TDRTransform(object):
         return True
 
     def handleRequest(self, node_uid, msg):
-        self.logger.debug("TDRTransform.handleRequest({:s}): processing {:s} RVF\n".format(self.name, msg.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRTransform.handleRequest", node=self.name, command=msg.metaname)
         # print("TDRTransform handling request ({:s}).".format(msg.metaname))
         raise AssertionError("handleRequest called for leaf TDRTransform.")
 
     def handleResponse(self, node_uid, msg):
-        self.logger.debug("TDRTransform.handleResponse({:s}): processing {:s} RVF\n".format(self.name, msg.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRTransform.handleResponse", node=self.name, command=msg.metaname)
         # print("TDRTransform handling response ({:s}).".format(msg.metaname))
         raise AssertionError("handleResponse called for leaf TDRTransform.")
 
     def updateRequest(self, node_uid, message):
-        self.logger.debug("TDRTransform.updateRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRTransform.updateRequest", node=self.name, command=message.metaname)
         self.status_message = "OK"
         self.status_code = 0
         self.error_message = "UNKNOWN"
@@ -125,7 +130,8 @@ class TDRTransform(object):
         return 0
 
     def updateResponse(self, node_uid, message):
-        self.logger.debug("TDRTransform.updateResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRTransform.updateResponse", node=self.name, command=message.metaname)
         if message.metaname == "ERROR":
             s = p2654model2.rvf.rvfmessage_pb2.RVFError()
             s.ParseFromString(message.serialized)
@@ -179,7 +185,8 @@ class TDRTransform(object):
         return rvf
 
     def apply(self, node_uid, timeout=0):
-        self.logger.debug("TDRTransform.apply({:s}): processing {:d} node_uid\n".format(self.name, node_uid))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRTransform.apply", node=self.name, node_uid=node_uid)
         print("TDRTransform apply()")
         return 0
 
@@ -266,7 +273,8 @@ class TDRTransform(object):
         return True
 
     def __sendRequest(self, node_uid, message, metaname):
-        self.logger.debug("TDRTransform.__sendRequest({:s}): sending {:s} RVF\n".format(self.name, metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRTransform.__sendRequest", node=self.name, command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = self.node_uid
         wrapper.metaname = metaname
@@ -275,7 +283,8 @@ class TDRTransform(object):
         return self.sendRequestCallback(node_uid, wrapper)
 
     def __sendResponse(self, node_uid, message, metaname, uid):
-        self.logger.debug("TDRTransform.__sendResponse({:s}): sending {:s} RVF\n".format(self.name, metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRTransform.__sendResponse", node=self.name, command=metaname)
         wrapper = p2654model2.rvf.rvfmessage_pb2.RVFMessage()
         wrapper.UID = uid
         wrapper.metaname = metaname
@@ -284,7 +293,8 @@ class TDRTransform(object):
         return self.sendResponseCallback(node_uid, wrapper)
 
     def __updateDataValue(self, node_uid):
-        self.logger.debug("TDRTransform.__updateDataValue({:s}):\n".format(self.name))
+        if instrument.strategy:
+            instrument.emit("strategy", "TDRTransform.__updateDataValue", node=self.name)
         dvmsg = p2654model2.rvf.rvfmessage_pb2.RVFDataValue()
         dvmsg.UID = node_uid
         dvmsg.nrbits = self.nrbits
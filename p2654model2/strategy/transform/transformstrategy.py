@@ -36,13 +36,15 @@ from p2654model2.builder.moduleloader import ModuleLoader
 from p2654model2.builder.nodecontainer import NodeContainer
 
 import logging
-from autologging import traced, logged
+from autologging import logged
+from p2654model2.instrument.instrument import InstrumentFactory, instrumented
 
 module_logger = logging.getLogger('p2654model2.strategy.transforms.transformstrategy')
+instrument = InstrumentFactory.get_instrument()
 
 
 @logged
-@traced
+@instrumented("strategy")
 class TransformStrategy(object):
     __indent = 0
 
@@ -84,19 +86,23 @@ class TransformStrategy(object):
         return self.class_obj.configure()
 
     def handleRequest(self, message):
-        self.logger.debug("TransformStrategy.handleRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TransformStrategy.handleRequest", node=self.name, command=message.metaname)
         return self.class_obj.handleRequest(self.node_uid, message)
 
     def handleResponse(self, message):
-        self.logger.debug("TransformStrategy.handleResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TransformStrategy.handleResponse", node=self.name, command=message.metaname)
         return self.class_obj.handleResponse(self.node_uid, message)
 
     def updateRequest(self, message):
-        self.logger.debug("TransformStrategy.updateRequest({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TransformStrategy.updateRequest", node=self.name, command=message.metaname)
         return self.class_obj.updateRequest(self.node_uid, message)
 
     def updateResponse(self, message):
-        self.logger.debug("TransformStrategy.updateResponse({:s}): processing {:s} RVF\n".format(self.name, message.metaname))
+        if instrument.strategy:
+            instrument.emit("strategy", "TransformStrategy.updateResponse", node=self.name, command=message.metaname)
         return self.class_obj.updateResponse(self.node_uid, message)
 
     def getStatus(self, timeout=0):
@@ -106,9 +112,19 @@ class TransformStrategy(object):
         return self.class_obj.getError(self.node_uid, timeout)
 
     def apply(self, timeout=0):
-        self.logger.debug("TransformStrategy.apply({:s}): processing\n".format(self.name))
+        if instrument.strategy:
+            instrument.emit("strategy", "TransformStrategy.apply", node=self.name)
         return self.class_obj.apply(self.node_uid, timeout)
 
+    def get_resources(self):
+        """
+        @return: Set of the driver resources (e.g. the ATE session "ate:127.0.0.1:5023") the strategy drives,
+                 empty for strategies that only talk to other model nodes.
+        """
+        if not hasattr(self.class_obj, "get_resources"):
+            return set()
+        return set(self.class_obj.get_resources(self.node_uid))
+
     def getCallbackNames(self):
         return self.class_obj.getCallbackNames()
 
@@ -139,6 +155,8 @@ class TransformStrategy(object):
     @staticmethod
     def sendObserver(node_uid, msg):
         nc = NodeContainer.get_nodecontainer()
+        if nc.compiled is not None:
+            return nc.compiled.engines[node_uid].update_observer(msg)
         node = nc.get_node_by_id(node_uid)
         te = node.transform_engine
         return te.update_observer(msg)
@@ -146,6 +164,8 @@ class TransformStrategy(object):
     @staticmethod
     def sendRequest(node_uid, msg):
         nc = NodeContainer.get_nodecontainer()
+        if nc.compiled is not None:
+            return nc.compiled.engines[node_uid].sendRequest(msg)
         node = nc.get_node_by_id(node_uid)
         te = node.transform_engine
         return te.sendRequest(msg)
@@ -153,6 +173,8 @@ class TransformStrategy(object):
     @staticmethod
     def sendResponse(node_uid, msg):
         nc = NodeContainer.get_nodecontainer()
+        if nc.compiled is not None:
+            return nc.compiled.engines[node_uid].sendResponse(msg)
         node = nc.get_node_by_id(node_uid)
         te = node.transform_engine
         return te.sendResponse(msg)
@@ -160,14 +182,26 @@ class TransformStrategy(object):
     @staticmethod
     def updateDataValue(node_uid, msg):
         nc = NodeContainer.get_nodecontainer()
+        if nc.compiled is not None:
+            return nc.compiled.engines[node_uid].updateDataValue(msg)
         node = nc.get_node_by_id(node_uid)
         te = node.transform_engine
         return te.updateDataValue(msg)
 
     def update_observer(self, message):
-        self.logger.debug("TransformStrategy.update_observer({:s})\n".format(self.name))
+        if instrument.strategy:
+            instrument.emit("strategy", "TransformStrategy.update_observer", node=self.name)
         return self.class_obj.update_observer(self.node_uid, message)
 
+    def is_selected(self, child_uid):
+        """
+        True when the child is on the active scan path of this strategy.  Strategies without selectors do
+        not implement is_selected() and always pass their children through.
+        """
+        if not hasattr(self.class_obj, "is_selected"):
+            return True
+        return self.class_obj.is_selected(self.node_uid, child_uid)
+
     def indent(self):
         TransformStrategy.__indent += 4
 
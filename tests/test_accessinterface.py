@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+    Tests of the correlation ID routing of the AccessInterface.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    Tests of the correlation ID routing of the AccessInterface.  Sibling nodes share the AccessInterface
+    of their parent, so their requests interleave on it and the parent may answer them in any order.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import pytest
+
+# The RVF messages are generated from rvf/rvfmessage.proto by the build
+rvfmessage_pb2 = pytest.importorskip("p2654model2.rvf.rvfmessage_pb2")
+from p2654model2.interface.accessinterface import AccessInterface
+
+
+SIBLINGS = (11, 12, 13)
+
+
+class Parent:
+    """
+    Parent end of an AccessInterface shared by the sibling nodes in SIBLINGS.  Requests are held until the
+    test answers them; every sibling records the responses and update responses it receives.
+    """
+    def __init__(self):
+        self.ai = AccessInterface()
+        self.requests = []
+        self.received = {uid: [] for uid in SIBLINGS}
+        self.updated = {uid: [] for uid in SIBLINGS}
+        self.ai.set_req_callback(1, self.requests.append)
+        for uid in SIBLINGS:
+            self.ai.set_resp_callback(uid, self.received[uid].append)
+            self.ai.set_update_resp_callback(uid, self.updated[uid].append)
+
+    def send(self, uid, metaname):
+        rvf = rvfmessage_pb2.RVFMessage(UID=uid, metaname=metaname)
+        self.ai.sendRequest(rvf)
+        return rvf.CID
+
+    def answer(self, request, metaname, update=False):
+        rvf = rvfmessage_pb2.RVFMessage(UID=request.UID, metaname=metaname, CID=request.CID)
+        if update:
+            return self.ai.updateResponse(rvf)
+        return self.ai.sendResponse(rvf)
+
+
+def test_interleaved_siblings_receive_their_own_responses():
+    parent = Parent()
+    parent.send(11, "A1")
+    parent.send(12, "B1")
+    parent.send(11, "A2")
+    parent.send(13, "C1")
+    assert len(parent.ai.get_pending()) == 4
+    # Answer out of order; the last requester (13) must not collect the others' responses
+    by_name = {r.metaname: r for r in parent.requests}
+    for name in ("A2", "C1", "B1", "A1"):
+        parent.answer(by_name[name], name + "-resp")
+    assert [r.metaname for r in parent.received[11]] == ["A2-resp", "A1-resp"]
+    assert [r.metaname for r in parent.received[12]] == ["B1-resp"]
+    assert [r.metaname for r in parent.received[13]] == ["C1-resp"]
+    assert parent.ai.get_pending() == {}
+
+
+def test_correlation_ids_are_unique_and_kept():
+    first, second = Parent(), Parent()
+    cids = [first.send(11, "A"), second.send(11, "A"), first.send(12, "B")]
+    assert 0 not in cids
+    assert len(set(cids)) == len(cids)
+    # A request that already carries a correlation ID keeps it
+    rvf = rvfmessage_pb2.RVFMessage(UID=13, metaname="C", CID=cids[0] + 1000)
+    first.ai.sendRequest(rvf)
+    assert rvf.CID == cids[0] + 1000
+    assert first.ai.get_pending()[rvf.CID] == 13
+
+
+def test_update_response_routes_by_correlation_id():
+    parent = Parent()
+    parent.send(11, "A1")
+    parent.send(12, "B1")
+    a1, b1 = parent.requests
+    parent.answer(a1, "A1-update", update=True)
+    assert [r.metaname for r in parent.updated[11]] == ["A1-update"]
+    assert parent.updated[12] == []
+    # The request stays pending until its response is sent
+    assert a1.CID in parent.ai.get_pending()
+    parent.answer(a1, "A1-resp")
+    parent.answer(b1, "B1-resp")
+    assert [r.metaname for r in parent.received[11]] == ["A1-resp"]
+    assert [r.metaname for r in parent.received[12]] == ["B1-resp"]
+    assert parent.ai.get_pending() == {}
+
+
+def test_response_without_correlation_id_goes_to_last_requester():
+    parent = Parent()
+    parent.send(11, "A1")
+    parent.send(12, "B1")
+    parent.ai.sendResponse(rvfmessage_pb2.RVFMessage(UID=12, metaname="B1-resp"))
+    assert [r.metaname for r in parent.received[12]] == ["B1-resp"]
+    assert parent.received[11] == []
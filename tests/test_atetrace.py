@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+    Tests of the recording and replay of ATE sessions.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    Tests of the recording and replay of ATE sessions.  A session recorded by the ATERecordingClient is served
+    back by the ATEReplayClient, which reports every command departing from the recorded traffic.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import pytest
+
+from drivers.ate.atetrace import ATERecordingClient, ATEReplayClient, ReplayDivergenceError
+
+
+class Board:
+    """
+    Transport client standing in for the Simulator: a register file where writes to 0x1402 fail.
+    Writes are posted, their failures collected by drain().
+    """
+    def __init__(self):
+        self.pipeline_depth = 8
+        self.regs = {}
+        self.failed = []
+
+    def start_sim(self, board):
+        return "Simulation of {:s} has started.\r\nOK\r\n".format(board)
+
+    def mw(self, adr, data):
+        if adr == 0x1402:
+            self.failed.append(("MW 0x{:X} 0x{:X}".format(adr, data), "ERROR bus fault\r\nOK\r\n"))
+        else:
+            self.regs[adr] = data
+        return None
+
+    def mr(self, adr):
+        return "OK\r\n", self.regs.get(adr, 0)
+
+    def drain(self):
+        failed, self.failed = self.failed, []
+        return failed
+
+    def close(self):
+        pass
+
+
+def session(client):
+    """
+    The session of the tests.
+    @return: The value read back and the failures drained.
+    """
+    client.start_sim("P2654Board1")
+    client.mw(0x1400, 0x5A)
+    client.mw(0x1402, 0x1)
+    failed = client.drain()
+    _, value = client.mr(0x1400)
+    return value, failed
+
+
+@pytest.fixture
+def trace(tmp_path):
+    trace_file = str(tmp_path / "session.trc")
+    recorder = ATERecordingClient(Board(), trace_file)
+    session(recorder)
+    recorder.close()
+    return trace_file
+
+
+def replay(trace_file, strict=True):
+    client = ATEReplayClient()
+    client.strict = strict
+    client.load(trace_file)
+    return client
+
+
+def test_replay_serves_the_recorded_session(trace):
+    client = replay(trace)
+    value, failed = session(client)
+    assert value == 0x5A
+    # The posted write that failed is reported by the drain() that collected it in the recording
+    assert failed == [("MW 0x1402 0x1", "ERROR bus fault\r\nOK\r\n")]
+    assert client.get_divergences() == []
+    client.close()
+
+
+def test_different_write_diverges(trace):
+    client = replay(trace)
+    client.start_sim("P2654Board1")
+    with pytest.raises(ReplayDivergenceError):
+        client.mw(0x1400, 0xA5)
+    assert len(client.get_divergences()) == 1
+    client.close()
+
+
+def test_different_command_diverges(trace):
+    client = replay(trace)
+    client.start_sim("P2654Board1")
+    with pytest.raises(ReplayDivergenceError):
+        client.mr(0x1400)
+    client.close()
+
+
+def test_divergences_are_collected_when_not_strict(trace):
+    client = replay(trace, strict=False)
+    client.start_sim("P2654Board2")
+    client.mw(0x1400, 0x5A)
+    client.mw(0x1404, 0x1)
+    client.drain()
+    client.mr(0x1400)
+    # Commands past the end of the trace diverge too
+    client.mw(0x1400, 0x0)
+    divergences = client.get_divergences()
+    assert len(divergences) == 3
+    assert "P2654Board2" in divergences[0]
+    assert "end of the trace" in divergences[2]
+    client.close()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+    Tests of the PlanCache of the retargeting plans.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    Tests of the PlanCache of the retargeting plans.  Plans are keyed by the selector state and the set of
+    registers they activate, and the least recently used plan is evicted when the cache is full.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+from p2654model2.scheduler.plancache import PlanCache
+
+
+def test_plan_cache_hit_miss_and_eviction():
+    cache = PlanCache(capacity=2)
+    k1 = PlanCache.key({3: 4, 1: None}, [7, 8])
+    # The key does not depend on the order of the state or of the targets
+    assert PlanCache.key({1: None, 3: 4}, [8, 7]) == k1
+    assert cache.get(k1) is None
+    cache.put(k1, "p1")
+    assert cache.get(k1) == "p1"
+    k2 = PlanCache.key({3: 5, 1: None}, [7, 8])
+    k3 = PlanCache.key({3: 4, 1: None}, [7])
+    cache.put(k2, "p2")
+    cache.get(k1)
+    # k2 is the least recently used plan
+    cache.put(k3, "p3")
+    assert cache.get(k2) is None
+    assert cache.get(k1) == "p1"
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (3, 2, 1, 2)
+
+
+def test_plan_cache_invalidation():
+    cache = PlanCache()
+    k1 = PlanCache.key({1: 2}, [3])
+    k2 = PlanCache.key({1: 4}, [3])
+    cache.put(k1, "p1")
+    cache.put(k2, "p2")
+    cache.invalidate(k1)
+    assert cache.get(k1) is None
+    assert cache.get(k2) == "p2"
+    cache.invalidate()
+    assert len(cache) == 0
+    # Dropping a plan that is not cached is not counted
+    cache.invalidate(k2)
+    assert cache.get_stats()["invalidations"] == 2
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+    Tests of the retargeting plans of the Retargeter and of their cache.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    Tests of the retargeting plans of the Retargeter and of their cache.  A register behind an unselected
+    branch of a Table selector is held back by iApply until a plan writing the control register selects its
+    branch.  Plans are cached by selector state and held registers and dropped when the model changes.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import pytest
+
+# The RVF messages are generated from rvf/rvfmessage.proto by the build
+pytest.importorskip("p2654model2.rvf.rvfmessage_pb2")
+pytest.importorskip("myhdl")
+import p2654model2.rvf.commands.register_pb2
+from p2654model2.builder.nodecontainer import NodeContainer
+from p2654model2.node.modelnode import Chain, Linker, Register
+from p2654model2.parser.pdlmodel import iApplyCommand
+from p2654model2.scheduler.retargeter import RetargeterFactory
+from p2654model2.scheduler.scheduler import SchedulerFactory
+
+
+@pytest.fixture
+def model(monkeypatch):
+    # Fresh singletons, so each test has a model, scheduler and plan cache of its own
+    monkeypatch.setattr(NodeContainer, "inst", None)
+    monkeypatch.setattr(SchedulerFactory, "inst", None)
+    monkeypatch.setattr(RetargeterFactory, "inst", None)
+    return Model()
+
+
+class Control:
+    """
+    Injector of the control register, keeping the value written by the Retargeter.
+    """
+    def __init__(self):
+        self.iid = 1
+        self.value = 0
+
+    def get_commands(self):
+        return ["WRITE"]
+
+    def handleCommand(self, wrapper):
+        self.value = p2654model2.rvf.commands.register_pb2.WRITE.FromString(wrapper.serialized).value[0]
+        return True
+
+    def apply(self, timeout):
+        return 0
+
+
+class Strategy:
+    """
+    Transform strategy of a test node, recording its visits.  The one of MUX selects its child by the value
+    of the control register.
+    """
+    def __init__(self, model, name):
+        self.model = model
+        self.name = name
+
+    def apply(self, timeout):
+        self.model.visits.append(self.name)
+        return 0
+
+    def is_selected(self, child_uid):
+        if self.name != "MUX":
+            return True
+        return child_uid == self.model.branches[self.model.control.value].uid
+
+
+class Model:
+    """
+    ROOT holding the control register SEL and the Linker MUX, whose Table selector picks P0 or P1 by SEL.
+    """
+    def __init__(self):
+        self.visits = []
+        self.root = self.add(Chain("ROOT"))
+        self.sel = self.add(Register("SEL"), self.root)
+        self.sel.size = 1
+        self.control = Control()
+        self.sel.add_injector(self.control)
+        self.mux = self.add(Linker("MUX"), self.root)
+        self.mux.selector = {"Table": [{"0": "P0", "1": "P1"}]}
+        self.mux.control = ["ROOT.SEL"]
+        self.branches = [self.add(Register("P0"), self.mux), self.add(Register("P1"), self.mux)]
+        NodeContainer.get_nodecontainer().define_top(self.root)
+
+    def add(self, node, parent=None):
+        node.visible = True
+        node.register_transform_strategy(Strategy(self, node.name))
+        if parent is not None:
+            parent.add_child(node)
+        return node
+
+    def access(self, node):
+        """
+        Hand work to a register and run iApply.
+        """
+        self.visits.clear()
+        SchedulerFactory.get_scheduler().schedule(node.uid)
+        return iApplyCommand(1).execute()
+
+
+def stats():
+    return RetargeterFactory.get_retargeter().get_stats()
+
+
+def test_register_behind_unselected_branch_is_retargeted(model):
+    assert model.access(model.branches[1])
+    assert model.control.value == 1
+    # P1 is applied only once its branch is selected
+    assert model.visits.index("SEL") < model.visits.index("P1")
+    s = stats()
+    assert (s["holds"], s["plans"], s["writes"], s["plan_misses"], s["plan_hits"]) == (1, 1, 1, 1, 0)
+
+
+def test_same_access_reuses_the_cached_plan(model):
+    model.access(model.branches[1])
+    # Back to the selector state the plan was made for
+    model.control.value = 0
+    assert model.access(model.branches[1])
+    assert model.control.value == 1
+    s = stats()
+    assert (s["plans"], s["plan_misses"], s["plan_hits"], s["plan_size"]) == (1, 1, 1, 1)
+
+
+def test_other_access_misses_the_cache(model):
+    model.access(model.branches[1])
+    assert model.access(model.branches[0])
+    assert model.control.value == 0
+    s = stats()
+    assert (s["plans"], s["plan_misses"], s["plan_hits"], s["plan_size"]) == (2, 2, 0, 2)
+
+
+def test_model_change_invalidates_the_plans(model):
+    model.access(model.branches[1])
+    model.control.value = 0
+    model.add(Register("EXTRA"), model.root)
+    assert model.access(model.branches[1])
+    s = stats()
+    assert (s["plans"], s["plan_hits"], s["plan_invalidations"], s["plan_size"]) == (2, 0, 1, 1)
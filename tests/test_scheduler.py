@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""
+    Tests of the apply passes of the Scheduler and of iApply.
+    Copyright (C) 2021  Bradford G. Van Treuren
+
+    Tests of the apply passes of the Scheduler and of iApply.  A pass visits the scheduled nodes and their
+    ancestors only, revisits the nodes reporting pending, stops on nodes reporting errors and delivers the
+    data value changes seen by observers once per pass.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__authors__ = ["Bradford G. Van Treuren"]
+__contact__ = "bradvt59@gmail.com"
+__copyright__ = "Copyright 2021, VT Enterprises Consulting Services"
+__credits__ = ["Bradford G. Van Treuren"]
+__date__ = "2021/03/05"
+__deprecated__ = False
+__email__ = "bradvt59@gmail.com"
+__license__ = "GPLv3"
+__maintainer__ = "Bradford G. Van Treuren"
+__status__ = "Alpha/Experimental"
+__version__ = "0.0.1"
+
+
+import pytest
+
+# The RVF messages are generated from rvf/rvfmessage.proto by the build
+rvfmessage_pb2 = pytest.importorskip("p2654model2.rvf.rvfmessage_pb2")
+pytest.importorskip("myhdl")
+from p2654model2.builder.nodecontainer import NodeContainer
+from p2654model2.node.modelnode import Chain, Register
+from p2654model2.parser.pdlmodel import iApplyCommand
+from p2654model2.scheduler.retargeter import RetargeterFactory
+from p2654model2.scheduler.scheduler import SchedulerFactory
+
+
+class Script:
+    """
+    Transform strategy of a test node.  Records its visits and returns the scripted apply() results, then 0.
+    """
+    def __init__(self, visits, name, results=()):
+        self.visits = visits
+        self.name = name
+        self.results = list(results)
+        self.events = []
+        self.on_apply = None
+
+    def apply(self, timeout):
+        self.visits.append(self.name)
+        if len(self.visits) > 100:
+            raise AssertionError("The apply passes do not terminate.")
+        if self.on_apply is not None:
+            self.on_apply()
+        if len(self.results):
+            return self.results.pop(0)
+        return 0
+
+    def is_selected(self, child_uid):
+        return True
+
+    def update_observer(self, message):
+        self.events.append(tuple(message.data))
+        return True
+
+
+class Model:
+    """
+    ROOT with two subtrees, A holding register A1 and B holding register B1.
+    """
+    def __init__(self):
+        self.visits = []
+        self.root = self.add(Chain("ROOT"))
+        self.a = self.add(Chain("A"), self.root)
+        self.a1 = self.add(Register("A1"), self.a)
+        self.b = self.add(Chain("B"), self.root)
+        self.b1 = self.add(Register("B1"), self.b)
+        NodeContainer.get_nodecontainer().define_top(self.root)
+
+    def add(self, node, parent=None):
+        node.visible = True
+        node.register_transform_strategy(Script(self.visits, node.name))
+        if parent is not None:
+            parent.add_child(node)
+        return node
+
+    @staticmethod
+    def strategy(node):
+        return node.transform_engine.get_transform_strategy()
+
+
+@pytest.fixture
+def model(monkeypatch):
+    # Fresh singletons, so each test has a model and scheduler of its own
+    monkeypatch.setattr(NodeContainer, "inst", None)
+    monkeypatch.setattr(SchedulerFactory, "inst", None)
+    monkeypatch.setattr(RetargeterFactory, "inst", None)
+    return Model()
+
+
+def test_untouched_subtree_is_not_visited(model):
+    sched = SchedulerFactory.get_scheduler()
+    sched.schedule(model.a1.uid)
+    assert sched.apply(0) == 0
+    assert model.visits == ["A1", "A", "ROOT"]
+    assert not sched.is_pending()
+
+
+def test_pending_node_is_revisited(model):
+    Model.strategy(model.a1).results = [1, 1]
+    sched = SchedulerFactory.get_scheduler()
+    sched.schedule(model.a1.uid)
+    assert sched.apply(0) == 1
+    assert sched.get_scheduled() == {model.a1.uid}
+    assert iApplyCommand(1).execute()
+    assert model.visits == ["A1", "A", "ROOT"] * 3
+    assert not sched.is_pending()
+
+
+def test_erroring_node_ends_iapply(model):
+    Model.strategy(model.b1).results = [-1] * 200
+    SchedulerFactory.get_scheduler().schedule(model.b1.uid)
+    assert not iApplyCommand(1).execute()
+    assert model.visits == ["B1", "B", "ROOT"]
+    assert not SchedulerFactory.get_scheduler().is_pending()
+
+
+def test_observer_notifications_are_coalesced(model):
+    te = model.a1.transform_engine
+    te.register_observer(model.b.uid)
+
+    def update(values):
+        for v in values:
+            te.updateDataValue(rvfmessage_pb2.RVFDataValue(UID=model.a1.uid, nrbits=8, data=[v]))
+
+    Model.strategy(model.a1).on_apply = lambda: update((1, 2, 3))
+    sched = SchedulerFactory.get_scheduler()
+    sched.schedule(model.a1.uid)
+    sched.apply(0)
+    # One event per pass, with the last value
+    assert Model.strategy(model.b).events == [(3,)]
+    assert sched.get_stats()["notifications"] == 1
+    # The observer was scheduled to act on the event
+    assert sched.is_scheduled(model.b.uid)
+    # A pass ending on the value already delivered notifies nobody
+    Model.strategy(model.a1).on_apply = lambda: update((5, 3))
+    sched.schedule(model.a1.uid)
+    sched.apply(0)
+    assert Model.strategy(model.b).events == [(3,)]
+    assert sched.get_stats()["notifications"] == 1